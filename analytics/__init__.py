@@ -0,0 +1,63 @@
+"""Package de análises adicionais sobre o histórico de motores"""
+
+import polars as pl
+from classes_rfvbi import PathHolder
+from instrumentation import span
+from . import (
+    anomaly,
+    cylinders,
+    downsample,
+    duty_cycle,
+    event_rates,
+    event_snapshots,
+    fuel_check,
+    rollups,
+    sessions,
+    voyages,
+)
+
+
+def run_engdata(
+    df_full: pl.DataFrame, df_current: pl.DataFrame, path_holder: PathHolder
+) -> None:
+    """Executa as análises sobre o histórico de motores atualizado"""
+
+    with span("rollups"):
+        rollups.run(df_full, df_current, path_holder)
+
+    with span("downsample") as sp:
+        sp.rows_in = df_full.height
+        downsample.run(df_full, path_holder)
+
+    with span("duty_cycle"):
+        duty_cycle.run(df_full, df_current, path_holder)
+
+    with span("sessions"):
+        sessions.run(df_full, df_current, path_holder)
+
+    with span("fuel_check"):
+        fuel_check.run(df_full, df_current, path_holder)
+
+    with span("anomaly"):
+        anomaly.run(df_full, df_current, path_holder)
+
+    with span("cylinders"):
+        cylinders.run(df_full, df_current, path_holder)
+
+    with span("voyages"):
+        voyages.run(df_full, df_current, path_holder)
+
+
+def run_events(path_holder: PathHolder, df_new: pl.DataFrame | None = None) -> None:
+    """Executa as análises sobre o histórico de eventos atualizado"""
+
+    with span("event_rates"):
+        event_rates.run(path_holder, df_new)
+
+    with span("event_snapshots"):
+        event_snapshots.run(path_holder)
+
+
+if __name__ == "__main__":
+
+    print("Execute o script através da GUI!")
@@ -0,0 +1,216 @@
+"""Detecção de anomalias por z-score móvel condicionado à faixa de carga
+Cada leitura é comparada com a média e o desvio das leituras do mesmo ativo e
+da mesma faixa de carga na janela anterior; sequências de leituras fora do
+limiar viram intervalos na saída
+"""
+
+from datetime import datetime, timedelta
+import polars as pl
+from io_rfvbi import read_output, write_csv_atomic
+
+ANOMALY_CHANNELS = (
+    "Oil_Press",
+    "Oil_Temp",
+    "Coolant_Temp",
+    "Boost",
+    "Fuel_Rate",
+    "EXH_L",
+    "EXH_R",
+    "EXH_DIFF",
+)
+LOAD_BIN = 10
+BASELINE_WINDOW = "7d"
+Z_THRESHOLD = 4.0
+MIN_BASELINE_SAMPLES = 30
+MIN_INTERVAL_SAMPLES = 3
+MIN_REL_STD = 0.01
+MAX_SAMPLE_GAP_S = 15 * 60
+
+OUTPUT_SCHEMA = {
+    "Asset": pl.String,
+    "Channel": pl.String,
+    "Start": pl.Datetime,
+    "End": pl.Datetime,
+    "Samples": pl.Int64,
+    "Load_Bin": pl.Int64,
+    "Mean_Z": pl.Float64,
+    "Max_Abs_Z": pl.Float64,
+}
+
+
+def __window_us(window: str) -> int:
+    """Duração da janela em microssegundos"""
+    origin = datetime(2000, 1, 1)
+    return int(
+        (pl.select(pl.lit(origin).dt.offset_by(window)).item() - origin)
+        / timedelta(microseconds=1)
+    )
+
+
+def __with_partition_key(df: pl.DataFrame, window: str) -> pl.DataFrame:
+    """Ordena por uma chave de tempo única com cada (ativo, faixa) deslocado
+    para além da janela do anterior: as somas móveis rodam uma vez sobre o
+    quadro inteiro em vez de um over() por canal
+    """
+    origin = df["Timestamp"].min()
+    stride = (df["Timestamp"].max() - origin) / timedelta(microseconds=1)
+    stride = int(stride) + 2 * __window_us(window)
+
+    partition = pl.struct("Asset", "Load_Bin").rank("dense").cast(pl.Int64)
+    key = (pl.col("Timestamp") - origin).dt.total_microseconds() + partition * stride
+    return df.with_columns(key.cast(pl.Datetime("us")).alias("Key")).sort("Key")
+
+
+def __rolling_sums(col: str, window: str) -> list[pl.Expr]:
+    """Somas móveis de n, x e x² na janela anterior do mesmo ativo e faixa
+    (rolling_*_by não aceita nulos, por isso somas em vez de média/desvio)
+    """
+    value = pl.col(col).cast(pl.Float64)
+    return [
+        expr.fill_null(0)
+        .rolling_sum_by("Key", window, closed="left")
+        .alias(f"{col}|{name}")
+        for name, expr in (
+            ("n", value.is_not_null().cast(pl.Float64)),
+            ("x", value),
+            ("x2", value * value),
+        )
+    ]
+
+
+def __zscore(col: str) -> pl.Expr:
+    """z-score da leitura a partir das somas móveis"""
+    count, total = pl.col(f"{col}|n"), pl.col(f"{col}|x")
+    mean = total / count
+    var = (pl.col(f"{col}|x2") - total * mean) / (count - 1)
+    std = pl.max_horizontal(var.clip(0).sqrt(), mean.abs() * MIN_REL_STD, pl.lit(1e-9))
+
+    return (
+        pl.when(count >= MIN_BASELINE_SAMPLES)
+        .then((pl.col(col) - mean) / std)
+        .alias(f"{col}|z")
+    )
+
+
+def score(
+    df: pl.DataFrame, window: str = BASELINE_WINDOW, z_threshold: float = Z_THRESHOLD
+) -> pl.DataFrame:
+    """Calcula os z-scores de todos os canais e agrupa os intervalos anômalos
+    df deve estar ordenado por ativo e tempo (como o histórico)
+    """
+    list_channels = [col for col in ANOMALY_CHANNELS if col in df.columns]
+    if not list_channels or "Load" not in df.columns:
+        return pl.DataFrame(schema=OUTPUT_SCHEMA)
+
+    df = df.select(
+        pl.col("Asset").cast(pl.String),
+        "Timestamp",
+        ((pl.col("Load") // LOAD_BIN) * LOAD_BIN).cast(pl.Int64).alias("Load_Bin"),
+        *list_channels,
+    ).filter(pl.col("Load_Bin").is_not_null() & pl.col("Timestamp").is_not_null())
+    if df.is_empty():
+        return pl.DataFrame(schema=OUTPUT_SCHEMA)
+
+    df = df.with_row_index("Row")
+    df = __with_partition_key(df, window)
+    df = df.with_columns(
+        [expr for col in list_channels for expr in __rolling_sums(col, window)]
+    )
+    df = df.select(
+        "Row", "Asset", "Timestamp", "Load_Bin", *map(__zscore, list_channels)
+    ).sort("Row")
+
+    # Falhas de log acima de MAX_SAMPLE_GAP_S encerram o intervalo
+    df = df.with_columns(
+        (pl.col("Timestamp").diff().dt.total_seconds() > MAX_SAMPLE_GAP_S)
+        .fill_null(False)
+        .cum_sum()
+        .alias("Gap_Id")
+    )
+    df = df.with_columns(
+        [
+            pl.struct("Asset", "Gap_Id", pl.col(f"{col}|z").abs() > z_threshold)
+            .rle_id()
+            .alias(f"{col}|run")
+            for col in list_channels
+        ]
+    )
+
+    df_flagged = pl.concat(
+        [
+            df.filter(pl.col(f"{col}|z").abs() > z_threshold).select(
+                "Asset",
+                "Timestamp",
+                "Load_Bin",
+                pl.lit(col).alias("Channel"),
+                pl.col(f"{col}|z").alias("Z"),
+                pl.col(f"{col}|run").alias("Run"),
+            )
+            for col in list_channels
+        ]
+    )
+
+    return (
+        df_flagged.group_by("Asset", "Channel", "Run")
+        .agg(
+            pl.col("Timestamp").min().alias("Start"),
+            pl.col("Timestamp").max().alias("End"),
+            pl.len().alias("Samples"),
+            pl.col("Load_Bin").mode().min(),
+            pl.col("Z").mean().alias("Mean_Z"),
+            pl.col("Z").abs().max().alias("Max_Abs_Z"),
+        )
+        .filter(pl.col("Samples") >= MIN_INTERVAL_SAMPLES)
+        .select([pl.col(col).cast(dtype) for col, dtype in OUTPUT_SCHEMA.items()])
+    )
+
+
+def run(df_full: pl.DataFrame, df_current: pl.DataFrame, path_holder) -> None:
+    """Recalcula os intervalos a partir do primeiro dia com dados novos de cada
+    ativo, usando a janela anterior como referência
+    """
+    if df_current.is_empty():
+        return
+
+    df_recalc = (
+        df_current.group_by(pl.col("Asset").cast(pl.String))
+        .agg(pl.col("Timestamp").min().dt.truncate("1d").alias("Recalc_Start"))
+        .drop_nulls()
+    )
+    df_src = (
+        df_full.with_columns(pl.col("Asset").cast(pl.String))
+        .join(df_recalc, on="Asset", how="inner")
+        .filter(
+            pl.col("Timestamp")
+            >= pl.col("Recalc_Start").dt.offset_by(f"-{BASELINE_WINDOW}")
+        )
+        .drop("Recalc_Start")
+    )
+
+    df_new = (
+        score(df_src)
+        .join(df_recalc, on="Asset", how="left")
+        .filter(pl.col("End") >= pl.col("Recalc_Start"))
+        .drop("Recalc_Start")
+    )
+
+    df_old = read_output(path_holder.anomalies, OUTPUT_SCHEMA)
+    if df_old is not None:
+        df_old = (
+            df_old.join(df_recalc, on="Asset", how="left")
+            .filter(
+                pl.col("Recalc_Start").is_null()
+                | (pl.col("End") < pl.col("Recalc_Start"))
+            )
+            .drop("Recalc_Start")
+        )
+        df_new = pl.concat([df_old, df_new], how="diagonal_relaxed")
+
+    df_new = df_new.sort(["Asset", "Start", "Channel"])
+    write_csv_atomic(df_new, path_holder.anomalies)
+    print(f"Anomalias: {df_new.height} intervalos")
+
+
+if __name__ == "__main__":
+
+    print("Execute o script através da GUI!")
@@ -0,0 +1,149 @@
+"""Desvio por cilindro em relação à mediana do motor
+Os grupos de colunas por cilindro (temperatura de pórtico, tensão secundária
+do transformador) são detectados pelo cabeçalho. O bloco de cilindros de cada
+grupo vira uma matriz (linhas x cilindros) e a mediana, o desvio e o pior
+cilindro são calculados por linha de uma vez, sem uma expressão por coluna
+"""
+
+import os
+import warnings
+import numpy as np
+import polars as pl
+from io_rfvbi import merge_incremental
+from special_parse.exhaust_diff_by_cilinder import cylinder_blocks
+
+MIN_CYLINDERS = 3
+
+OUTPUT_SCHEMA = {
+    "Date": pl.Date,
+    "Asset": pl.String,
+    "Group": pl.String,
+    "Cylinder": pl.Int64,
+    "Samples": pl.Int64,
+    "Mean_Dev": pl.Float64,
+    "Mean_Abs_Dev": pl.Float64,
+    "Max_Abs_Dev": pl.Float64,
+    "Worst_Share": pl.Float64,
+    "Rank": pl.Int64,
+}
+
+
+def row_deviation(block: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Desvio de cada cilindro da mediana da linha e índice do pior cilindro
+    (-1 quando a linha não tem leituras)
+    """
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", category=RuntimeWarning)
+        median = np.nanmedian(block, axis=1, keepdims=True)
+    deviation = block - median
+
+    abs_dev = np.abs(deviation)
+    has_data = ~np.isnan(abs_dev).all(axis=1)
+    worst = np.argmax(np.nan_to_num(abs_dev, nan=-1.0), axis=1)
+    return deviation, np.where(has_data, worst, -1)
+
+
+def compute_group(
+    df: pl.DataFrame, group: str, dict_cylinders: dict[int, list[str]]
+) -> pl.DataFrame:
+    """Tendência diária do desvio por cilindro de um grupo"""
+    list_cylinders = list(dict_cylinders)
+    list_temps = [
+        pl.coalesce(list_cols).cast(pl.Float64) for list_cols in dict_cylinders.values()
+    ]
+    df = df.filter(pl.any_horizontal([expr.is_not_null() for expr in list_temps]))
+    if df.is_empty():
+        return pl.DataFrame(schema=OUTPUT_SCHEMA)
+    block = df.select(list_temps).to_numpy()
+    deviation, worst = row_deviation(block)
+
+    df_dev = df.select(
+        "Asset", pl.col("Timestamp").dt.date().alias("Date")
+    ).with_columns(
+        pl.Series("Worst", worst),
+        *[
+            pl.Series(f"Dev|{cyl}", deviation[:, idx], nan_to_null=True)
+            for idx, cyl in enumerate(list_cylinders)
+        ],
+    )
+
+    df_daily = df_dev.group_by("Asset", "Date").agg(
+        (pl.col("Worst") >= 0).sum().alias("Rows"),
+        *[
+            expr
+            for idx, cyl in enumerate(list_cylinders)
+            for expr in (
+                pl.col(f"Dev|{cyl}").count().alias(f"{cyl}|Samples"),
+                pl.col(f"Dev|{cyl}").mean().alias(f"{cyl}|Mean_Dev"),
+                pl.col(f"Dev|{cyl}").abs().mean().alias(f"{cyl}|Mean_Abs_Dev"),
+                pl.col(f"Dev|{cyl}").abs().max().alias(f"{cyl}|Max_Abs_Dev"),
+                (pl.col("Worst") == idx).sum().alias(f"{cyl}|Worst"),
+            )
+        ],
+    )
+
+    return (
+        df_daily.unpivot(index=["Asset", "Date", "Rows"])
+        .with_columns(
+            pl.col("variable")
+            .str.split_exact("|", 1)
+            .struct.rename_fields(["Cylinder", "Metric"])
+        )
+        .unnest("variable")
+        .pivot("Metric", index=["Asset", "Date", "Rows", "Cylinder"], values="value")
+        .filter(pl.col("Samples") > 0)
+        .with_columns(
+            pl.lit(group).alias("Group"),
+            pl.col("Cylinder").cast(pl.Int64),
+            (pl.col("Worst") / pl.col("Rows")).alias("Worst_Share"),
+            pl.col("Mean_Abs_Dev")
+            .rank("min", descending=True)
+            .over("Asset", "Date")
+            .alias("Rank"),
+        )
+        .select([pl.col(col).cast(dtype) for col, dtype in OUTPUT_SCHEMA.items()])
+    )
+
+
+def compute_deviation(df: pl.DataFrame) -> pl.DataFrame:
+    """Desvio por cilindro de todos os grupos detectados no cabeçalho"""
+    list_frames = [
+        compute_group(df, group, dict_cylinders)
+        for group, dict_cylinders in cylinder_blocks(df.columns).items()
+        if len(dict_cylinders) >= MIN_CYLINDERS
+    ]
+    if not list_frames:
+        return pl.DataFrame(schema=OUTPUT_SCHEMA)
+    return pl.concat(list_frames)
+
+
+def run(df_full: pl.DataFrame, df_current: pl.DataFrame, path_holder) -> None:
+    """Recalcula os dias tocados; sem saída anterior, todo o histórico"""
+    if df_current.is_empty() or not cylinder_blocks(df_full.columns):
+        return
+
+    df_src = df_full.with_columns(pl.col("Asset").cast(pl.String))
+    if os.path.isfile(path_holder.cylinders):
+        df_src = df_src.join(
+            df_current.select(
+                pl.col("Asset").cast(pl.String),
+                pl.col("Timestamp").dt.date().alias("Date"),
+            ).unique(),
+            left_on=["Asset", pl.col("Timestamp").dt.date()],
+            right_on=["Asset", "Date"],
+            how="semi",
+        )
+
+    df_cylinders = merge_incremental(
+        path_holder.cylinders,
+        compute_deviation(df_src),
+        keys=["Asset", "Date"],
+        schema=OUTPUT_SCHEMA,
+        sort_by=["Asset", "Date", "Group", "Cylinder"],
+    )
+    print(f"Desvio por cilindro: {df_cylinders.height} linhas")
+
+
+if __name__ == "__main__":
+
+    print("Execute o script através da GUI!")
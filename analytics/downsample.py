@@ -0,0 +1,171 @@
+"""Redução de pontos preservando a forma das curvas para gráficos de tendência"""
+
+import polars as pl
+from io_rfvbi import write_csv_atomic
+
+TARGET_POINTS = 1000
+MODE = "lttb"
+
+TREND_CHANNELS = (
+    "Load",
+    "RPM",
+    "Coolant_Temp",
+    "Oil_Press",
+    "Oil_Temp",
+    "Boost",
+    "Fuel_Rate",
+    "EXH_L",
+    "EXH_R",
+    "EXH_DIFF",
+)
+
+KEYS = ["Asset", "Channel"]
+
+
+def to_long(df: pl.DataFrame, channels: tuple[str, ...]) -> pl.DataFrame:
+    """Converte o histórico para (Asset, Channel, Timestamp, Value) ordenado
+    Cada par ativo/canal recebe um id inteiro (Series) para as janelas
+    """
+    list_channels = [col for col in channels if col in df.columns]
+    df_long = (
+        df.select(
+            pl.col("Asset").cast(pl.String),
+            pl.col("Timestamp"),
+            *[pl.col(col).cast(pl.Float64) for col in list_channels],
+        )
+        .unpivot(
+            index=["Asset", "Timestamp"],
+            on=list_channels,
+            variable_name="Channel",
+            value_name="Value",
+        )
+        .drop_nulls(["Timestamp", "Value"])
+        .sort(KEYS + ["Timestamp"])
+    )
+    is_new_series = (
+        (pl.col("Asset") != pl.col("Asset").shift())
+        | (pl.col("Channel") != pl.col("Channel").shift())
+    ).fill_null(True)
+
+    return df_long.with_columns(is_new_series.cum_sum().alias("Series"))
+
+
+def add_buckets(df_long: pl.DataFrame, n_buckets: int) -> pl.DataFrame:
+    """Numera as amostras e distribui em n_buckets por série
+    O id do bucket deixa um vazio entre séries para não haver vizinhos cruzados
+    """
+    return df_long.with_columns(
+        pl.int_range(pl.len()).over("Series").alias("Position"),
+        pl.len().over("Series").alias("Size"),
+    ).with_columns(
+        (
+            pl.col("Series").cast(pl.Int64) * (n_buckets + 1)
+            + pl.col("Position") * n_buckets // pl.col("Size")
+        ).alias("Bucket"),
+    )
+
+
+def first_per_bucket(df: pl.DataFrame, subset: list[str]) -> pl.DataFrame:
+    """Desempata candidatos iguais mantendo a primeira amostra do bucket"""
+    return df.unique(subset, keep="first", maintain_order=True)
+
+
+def minmax(df: pl.DataFrame, target_points: int) -> pl.DataFrame:
+    """Mantém o mínimo e o máximo de cada bucket"""
+    df = add_buckets(df, max(1, target_points // 2))
+
+    is_min = pl.col("Value") == pl.col("Value").min().over("Bucket")
+    is_max = pl.col("Value") == pl.col("Value").max().over("Bucket")
+
+    return first_per_bucket(
+        df.filter(is_min | is_max).with_columns(is_min.alias("Is_Min")),
+        ["Bucket", "Is_Min"],
+    )
+
+
+def lttb(df: pl.DataFrame, target_points: int) -> pl.DataFrame:
+    """Largest-triangle-three-buckets vetorizado
+    O ponto anterior do triângulo é o centróide do bucket anterior (em vez do
+    ponto escolhido), o que elimina a dependência sequencial entre buckets
+    """
+    df = add_buckets(df, max(3, target_points)).with_columns(
+        pl.col("Timestamp").dt.epoch("s").cast(pl.Float64).alias("X")
+    )
+
+    df_centroid = df.group_by("Bucket").agg(
+        pl.col("X").mean().alias("Cx"), pl.col("Value").mean().alias("Cy")
+    )
+    df_prev = df_centroid.select(
+        (pl.col("Bucket") + 1).alias("Bucket"),
+        pl.col("Cx").alias("Ax"),
+        pl.col("Cy").alias("Ay"),
+    )
+    df_next = df_centroid.select(
+        (pl.col("Bucket") - 1).alias("Bucket"),
+        pl.col("Cx").alias("Bx"),
+        pl.col("Cy").alias("By"),
+    )
+
+    # Primeiro e último bucket ficam sem vizinho (Area nula): só a borda fica
+    df = (
+        df.join(df_prev, on="Bucket", how="left")
+        .join(df_next, on="Bucket", how="left")
+        .with_columns(
+            (
+                (pl.col("Ax") - pl.col("Bx")) * (pl.col("Value") - pl.col("Ay"))
+                - (pl.col("Ax") - pl.col("X")) * (pl.col("By") - pl.col("Ay"))
+            )
+            .abs()
+            .alias("Area")
+        )
+    )
+
+    is_edge = (pl.col("Position") == 0) | (pl.col("Position") == pl.col("Size") - 1)
+    is_best = pl.col("Area") == pl.col("Area").max().over("Bucket")
+
+    return pl.concat(
+        [
+            df.filter(is_edge),
+            first_per_bucket(df.filter(is_best & ~is_edge), ["Bucket"]),
+        ]
+    )
+
+
+REDUCERS = {"lttb": lttb, "minmax": minmax}
+
+
+def downsample(
+    df: pl.DataFrame,
+    target_points: int = TARGET_POINTS,
+    mode: str = MODE,
+    channels: tuple[str, ...] = TREND_CHANNELS,
+) -> pl.DataFrame:
+    """Reduz cada (ativo, canal) para cerca de target_points pontos"""
+    if mode not in REDUCERS:
+        raise ValueError(f"Modo de redução inválido: {mode}")
+
+    df_long = to_long(df, channels)
+    is_short = pl.len().over("Series") <= target_points
+
+    # Séries curtas vão inteiras; as demais passam pelo redutor
+    df_long = pl.concat(
+        [
+            df_long.filter(is_short),
+            REDUCERS[mode](df_long.filter(~is_short), target_points),
+        ],
+        how="diagonal",
+    )
+
+    return df_long.select(KEYS + ["Timestamp", "Value"]).sort(KEYS + ["Timestamp"])
+
+
+def run(df_full: pl.DataFrame, path_holder) -> None:
+    """Gera a exportação compacta para os gráficos de tendência"""
+    df_trend = downsample(df_full)
+    write_csv_atomic(df_trend, path_holder.trend_export)
+    print(f"Exportação de tendências: {df_trend.height} pontos")
+
+
+if __name__ == "__main__":
+
+    print("Execute o script através da GUI!")
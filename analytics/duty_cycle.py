@@ -0,0 +1,80 @@
+"""Perfil de operação (Load x RPM) por ativo e mês: horas e combustível por faixa"""
+
+import polars as pl
+from io_rfvbi import (
+    filter_periods,
+    is_sorted,
+    merge_incremental,
+    optional_col,
+    touched_periods,
+)
+
+LOAD_BIN = 10
+RPM_BIN = 100
+MAX_SAMPLE_GAP_S = 15 * 60
+
+
+def compute_duty_cycle(df: pl.DataFrame) -> pl.DataFrame:
+    """Histograma 2D de carga e rotação com tempo e combustível por faixa
+    Cada amostra vale o intervalo até a próxima, limitado a MAX_SAMPLE_GAP_S
+    """
+    df = df.select("Asset", "Timestamp", "Load", "RPM", optional_col(df, "Fuel_Rate"))
+    if not is_sorted(df):
+        df = df.sort(["Asset", "Timestamp"])
+
+    next_in_asset = pl.col("Asset") == pl.col("Asset").shift(-1)
+    hours = (
+        pl.when(next_in_asset)
+        .then(pl.col("Timestamp").shift(-1) - pl.col("Timestamp"))
+        .dt.total_seconds()
+        .clip(0, MAX_SAMPLE_GAP_S)
+        .fill_null(0)
+        / 3600
+    )
+
+    return (
+        df.with_columns(hours.alias("Hours"))
+        .drop_nulls(["Load", "RPM"])
+        .group_by(
+            "Asset",
+            pl.col("Timestamp").dt.month_start().dt.date().alias("Month"),
+            ((pl.col("Load") // LOAD_BIN) * LOAD_BIN).cast(pl.Int64).alias("Load_Bin"),
+            ((pl.col("RPM") // RPM_BIN) * RPM_BIN).cast(pl.Int64).alias("RPM_Bin"),
+        )
+        .agg(
+            pl.len().alias("Samples"),
+            pl.col("Hours").sum(),
+            (pl.col("Fuel_Rate") * pl.col("Hours")).sum().alias("Fuel_L"),
+        )
+    )
+
+
+def run(df_full: pl.DataFrame, df_current: pl.DataFrame, path_holder) -> None:
+    """Recalcula somente os meses tocados e atualiza a saída"""
+    if df_current.is_empty() or not {"Load", "RPM"} <= set(df_full.columns):
+        return
+
+    df_src = filter_periods(
+        df_full, touched_periods(df_current, ["Asset"], "1mo"), ["Asset"], "1mo"
+    )
+    df_duty = compute_duty_cycle(df_src)
+
+    df_duty = merge_incremental(
+        path_holder.duty_cycle,
+        df_duty,
+        keys=["Asset", "Month"],
+        schema={
+            "Month": pl.Date,
+            "Asset": pl.String,
+            "Load_Bin": pl.Int64,
+            "RPM_Bin": pl.Int64,
+            "Samples": pl.Int64,
+        },
+        sort_by=["Asset", "Month", "Load_Bin", "RPM_Bin"],
+    )
+    print(f"Perfil de operação: {df_duty.height} faixas")
+
+
+if __name__ == "__main__":
+
+    print("Execute o script através da GUI!")
@@ -0,0 +1,141 @@
+"""Frequência, recorrência e rajadas de eventos por ativo, código e severidade
+Os intervalos entre ocorrências saem de diffs sobre os eventos ordenados por
+chave e tempo; somente os períodos tocados por eventos novos são reagregados
+"""
+
+import os
+from datetime import timedelta
+import polars as pl
+from io_rfvbi import filter_periods, merge_incremental, read_output, touched_periods
+
+KEYS = ["Asset", "Code", "Severity"]
+TIERS = {"1d": "event_rates_daily", "1mo": "event_rates_monthly"}
+BURST_GAP = timedelta(minutes=10)
+BURST_MIN_EVENTS = 3
+
+EVENT_SCHEMA = {
+    "Timestamp": pl.Datetime,
+    "Asset": pl.String,
+    "Code": pl.String,
+    "Severity": pl.String,
+}
+OUTPUT_SCHEMA = {
+    "Period": pl.Date,
+    "Asset": pl.String,
+    "Code": pl.String,
+    "Severity": pl.String,
+    "Events": pl.Int64,
+    "Bursts": pl.Int64,
+    "Burst_Events": pl.Int64,
+}
+
+
+def recurrence(df_events: pl.DataFrame) -> pl.DataFrame:
+    """Intervalo até a ocorrência anterior da mesma chave e rajada de cada evento
+    Rajada: sequência com intervalos <= BURST_GAP e pelo menos BURST_MIN_EVENTS
+    """
+    df = (
+        df_events.select(*KEYS, "Timestamp")
+        .with_columns(pl.col(KEYS).cast(pl.String))
+        .drop_nulls(["Asset", "Code", "Timestamp"])
+        .sort(*KEYS, "Timestamp")
+    )
+
+    same_key = pl.all_horizontal(
+        pl.col(col).eq_missing(pl.col(col).shift()) for col in KEYS
+    )
+    gap = pl.when(same_key).then(pl.col("Timestamp").diff())
+    df = df.with_columns(
+        (gap.dt.total_seconds() / 3600).alias("Gap_h"),
+        (~same_key | (gap > BURST_GAP)).cum_sum().alias("Chain"),
+    )
+
+    return df.with_columns(
+        (pl.len().over("Chain") >= BURST_MIN_EVENTS).alias("In_Burst"),
+        pl.col("Timestamp").min().over("Chain").alias("Chain_Start"),
+    ).with_columns(
+        (pl.col("In_Burst") & (pl.col("Timestamp") == pl.col("Chain_Start"))).alias(
+            "Burst_Start"
+        )
+    )
+
+
+def compute_rates(df: pl.DataFrame, every: str) -> pl.DataFrame:
+    """Contagens, estatísticas de intervalo e rajadas por chave e período"""
+    return (
+        df.group_by(
+            *KEYS, pl.col("Timestamp").dt.truncate(every).dt.date().alias("Period")
+        )
+        .agg(
+            pl.len().alias("Events"),
+            pl.col("Burst_Start").sum().alias("Bursts"),
+            pl.col("In_Burst").sum().alias("Burst_Events"),
+            pl.col("Gap_h").mean().alias("Mean_Gap_h"),
+            pl.col("Gap_h").median().alias("Median_Gap_h"),
+            pl.col("Gap_h").min().alias("Min_Gap_h"),
+        )
+        .select(*OUTPUT_SCHEMA, "Mean_Gap_h", "Median_Gap_h", "Min_Gap_h")
+        .with_columns([pl.col(col).cast(dtype) for col, dtype in OUTPUT_SCHEMA.items()])
+    )
+
+
+def touched_events(df: pl.DataFrame, df_new: pl.DataFrame) -> pl.DataFrame:
+    """Eventos cujas métricas mudam com os eventos novos: todos os membros das
+    rajadas que eles formam ou prolongam e a ocorrência seguinte de cada um,
+    cujo intervalo até a anterior muda
+    """
+    df_new = df_new.select(
+        *[pl.col(col).cast(pl.String) for col in KEYS],
+        pl.col("Timestamp").cast(pl.Datetime("us")).dt.truncate("1s"),
+    ).unique()
+
+    same_key_next = pl.all_horizontal(
+        pl.col(col).eq_missing(pl.col(col).shift(-1)) for col in KEYS
+    )
+    df = df.with_columns(
+        pl.when(same_key_next).then(pl.col("Timestamp").shift(-1)).alias("Next")
+    )
+    df_touched = df.join(df_new, on=[*KEYS, "Timestamp"], how="semi", join_nulls=True)
+
+    return pl.concat(
+        [
+            df.filter(pl.col("Chain").is_in(df_touched["Chain"])).select(
+                *KEYS, "Timestamp"
+            ),
+            df_touched.select(*KEYS, pl.col("Next").alias("Timestamp")),
+        ]
+    )
+
+
+def run(path_holder, df_new: pl.DataFrame | None = None) -> None:
+    """Atualiza as saídas diária e mensal
+    df_new: eventos recebidos nesta execução; sem saída anterior tudo é recalculado
+    """
+    df_events = read_output(path_holder.event_output, EVENT_SCHEMA)
+    if df_events is None or df_events.is_empty():
+        return
+
+    df = recurrence(df_events)
+    df_affected = touched_events(df, df_new) if df_new is not None else None
+    for every, attr in TIERS.items():
+        path = getattr(path_holder, attr)
+
+        df_src = df
+        if df_affected is not None and os.path.isfile(path):
+            df_src = filter_periods(
+                df, touched_periods(df_affected, KEYS, every), KEYS, every
+            )
+
+        df_rates = merge_incremental(
+            path,
+            compute_rates(df_src, every),
+            keys=[*KEYS, "Period"],
+            schema=OUTPUT_SCHEMA,
+            sort_by=["Asset", "Period", "Code", "Severity"],
+        )
+        print(f"Recorrência de eventos {every}: {df_rates.height} linhas")
+
+
+if __name__ == "__main__":
+
+    print("Execute o script através da GUI!")
@@ -0,0 +1,185 @@
+"""Contexto de motor para cada evento
+Cada evento recebe a última leitura anterior dos sensores principais e o
+mínimo/máximo de cada um na janela em torno do evento, com um único join
+as-of por ativo sobre toda a frota
+"""
+
+from datetime import timedelta
+import polars as pl
+from history_store import get_history
+from io_rfvbi import read_output, write_csv_atomic
+
+SNAPSHOT_COLUMNS = [
+    "Load",
+    "RPM",
+    "Coolant_Temp",
+    "Oil_Press",
+    "EXH_L",
+    "EXH_R",
+    "EXH_DIFF",
+    "Diff_Temp_Cilindro",
+]
+WINDOW_BEFORE = timedelta(minutes=30)
+WINDOW_AFTER = timedelta(minutes=30)
+MAX_SNAPSHOT_AGE = timedelta(minutes=15)
+
+EVENT_SCHEMA = {
+    "Timestamp": pl.Datetime,
+    "Asset": pl.String,
+    "Code": pl.String,
+    "Description": pl.String,
+    "Severity": pl.String,
+    "Source": pl.String,
+    "Type": pl.String,
+}
+
+
+def __nearest_prior(
+    df_events: pl.DataFrame, df_engine: pl.DataFrame, tolerance: timedelta
+) -> pl.DataFrame:
+    """Última leitura de cada ativo até o instante do evento"""
+    return df_events.select("Event_Row", "Asset", "Timestamp").join_asof(
+        df_engine.with_columns(pl.col("Timestamp").alias("Snapshot_Time")),
+        on="Timestamp",
+        by="Asset",
+        strategy="backward",
+        tolerance=tolerance,
+    )
+
+
+def __window_extremes(
+    df_events: pl.DataFrame,
+    df_engine: pl.DataFrame,
+    list_channels: list[str],
+    before: timedelta,
+    after: timedelta,
+) -> pl.DataFrame:
+    """Mínimo e máximo de cada canal em [evento - before, evento + after]
+    Um marcador por evento é inserido em evento + after entre as leituras e a
+    janela móvel de before + after terminando nele cobre o intervalo todo.
+    Nulos viram ±inf (rolling_*_by não aceita nulos) e voltam a nulo no fim
+    """
+    window = before + after
+    df_markers = df_events.select(
+        "Event_Row", "Asset", (pl.col("Timestamp") + after).alias("Timestamp")
+    )
+
+    # Só as leituras dentro da janela de algum evento entram no cálculo móvel
+    df_engine = (
+        df_engine.join_asof(
+            df_markers.select(
+                "Asset", "Timestamp", pl.col("Timestamp").alias("Marker_Time")
+            ),
+            on="Timestamp",
+            by="Asset",
+            strategy="forward",
+        )
+        .filter(pl.col("Marker_Time") - pl.col("Timestamp") <= window)
+        .drop("Marker_Time")
+    )
+    df = pl.concat([df_engine, df_markers], how="diagonal_relaxed").sort(
+        "Asset", "Timestamp", pl.col("Event_Row").is_not_null()
+    )
+
+    df = df.with_columns(
+        [
+            expr
+            for col in list_channels
+            for expr in (
+                pl.col(col)
+                .fill_null(float("inf"))
+                .rolling_min_by("Timestamp", window, closed="both")
+                .over("Asset")
+                .alias(f"{col}_min"),
+                pl.col(col)
+                .fill_null(float("-inf"))
+                .rolling_max_by("Timestamp", window, closed="both")
+                .over("Asset")
+                .alias(f"{col}_max"),
+            )
+        ]
+    )
+
+    list_extremes = [
+        f"{col}_{stat}" for col in list_channels for stat in ("min", "max")
+    ]
+    return df.filter(pl.col("Event_Row").is_not_null()).select(
+        "Event_Row",
+        *[
+            pl.when(pl.col(col).is_infinite())
+            .then(None)
+            .otherwise(pl.col(col))
+            .alias(col)
+            for col in list_extremes
+        ],
+    )
+
+
+def attach_snapshots(
+    df_events: pl.DataFrame,
+    df_engine: pl.DataFrame,
+    before: timedelta = WINDOW_BEFORE,
+    after: timedelta = WINDOW_AFTER,
+    tolerance: timedelta = MAX_SNAPSHOT_AGE,
+) -> pl.DataFrame:
+    """Eventos com a leitura anterior e os extremos da janela de cada canal
+    df_engine deve estar ordenado por ativo e tempo (como o get_history)
+    """
+    list_channels = [col for col in SNAPSHOT_COLUMNS if col in df_engine.columns]
+    df_events = df_events.with_columns(pl.col("Asset").cast(pl.String))
+    if not list_channels or df_events.is_empty():
+        return df_events
+
+    df_engine = df_engine.select(
+        pl.col("Asset").cast(pl.String),
+        "Timestamp",
+        *[pl.col(col).cast(pl.Float64) for col in list_channels],
+    ).drop_nulls("Timestamp")
+    df_events = (
+        df_events.drop_nulls(["Asset", "Timestamp"])
+        .sort("Asset", "Timestamp")
+        .with_row_index("Event_Row")
+    )
+
+    df_prior = __nearest_prior(df_events, df_engine, tolerance).select(
+        "Event_Row",
+        "Snapshot_Time",
+        (pl.col("Timestamp") - pl.col("Snapshot_Time"))
+        .dt.total_seconds()
+        .alias("Snapshot_Age_s"),
+        *list_channels,
+    )
+    df_extremes = __window_extremes(df_events, df_engine, list_channels, before, after)
+
+    return (
+        df_events.join(df_prior, on="Event_Row", how="left")
+        .join(df_extremes, on="Event_Row", how="left")
+        .drop("Event_Row")
+    )
+
+
+def run(path_holder) -> None:
+    """Recalcula o contexto de todos os eventos com o histórico indexado"""
+    df_events = read_output(path_holder.event_output, EVENT_SCHEMA)
+    if df_events is None:
+        return
+    df_events = df_events.drop_nulls(["Asset", "Timestamp"])
+    if df_events.is_empty():
+        return
+
+    df_engine = get_history(
+        path_holder.history_store,
+        assets=sorted(df_events["Asset"].drop_nulls().unique()),
+        start=df_events["Timestamp"].min() - WINDOW_BEFORE,
+        end=df_events["Timestamp"].max() + WINDOW_AFTER + timedelta(seconds=1),
+        columns=SNAPSHOT_COLUMNS,
+    )
+    df_snapshots = attach_snapshots(df_events, df_engine)
+
+    write_csv_atomic(df_snapshots, path_holder.event_snapshots)
+    print(f"Contexto de eventos: {df_snapshots.height} eventos")
+
+
+if __name__ == "__main__":
+
+    print("Execute o script através da GUI!")
@@ -0,0 +1,162 @@
+"""Conferência entre a integral do Fuel_Rate e o contador Total_Fuel
+O Fuel_Rate (L/h) é integrado pela regra do trapézio entre amostras
+consecutivas do mesmo ativo; o contador (já corrigido) é somado nos mesmos
+trechos, de modo que falhas de log acima de MAX_SAMPLE_GAP_S ficam fora dos
+dois lados da comparação
+"""
+
+import polars as pl
+import counters
+from io_rfvbi import merge_incremental, write_csv_atomic
+from . import sessions
+
+MAX_SAMPLE_GAP_S = 15 * 60
+MIN_COUNTER_L = 50.0
+MAX_DEVIATION = 0.1
+
+DAILY_SCHEMA = {
+    "Date": pl.Date,
+    "Asset": pl.String,
+    "Flag": pl.Int64,
+}
+SESSION_SCHEMA = {
+    "Asset": pl.String,
+    "Session_Start": pl.Datetime,
+    "State": pl.String,
+    "Flag": pl.Int64,
+}
+
+
+def segments(df: pl.DataFrame) -> pl.DataFrame:
+    """Trechos entre amostras consecutivas com o combustível integrado e o
+    delta do contador; df ordenado por ativo e tempo, contador já corrigido
+    """
+    next_in_asset = pl.col("Asset") == pl.col("Asset").shift(-1)
+    seconds = (pl.col("Timestamp").shift(-1) - pl.col("Timestamp")).dt.total_seconds()
+    valid = next_in_asset & (seconds > 0) & (seconds <= MAX_SAMPLE_GAP_S)
+
+    integrated = (
+        (pl.col("Fuel_Rate") + pl.col("Fuel_Rate").shift(-1)) / 2 * seconds / 3600
+    )
+    counter = pl.col("Total_Fuel").shift(-1) - pl.col("Total_Fuel")
+    both = valid & integrated.is_not_null() & counter.is_not_null()
+
+    return df.with_columns(
+        pl.when(both).then(seconds / 3600).alias("Hours"),
+        pl.when(both).then(integrated).alias("Integrated_L"),
+        pl.when(both).then(counter).alias("Counter_L"),
+    )
+
+
+def __summary() -> list[pl.Expr]:
+    """Totais e razão integral / contador de um agrupamento"""
+    ratio = pl.col("Integrated_L").sum() / pl.col("Counter_L").sum()
+    return [
+        pl.col("Hours").sum().alias("Hours"),
+        pl.col("Integrated_L").sum().alias("Integrated_L"),
+        pl.col("Counter_L").sum().alias("Counter_L"),
+        pl.when(pl.col("Counter_L").sum() > 0).then(ratio).alias("Ratio"),
+        (
+            (pl.col("Counter_L").sum() >= MIN_COUNTER_L)
+            & ((ratio - 1).abs() > MAX_DEVIATION)
+        )
+        .cast(pl.Int64)
+        .alias("Flag"),
+    ]
+
+
+def compute_daily(df_seg: pl.DataFrame) -> pl.DataFrame:
+    """Conferência por ativo e dia (dia do início de cada trecho)"""
+    return (
+        df_seg.group_by("Asset", pl.col("Timestamp").dt.date().alias("Date"))
+        .agg(__summary())
+        .select("Date", "Asset", pl.exclude("Date", "Asset"))
+    )
+
+
+def compute_sessions(df_seg: pl.DataFrame, df_sessions: pl.DataFrame) -> pl.DataFrame:
+    """Conferência por sessão de operação"""
+    return (
+        sessions.attach_state(df_seg, df_sessions)
+        .drop_nulls("Session_Start")
+        .group_by("Asset", "Session_Start", "State")
+        .agg(__summary())
+    )
+
+
+def run(df_full: pl.DataFrame, df_current: pl.DataFrame, path_holder) -> None:
+    """Recalcula a partir do primeiro dia com dados novos de cada ativo (e do
+    início da sessão em andamento nesse dia)
+    """
+    if df_current.is_empty() or not {"Fuel_Rate", "Total_Fuel"} <= set(df_full.columns):
+        return
+
+    df_sessions = sessions.read_sessions(path_holder)
+    df_recalc = (
+        df_current.group_by(pl.col("Asset").cast(pl.String))
+        .agg(pl.col("Timestamp").min().dt.truncate("1d").alias("Recalc_Start"))
+        .drop_nulls()
+        .join(df_sessions.select("Asset", "Start", "End"), on="Asset", how="left")
+        .group_by("Asset", "Recalc_Start")
+        .agg(
+            pl.col("Start")
+            .filter(pl.col("End") >= pl.col("Recalc_Start"))
+            .min()
+            .alias("Session_Start")
+        )
+        .with_columns(
+            pl.min_horizontal("Recalc_Start", "Session_Start").alias("Src_Start")
+        )
+    )
+
+    df_src = (
+        df_full.select(
+            pl.col("Asset").cast(pl.String), "Timestamp", "Fuel_Rate", "Total_Fuel"
+        )
+        .join(df_recalc.select("Asset", "Src_Start"), on="Asset", how="inner")
+        .filter(pl.col("Timestamp") >= pl.col("Src_Start"))
+        .drop("Src_Start")
+    )
+    df_src, _ = counters.repair(df_src)
+    df_seg = segments(df_src).join(
+        df_recalc.select("Asset", "Recalc_Start"), on="Asset", how="left"
+    )
+
+    df_daily = merge_incremental(
+        path_holder.fuel_check_daily,
+        compute_daily(df_seg.filter(pl.col("Timestamp") >= pl.col("Recalc_Start"))),
+        keys=["Asset", "Date"],
+        schema=DAILY_SCHEMA,
+        sort_by=["Asset", "Date"],
+    )
+
+    df_by_session = compute_sessions(
+        df_seg,
+        df_sessions.join(df_recalc, on="Asset", how="inner").filter(
+            pl.col("End") >= pl.col("Recalc_Start")
+        ),
+    )
+    df_by_session = merge_incremental(
+        path_holder.fuel_check_sessions,
+        df_by_session,
+        keys=["Asset", "Session_Start"],
+        schema=SESSION_SCHEMA,
+        sort_by=["Asset", "Session_Start"],
+    )
+
+    # Sessões refeitas (ex.: unidas por dados retroativos) deixam linhas órfãs
+    df_kept = df_by_session.join(
+        df_sessions.select("Asset", pl.col("Start").alias("Session_Start")),
+        on=["Asset", "Session_Start"],
+        how="semi",
+    )
+    if df_kept.height < df_by_session.height:
+        write_csv_atomic(df_kept, path_holder.fuel_check_sessions)
+
+    n_flags = df_daily["Flag"].sum()
+    print(f"Conferência de combustível: {n_flags} dia(s) com divergência")
+
+
+if __name__ == "__main__":
+
+    print("Execute o script através da GUI!")
@@ -0,0 +1,65 @@
+"""Reamostragem do histórico de motores em uma grade de tempo uniforme por ativo"""
+
+import polars as pl
+
+MAX_FILL_PERIODS = 3
+COUNTER_COLS = ("SMH", "Total_Fuel")
+ID_COLS = ("Timestamp", "Asset")
+
+
+def aggregate_dense(df: pl.DataFrame, every: str) -> pl.DataFrame:
+    """Agrega períodos com mais de uma amostra por célula da grade
+    Média para sinais, último valor para contadores e colunas não numéricas
+    """
+    list_exprs = [pl.len().alias("Samples")]
+    for col, dtype in df.schema.items():
+        if col in ID_COLS:
+            continue
+        if dtype.is_numeric() and col not in COUNTER_COLS:
+            list_exprs.append(pl.col(col).mean())
+        else:
+            list_exprs.append(pl.col(col).drop_nulls().last())
+
+    return (
+        df.sort(["Asset", "Timestamp"])
+        .group_by_dynamic("Timestamp", every=every, group_by="Asset")
+        .agg(list_exprs)
+    )
+
+
+def fill_gaps(df: pl.DataFrame, every: str, max_fill: int) -> pl.DataFrame:
+    """Completa a grade e propaga o último valor por até max_fill células
+    Células além do limite (motor desligado, sem log) são descartadas
+    """
+    list_channels = [col for col in df.columns if col not in ID_COLS + ("Samples",)]
+
+    df = (
+        df.upsample("Timestamp", every=every, group_by="Asset", maintain_order=True)
+        .with_columns(
+            pl.col("Asset").forward_fill(),
+            pl.col("Samples").fill_null(0),
+        )
+        .with_columns(pl.col(list_channels).forward_fill(limit=max_fill).over("Asset"))
+    )
+    return df.filter(pl.any_horizontal(pl.col(list_channels).is_not_null()))
+
+
+def resample(
+    df: pl.DataFrame, every: str, max_fill: int = MAX_FILL_PERIODS
+) -> pl.DataFrame:
+    """Alinha todos os ativos à grade every (ex.: "5m") de forma vetorizada
+    Samples indica quantas leituras originais compõem cada célula (0 = preenchida)
+    """
+    if df.is_empty():
+        return df
+
+    df = df.with_columns(pl.col("Asset").cast(pl.String))
+    df_grid = fill_gaps(aggregate_dense(df, every), every, max_fill)
+
+    print(f"Reamostragem {every}: {df.height} -> {df_grid.height} linhas")
+    return df_grid
+
+
+if __name__ == "__main__":
+
+    print("Execute o script através da GUI!")
@@ -0,0 +1,73 @@
+"""Agregações horárias e diárias do histórico de motores para o Power BI"""
+
+import polars as pl
+from io_rfvbi import filter_periods, merge_incremental, touched_periods
+
+TIERS = {"1h": "eng_hourly", "1d": "eng_daily"}
+ID_COLS = ("Timestamp", "Asset")
+
+
+def channel_cols(df: pl.DataFrame) -> list[str]:
+    """Colunas numéricas do histórico"""
+    return [
+        col
+        for col, dtype in df.schema.items()
+        if col not in ID_COLS and dtype.is_numeric()
+    ]
+
+
+def compute_rollup(df: pl.DataFrame, every: str) -> pl.DataFrame:
+    """Calcula min/média/máx/último por canal, ativo e período"""
+    list_channels = channel_cols(df)
+
+    return (
+        df.sort(["Asset", "Timestamp"])
+        .group_by_dynamic("Timestamp", every=every, group_by="Asset")
+        .agg(
+            [pl.len().alias("Samples")]
+            + [
+                expr
+                for col in list_channels
+                for expr in (
+                    pl.col(col).min().alias(f"{col}_min"),
+                    pl.col(col).mean().alias(f"{col}_mean"),
+                    pl.col(col).max().alias(f"{col}_max"),
+                    pl.col(col).drop_nulls().last().alias(f"{col}_last"),
+                )
+            ]
+        )
+    )
+
+
+def update_tier(
+    df_full: pl.DataFrame, df_current: pl.DataFrame, every: str, path: str
+) -> pl.DataFrame:
+    """Recalcula somente os períodos tocados pelos dados novos"""
+    df_src = filter_periods(
+        df_full, touched_periods(df_current, ["Asset"], every), ["Asset"], every
+    )
+    df_rollup = compute_rollup(df_src, every)
+
+    return merge_incremental(
+        path,
+        df_rollup,
+        keys=["Asset", "Timestamp"],
+        schema={"Timestamp": pl.Datetime, "Asset": pl.String},
+    )
+
+
+def run(df_full, df_current, path_holder) -> None:
+    """Atualiza as camadas horária e diária"""
+    if df_current.is_empty():
+        return
+
+    for every, attname in TIERS.items():
+        df_rollup = update_tier(
+            df_full, df_current, every, getattr(path_holder, attname)
+        )
+        print(f"Agregação {every}: {df_rollup.height} linhas")
+
+
+if __name__ == "__main__":
+
+    print("Execute o script através da GUI!")
@@ -0,0 +1,163 @@
+"""Segmentação do histórico em sessões de operação, marcha lenta e desligado
+Cada amostra recebe um estado pelos limites de RPM e carga e sequências do
+mesmo estado (run-length) viram sessões. Outras etapas filtram por estado
+com attach_state, um join as-of na tabela de sessões, sem reprocessar o
+histórico bruto
+"""
+
+import polars as pl
+import counters
+from io_rfvbi import in_recalc, merge_from, optional_col, read_output, recalc_starts
+
+OFF_RPM = 100
+IDLE_LOAD = 15
+MAX_SAMPLE_GAP_S = 15 * 60
+
+OUTPUT_SCHEMA = {
+    "Asset": pl.String,
+    "State": pl.String,
+    "Start": pl.Datetime,
+    "End": pl.Datetime,
+    "Samples": pl.Int64,
+}
+
+
+def __state() -> pl.Expr:
+    """Estado de cada amostra; sem RPM a amostra fica sem estado e sem carga
+    a amostra com rotação conta como operação
+    """
+    return (
+        pl.when(pl.col("RPM") < OFF_RPM)
+        .then(pl.lit("Off"))
+        .when(pl.col("Load") < IDLE_LOAD)
+        .then(pl.lit("Idle"))
+        .when(pl.col("RPM").is_not_null())
+        .then(pl.lit("Run"))
+    )
+
+
+def label_samples(df: pl.DataFrame) -> pl.DataFrame:
+    """Estado, sessão e duração (h) de cada amostra
+    Uma sessão termina na troca de ativo ou de estado e em falhas de log
+    acima de MAX_SAMPLE_GAP_S. df deve estar ordenado por ativo e tempo
+    """
+    same_asset = pl.col("Asset") == pl.col("Asset").shift()
+    gap_s = (pl.col("Timestamp") - pl.col("Timestamp").shift()).dt.total_seconds()
+    next_in_asset = pl.col("Asset") == pl.col("Asset").shift(-1)
+
+    df = df.with_columns(__state().alias("State")).filter(pl.col("State").is_not_null())
+    return df.with_columns(
+        (
+            ~same_asset
+            | (pl.col("State") != pl.col("State").shift())
+            | (gap_s > MAX_SAMPLE_GAP_S)
+        )
+        .fill_null(True)
+        .cum_sum()
+        .alias("Session"),
+        (
+            pl.when(next_in_asset)
+            .then(pl.col("Timestamp").shift(-1) - pl.col("Timestamp"))
+            .dt.total_seconds()
+            .clip(0, MAX_SAMPLE_GAP_S)
+            .fill_null(0)
+            / 3600
+        ).alias("Hours"),
+    )
+
+
+def compute_sessions(df: pl.DataFrame) -> pl.DataFrame:
+    """Tabela de sessões com duração, combustível, SMH e estatísticas de carga
+    Os deltas de SMH e Total_Fuel saem dos contadores já corrigidos
+    """
+    df = df.select(
+        pl.col("Asset").cast(pl.String),
+        "Timestamp",
+        "RPM",
+        *[optional_col(df, col) for col in ("Load", "Fuel_Rate", "SMH", "Total_Fuel")],
+    )
+    # Deltas dos contadores sobre os valores corrigidos (picos e zeramentos)
+    df, _ = counters.repair(df)
+
+    return (
+        label_samples(df)
+        .group_by("Session")
+        .agg(
+            pl.col("Asset").first(),
+            pl.col("State").first(),
+            pl.col("Timestamp").first().alias("Start"),
+            pl.col("Timestamp").last().alias("End"),
+            pl.len().alias("Samples"),
+            pl.col("Hours").sum().alias("Duration_h"),
+            (pl.col("Fuel_Rate") * pl.col("Hours")).sum().alias("Fuel_L"),
+            (pl.col("Total_Fuel").max() - pl.col("Total_Fuel").min()).alias(
+                "Total_Fuel_Delta"
+            ),
+            (pl.col("SMH").max() - pl.col("SMH").min()).alias("SMH_Delta"),
+            pl.col("Load").mean().alias("Load_Mean"),
+            pl.col("Load").max().alias("Load_Max"),
+            pl.col("Load").std().alias("Load_Std"),
+            pl.col("RPM").mean().alias("RPM_Mean"),
+        )
+        .drop("Session")
+        .with_columns([pl.col(col).cast(dtype) for col, dtype in OUTPUT_SCHEMA.items()])
+    )
+
+
+def read_sessions(path_holder) -> pl.DataFrame:
+    """Tabela de sessões gravada (vazia se ainda não existir)"""
+    df_sessions = read_output(path_holder.sessions, OUTPUT_SCHEMA)
+    if df_sessions is None:
+        return pl.DataFrame(schema=OUTPUT_SCHEMA)
+    return df_sessions
+
+
+def attach_state(df: pl.DataFrame, df_sessions: pl.DataFrame) -> pl.DataFrame:
+    """Adiciona State e Session_Start às amostras pela tabela de sessões
+    Amostras fora de qualquer sessão ficam com ambos nulos
+    """
+    df_sessions = df_sessions.select(
+        "Asset",
+        pl.col("Start").alias("Timestamp"),
+        pl.col("Start").alias("Session_Start"),
+        "End",
+        "State",
+    ).sort("Asset", "Timestamp")
+    inside = pl.col("Timestamp") <= pl.col("End")
+    return (
+        df.with_columns(pl.col("Asset").cast(pl.String))
+        .sort("Asset", "Timestamp")
+        .join_asof(df_sessions, on="Timestamp", by="Asset", strategy="backward")
+        .with_columns(
+            pl.when(inside).then(pl.col("State")).alias("State"),
+            pl.when(inside).then(pl.col("Session_Start")).alias("Session_Start"),
+        )
+        .drop("End")
+    )
+
+
+def run(df_full: pl.DataFrame, df_current: pl.DataFrame, path_holder) -> None:
+    """Recalcula as sessões a partir da primeira que os dados novos alcançam
+    (ou prolongam); as anteriores ficam como estão
+    """
+    if df_current.is_empty() or "RPM" not in df_full.columns:
+        return
+
+    df_old = read_sessions(path_holder)
+    df_recalc = recalc_starts(df_current, df_old, MAX_SAMPLE_GAP_S)
+    df_src = df_full.with_columns(pl.col("Asset").cast(pl.String)).filter(
+        in_recalc(df_recalc)
+    )
+    df_sessions = merge_from(
+        path_holder.sessions,
+        df_old,
+        compute_sessions(df_src),
+        df_recalc,
+        sort_by=["Asset", "Start"],
+    )
+    print(f"Sessões: {df_sessions.height}")
+
+
+if __name__ == "__main__":
+
+    print("Execute o script através da GUI!")
@@ -0,0 +1,281 @@
+"""Segmentação das viagens e estadias em porto pelos canais de GPS
+Amostras abaixo de PORT_SPEED_KMH por pelo menos MIN_PORT_STAY_S formam uma
+estadia e deslocamentos mais curtos que MIN_VOYAGE_S (manobra, troca de
+berço) ficam nela; o resto é viagem, e falhas de log acima de MAX_VOYAGE_GAP_S encerram
+o trecho. Distância por haversine entre posições consecutivas, combustível e
+horas de motor por trecho e uma grade espacial por ativo e mês para mapas de
+calor, tudo em expressões sobre o histórico da frota inteira
+"""
+
+import polars as pl
+import counters
+from io_rfvbi import (
+    filter_periods,
+    in_recalc,
+    merge_from,
+    merge_incremental,
+    optional_col,
+    read_output,
+    recalc_starts,
+    touched_periods,
+)
+
+PORT_SPEED_KMH = 2.0
+MIN_PORT_STAY_S = 30 * 60
+MIN_VOYAGE_S = 20 * 60
+MAX_VOYAGE_GAP_S = 6 * 3600
+MAX_SAMPLE_GAP_S = 15 * 60
+MAX_LEG_SPEED_KMH = 100.0
+EARTH_RADIUS_KM = 6371.0088
+GRID_DEG = 0.05
+
+GPS_COLUMNS = ["Latitude", "Longitude", "Vessel_Speed"]
+
+VOYAGE_SCHEMA = {
+    "Asset": pl.String,
+    "Type": pl.String,
+    "Start": pl.Datetime,
+    "End": pl.Datetime,
+    "Samples": pl.Int64,
+}
+GRID_SCHEMA = {
+    "Month": pl.Date,
+    "Asset": pl.String,
+    "Samples": pl.Int64,
+}
+
+
+def haversine_km(lat1: pl.Expr, lon1: pl.Expr, lat2: pl.Expr, lon2: pl.Expr) -> pl.Expr:
+    """Distância em km entre dois pontos (graus) sobre a esfera"""
+    dlat = (lat2 - lat1).radians()
+    dlon = (lon2 - lon1).radians()
+    a = (dlat / 2).sin() ** 2 + lat1.radians().cos() * lat2.radians().cos() * (
+        dlon / 2
+    ).sin() ** 2
+    return 2 * EARTH_RADIUS_KM * a.sqrt().clip(upper_bound=1).arcsin()
+
+
+def __valid_position() -> pl.Expr:
+    """Posição presente, dentro dos limites e fora do (0, 0) de GPS sem sinal"""
+    lat, lon = pl.col("Latitude"), pl.col("Longitude")
+    return (
+        lat.is_between(-90, 90) & lon.is_between(-180, 180) & ~((lat == 0) & (lon == 0))
+    ).fill_null(False)
+
+
+def label_samples(df: pl.DataFrame) -> pl.DataFrame:
+    """Trecho (Segment), tipo, horas e distância (km) de cada amostra
+    df deve estar ordenado por ativo e tempo; amostras sem velocidade ficam fora
+    """
+    df = df.filter(pl.col("Vessel_Speed").is_not_null()).with_columns(
+        # Id inteiro do ativo: comparações sem custo de texto
+        (pl.col("Asset") != pl.col("Asset").shift())
+        .fill_null(True)
+        .cum_sum()
+        .alias("Asset_Id"),
+        pl.when(__valid_position()).then(pl.col("Latitude")).alias("Latitude"),
+        pl.when(__valid_position()).then(pl.col("Longitude")).alias("Longitude"),
+        (pl.col("Vessel_Speed") >= PORT_SPEED_KMH).alias("Moving"),
+    )
+
+    same_asset = pl.col("Asset_Id") == pl.col("Asset_Id").shift()
+    gap_s = (pl.col("Timestamp") - pl.col("Timestamp").shift()).dt.total_seconds()
+    df = df.with_columns(
+        (~same_asset | (gap_s > MAX_VOYAGE_GAP_S)).fill_null(True).alias("Break"),
+        gap_s.alias("Gap_s"),
+    )
+
+    # Sequências paradas curtas (fundeio, eclusa, manobra) seguem na viagem
+    df = df.with_columns(
+        (pl.col("Break") | (pl.col("Moving") != pl.col("Moving").shift()))
+        .fill_null(True)
+        .cum_sum()
+        .alias("Run")
+    )
+    stay_s = (
+        (pl.col("Timestamp").last() - pl.col("Timestamp").first())
+        .over("Run")
+        .dt.total_seconds()
+    )
+    df = df.with_columns(
+        (~pl.col("Moving") & (stay_s >= MIN_PORT_STAY_S)).alias("Port")
+    ).with_columns(
+        (pl.col("Break") | (pl.col("Port") != pl.col("Port").shift()))
+        .fill_null(True)
+        .cum_sum()
+        .alias("Run"),
+        (~pl.col("Break") & pl.col("Port").shift())
+        .fill_null(False)
+        .alias("After_Port"),
+    )
+
+    # Deslocamentos curtos logo após uma estadia (manobra no porto) seguem nela
+    df = df.with_columns(
+        (
+            pl.col("Port")
+            | ((stay_s < MIN_VOYAGE_S) & pl.col("After_Port").first().over("Run"))
+        ).alias("Port")
+    )
+
+    next_in_asset = pl.col("Asset_Id") == pl.col("Asset_Id").shift(-1)
+    same_segment = pl.col("Segment") == pl.col("Segment").shift()
+    leg_km = haversine_km(
+        pl.col("Latitude").shift(),
+        pl.col("Longitude").shift(),
+        pl.col("Latitude"),
+        pl.col("Longitude"),
+    )
+    df = df.with_columns(
+        (pl.col("Break") | (pl.col("Port") != pl.col("Port").shift()))
+        .fill_null(True)
+        .cum_sum()
+        .alias("Segment"),
+        (
+            pl.when(next_in_asset)
+            .then(pl.col("Timestamp").shift(-1) - pl.col("Timestamp"))
+            .dt.total_seconds()
+            .clip(0, MAX_SAMPLE_GAP_S)
+            .fill_null(0)
+            / 3600
+        ).alias("Hours"),
+    ).with_columns(leg_km.alias("Leg_km"))
+
+    # Perna só conta no mesmo trecho, sem falha de log e em velocidade possível
+    leg_ok = (
+        same_segment
+        & (pl.col("Gap_s") > 0)
+        & (pl.col("Gap_s") <= MAX_SAMPLE_GAP_S)
+        & (pl.col("Leg_km") / pl.col("Gap_s") * 3600 <= MAX_LEG_SPEED_KMH)
+    )
+    return df.with_columns(
+        pl.when(leg_ok).then(pl.col("Leg_km")).otherwise(0).alias("Leg_km"),
+        pl.when(pl.col("Port"))
+        .then(pl.lit("Port"))
+        .otherwise(pl.lit("Voyage"))
+        .alias("Type"),
+    ).drop("Asset_Id", "Moving", "Break", "Gap_s", "Run", "After_Port", "Port")
+
+
+def compute_voyages(df: pl.DataFrame) -> pl.DataFrame:
+    """Tabela de viagens e estadias com distância, combustível e SMH
+    df com os contadores já corrigidos (counters.repair)
+    """
+    return (
+        df.group_by("Segment")
+        .agg(
+            pl.col("Asset").first(),
+            pl.col("Type").first(),
+            pl.col("Timestamp").first().alias("Start"),
+            pl.col("Timestamp").last().alias("End"),
+            pl.len().alias("Samples"),
+            pl.col("Hours").sum().alias("Duration_h"),
+            pl.col("Leg_km").sum().alias("Distance_km"),
+            pl.col("Vessel_Speed").mean().alias("Speed_Mean"),
+            pl.col("Vessel_Speed").max().alias("Speed_Max"),
+            (pl.col("Fuel_Rate") * pl.col("Hours")).sum().alias("Fuel_L"),
+            (pl.col("Total_Fuel").max() - pl.col("Total_Fuel").min()).alias(
+                "Total_Fuel_Delta"
+            ),
+            (pl.col("SMH").max() - pl.col("SMH").min()).alias("SMH_Delta"),
+            pl.col("Latitude").drop_nulls().first().alias("Start_Lat"),
+            pl.col("Longitude").drop_nulls().first().alias("Start_Lon"),
+            pl.col("Latitude").drop_nulls().last().alias("End_Lat"),
+            pl.col("Longitude").drop_nulls().last().alias("End_Lon"),
+        )
+        .drop("Segment")
+        .with_columns([pl.col(col).cast(dtype) for col, dtype in VOYAGE_SCHEMA.items()])
+    )
+
+
+def compute_grid(df: pl.DataFrame) -> pl.DataFrame:
+    """Grade de GRID_DEG graus por ativo e mês: amostras, horas, horas em
+    porto, combustível e velocidade média em cada célula
+    """
+    return (
+        df.drop_nulls(["Latitude", "Longitude"])
+        .group_by(
+            "Asset",
+            pl.col("Timestamp").dt.month_start().dt.date().alias("Month"),
+            ((pl.col("Latitude") / GRID_DEG).floor() * GRID_DEG)
+            .round(6)
+            .alias("Lat_Bin"),
+            ((pl.col("Longitude") / GRID_DEG).floor() * GRID_DEG)
+            .round(6)
+            .alias("Lon_Bin"),
+        )
+        .agg(
+            pl.len().alias("Samples"),
+            pl.col("Hours").sum(),
+            pl.col("Hours").filter(pl.col("Type") == "Port").sum().alias("Port_Hours"),
+            (pl.col("Fuel_Rate") * pl.col("Hours")).sum().alias("Fuel_L"),
+            pl.col("Vessel_Speed").mean().alias("Speed_Mean"),
+        )
+        .select("Month", "Asset", pl.exclude("Month", "Asset"))
+    )
+
+
+def run(df_full: pl.DataFrame, df_current: pl.DataFrame, path_holder) -> None:
+    """Recalcula viagens a partir do trecho gravado que os dados novos alcançam
+    e a grade dos meses tocados
+    """
+    if df_current.is_empty() or not set(GPS_COLUMNS) <= set(df_full.columns):
+        return
+
+    # Os meses tocados são refeitos inteiros na grade: o recálculo parte do
+    # trecho em andamento no início do mês (e do anterior, de quem a
+    # classificação do primeiro depende); trechos mais antigos ficam como estão
+    df_old = read_output(path_holder.voyages, VOYAGE_SCHEMA)
+    if df_old is None:
+        df_old = pl.DataFrame(schema=VOYAGE_SCHEMA)
+    df_recalc = recalc_starts(
+        df_current.select("Asset", pl.col("Timestamp").dt.month_start()),
+        df_old,
+        MAX_VOYAGE_GAP_S,
+        lookback=1,
+    )
+
+    df_src = df_full.select(
+        pl.col("Asset").cast(pl.String),
+        "Timestamp",
+        *[pl.col(col).cast(pl.Float64) for col in GPS_COLUMNS],
+        *[
+            optional_col(df_full, col).cast(pl.Float64)
+            for col in ("Fuel_Rate", "Total_Fuel", "SMH")
+        ],
+    ).filter(in_recalc(df_recalc))
+    # Deltas dos contadores sobre os valores corrigidos (picos e zeramentos);
+    # a correção também deixa o quadro ordenado por ativo e tempo
+    df_src, _ = counters.repair(df_src)
+
+    df_labeled = label_samples(df_src)
+
+    df_voyages = merge_from(
+        path_holder.voyages,
+        df_old,
+        compute_voyages(df_labeled),
+        df_recalc,
+        sort_by=["Asset", "Start"],
+    )
+
+    df_grid = merge_incremental(
+        path_holder.geo_grid,
+        compute_grid(
+            filter_periods(
+                df_labeled,
+                touched_periods(df_current, ["Asset"], "1mo"),
+                ["Asset"],
+                "1mo",
+            )
+        ),
+        keys=["Asset", "Month"],
+        schema=GRID_SCHEMA,
+        sort_by=["Asset", "Month", "Lat_Bin", "Lon_Bin"],
+    )
+
+    n_voyages = df_voyages.filter(pl.col("Type") == "Voyage").height
+    print(f"Viagens: {n_voyages} viagens, grade com {df_grid.height} células")
+
+
+if __name__ == "__main__":
+
+    print("Execute o script através da GUI!")
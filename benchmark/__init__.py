@@ -0,0 +1,7 @@
+"""Package de geração de dados sintéticos e benchmark do RFV TO BI"""
+
+from .synthetic_data import generate_fleet
+
+if __name__ == "__main__":
+
+    print("Execute o script através da GUI!")
@@ -0,0 +1,195 @@
+"""Benchmark das etapas do RFV TO BI com dados sintéticos
+
+Uso:
+    python -m benchmark.bench_pipeline --sizes 5 20 60 --days 30 --out bench.json
+    python -m benchmark.bench_pipeline --sizes 5 20 --baseline bench.json
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from shutil import rmtree
+import polars as pl
+import rfvbi
+import calc_engdata
+from classes_rfvbi import PathHolder
+from instrumentation import MemorySampler, current_rss
+from trendbot import trendbot_func
+from .synthetic_data import generate_fleet
+
+REGRESSION_TOLERANCE = 0.20
+
+
+def measure(stage: str, func, *args) -> dict:
+    """Executa uma etapa medindo tempo e pico de memória"""
+    rss_start = current_rss()
+    time_start = time.perf_counter()
+    with MemorySampler() as sampler:
+        func(*args)
+    wall = time.perf_counter() - time_start
+
+    result = {
+        "stage": stage,
+        "wall_s": round(wall, 3),
+        "peak_rss_mb": round(sampler.peak / 2**20, 1),
+        "delta_rss_mb": round((sampler.peak - rss_start) / 2**20, 1),
+    }
+    print(f"{stage}: {result['wall_s']} s | pico {result['peak_rss_mb']} MB")
+    return result
+
+
+def __reset_db(dbpath: str) -> None:
+    """Limpa o banco de dados sintético entre etapas"""
+    rmtree(dbpath, ignore_errors=True)
+    os.makedirs(dbpath)
+
+
+def bench_fleet(
+    root: str, n_assets: int, sample_minutes: float, days: int
+) -> list[dict]:
+    """Gera uma frota sintética e mede cada etapa do pipeline"""
+
+    print(f"\nGerando frota sintética: {n_assets} ativos, {days} dias...\n")
+    paths = generate_fleet(root, n_assets, sample_minutes=sample_minutes, days=days)
+    dbpath = paths["dbpath"]
+
+    path_holder = PathHolder(dbpath)
+    registry = rfvbi.get_assets(path_holder.asset_info)
+    os.makedirs(path_holder.trendbot, exist_ok=True)
+
+    list_results = [
+        measure(
+            "rfvbi.main",
+            rfvbi.main,
+            dbpath,
+            paths["englogpath"],
+            paths["eventslogpath"],
+            1,
+            1,
+        )
+    ]
+
+    __reset_db(dbpath)
+    list_results.append(
+        measure(
+            "create_engdata_output",
+            rfvbi.create_engdata_output,
+            registry,
+            path_holder,
+            paths["englogpath"],
+            0,
+        )
+    )
+    list_results.append(
+        measure(
+            "create_events_output",
+            rfvbi.create_events_output,
+            registry,
+            path_holder,
+            paths["eventslogpath"],
+        )
+    )
+
+    list_colstd = list(rfvbi.DICT_COLNAME.keys()) + ["Asset"]
+    df_full_engs = rfvbi.get_database_data(path_holder.eng_output, list_colstd)
+    df_full_engs = df_full_engs.with_columns(pl.col("Asset").cast(pl.String))
+
+    list_results.append(
+        measure(
+            "calc_engdata.run_alldata",
+            calc_engdata.run_alldata,
+            df_full_engs,
+        )
+    )
+    list_results.append(
+        measure(
+            "calc_engdata.run_maintenance",
+            calc_engdata.run_maintenance,
+            path_holder,
+            registry,
+        )
+    )
+    df_full_engs = calc_engdata.exh_diff(df_full_engs)
+    list_results.append(
+        measure(
+            "trendbot_func.main_trendbot",
+            trendbot_func.main_trendbot,
+            df_full_engs,
+            path_holder.tb_baseline,
+            path_holder.tb_monthly,
+            path_holder.tb_comments,
+            registry,
+        )
+    )
+
+    for result in list_results:
+        result.update(
+            {
+                "n_assets": n_assets,
+                "sample_minutes": sample_minutes,
+                "days": days,
+                "rows": df_full_engs.height,
+            }
+        )
+
+    return list_results
+
+
+def compare_baseline(list_results: list[dict], path_baseline: str) -> bool:
+    """Compara os tempos com um resultado anterior e indica regressões"""
+    with open(path_baseline, "r", encoding="utf-8") as file:
+        list_baseline = json.load(file)
+
+    dict_baseline = {
+        (item["n_assets"], item["days"], item["sample_minutes"], item["stage"]): item
+        for item in list_baseline
+    }
+
+    is_ok = True
+    for result in list_results:
+        key = (result["n_assets"], result["days"], result["sample_minutes"])
+        baseline = dict_baseline.get(key + (result["stage"],))
+        if not baseline:
+            continue
+        ratio = result["wall_s"] / baseline["wall_s"] if baseline["wall_s"] else 1.0
+        status = "OK"
+        if ratio > 1 + REGRESSION_TOLERANCE:
+            status = "REGRESSÃO"
+            is_ok = False
+        print(
+            f"{result['n_assets']:>4} ativos | {result['stage']}: x{ratio:.2f} {status}"
+        )
+
+    return is_ok
+
+
+def main(argv: list[str] | None = None) -> int:
+    """Executa o benchmark para diversos tamanhos de frota"""
+    parser = argparse.ArgumentParser(description="Benchmark do RFV TO BI")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[5, 20, 60])
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--rate", type=float, default=1.0, help="Minutos por amostra")
+    parser.add_argument("--out", default="bench_results.json")
+    parser.add_argument("--baseline", default=None)
+    args = parser.parse_args(argv)
+
+    list_results = []
+    for n_assets in args.sizes:
+        with tempfile.TemporaryDirectory() as root:
+            list_results.extend(bench_fleet(root, n_assets, args.rate, args.days))
+
+    with open(args.out, "w", encoding="utf-8") as file:
+        json.dump(list_results, file, indent=2)
+    print(f"\nResultados salvos em {args.out}")
+
+    if args.baseline and not compare_baseline(list_results, args.baseline):
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+
+    sys.exit(main())
@@ -0,0 +1,326 @@
+"""Gerador de dados sintéticos no formato de exportação do RFV"""
+
+import os
+import zipfile
+from datetime import datetime, timedelta
+import numpy as np
+import polars as pl
+import xlsxwriter
+from rfvbi import DICT_COLNAME
+from special_parse import exhaust_diff_by_cilinder, generator_data
+
+START_DATE = datetime(2024, 1, 1)
+TIMESTAMP_FORMAT = "%m/%d/%Y %I:%M:%S %p"
+INVALID_VALUES = [65535, -32768]
+EVENTS_TO_DELETE = ["E999"]
+MODELS = ("3516C", "C32", "C18")
+N_EXTRA_CHANNELS = 40
+CUSTOM_HEADER = ("Oil_Press", "Engine Oil Pressure Sensor [kPa]")
+
+EVENT_CODES = {
+    "E101": ("High", "High Coolant Temperature"),
+    "E102": ("Medium", "Low Oil Pressure"),
+    "E103": ("Low", "Low Battery Voltage"),
+    "E104": ("Medium", "High Exhaust Temperature"),
+    "E999": ("Low", "Diagnostic Test"),
+}
+
+
+def __build_serials(
+    n_assets: int, n_cylinder: int, n_generator: int
+) -> list[tuple[str, str]]:
+    """Cria a lista de (SN, tipo) dos ativos sintéticos"""
+    n_cylinder = min(n_cylinder, len(exhaust_diff_by_cilinder.SN_TO_PARSE), n_assets)
+    n_generator = min(
+        n_generator, len(generator_data.SN_TO_PARSE), n_assets - n_cylinder
+    )
+    n_common = n_assets - n_cylinder - n_generator
+
+    list_serials = [
+        (sn, "cylinder") for sn in exhaust_diff_by_cilinder.SN_TO_PARSE[:n_cylinder]
+    ]
+    list_serials.extend(
+        (sn, "generator") for sn in generator_data.SN_TO_PARSE[:n_generator]
+    )
+    list_serials.extend((f"SYN{i:05d}", "common") for i in range(n_common))
+    return list_serials
+
+
+def __engine_signals(
+    rng: np.random.Generator, n_rows: int, sample_minutes: float
+) -> dict[str, np.ndarray]:
+    """Gera os sinais principais do motor com comportamento plausível"""
+    load = np.clip(np.cumsum(rng.normal(0, 2, n_rows)) % 200 - 50, 0, 100) + rng.normal(
+        0, 1, n_rows
+    )
+    load = np.clip(load, 0, 100)
+    is_off = rng.random(n_rows) < 0.05
+    load[is_off] = 0
+
+    rpm = np.where(is_off, 0, 700 + 11 * load + rng.normal(0, 10, n_rows))
+    fuel_rate = np.where(is_off, 0, 5 + 3.2 * load + rng.normal(0, 2, n_rows))
+    hours_step = np.where(is_off, 0, sample_minutes / 60)
+
+    return {
+        "Load": load,
+        "RPM": rpm,
+        "Coolant_Temp": 82 + 0.08 * load + rng.normal(0, 1, n_rows),
+        "Oil_Press": np.where(is_off, 0, 320 + 1.5 * load + rng.normal(0, 8, n_rows)),
+        "Oil_Temp": 88 + 0.1 * load + rng.normal(0, 1, n_rows),
+        "Batt": 27 + rng.normal(0, 0.3, n_rows),
+        "Boost": np.where(is_off, 0, 2.5 * load + rng.normal(0, 3, n_rows)),
+        "Fuel_Rate": fuel_rate,
+        "EXH_L": 250 + 2.8 * load + rng.normal(0, 6, n_rows),
+        "EXH_R": 250 + 2.8 * load + rng.normal(0, 6, n_rows),
+        "Total_Fuel": 10000 + np.cumsum(fuel_rate * sample_minutes / 60),
+        "SMH": 5000 + np.cumsum(hours_step),
+        "Fuel_Press": 550 + rng.normal(0, 10, n_rows),
+        "Crank_Press": 0.5 + rng.normal(0, 0.1, n_rows),
+        "Aftercooler_Temp": 45 + 0.1 * load + rng.normal(0, 1, n_rows),
+        "Inlet_Air_Temp": 30 + rng.normal(0, 2, n_rows),
+        "Latitude": -22.9 + np.cumsum(rng.normal(0, 0.001, n_rows)),
+        "Longitude": -43.1 + np.cumsum(rng.normal(0, 0.001, n_rows)),
+        "Vessel_Speed": np.clip(0.25 * load + rng.normal(0, 1, n_rows), 0, None),
+        "Heading": rng.uniform(0, 360, n_rows),
+    }
+
+
+def __engine_csv(
+    rng: np.random.Generator,
+    sn: str,
+    asset_type: str,
+    days: int,
+    sample_minutes: float,
+    use_custom_header: bool,
+) -> pl.DataFrame:
+    """Gera o DataFrame de log de um motor com os cabeçalhos do RFV"""
+    sample_seconds = int(sample_minutes * 60)
+    n_rows = int(days * 24 * 3600 / sample_seconds)
+    timestamps = pl.datetime_range(
+        START_DATE,
+        START_DATE + timedelta(seconds=sample_seconds * (n_rows - 1)),
+        interval=f"{sample_seconds}s",
+        eager=True,
+    )
+    signals = __engine_signals(rng, n_rows, sample_minutes)
+
+    dict_data = {DICT_COLNAME["Timestamp"][0]: timestamps.dt.strftime(TIMESTAMP_FORMAT)}
+    for colname, values in signals.items():
+        aliases = DICT_COLNAME[colname]
+        header = aliases[rng.integers(len(aliases))]
+        if use_custom_header and colname == CUSTOM_HEADER[0]:
+            header = CUSTOM_HEADER[1]
+        values = np.round(values, 2)
+        invalid_mask = rng.random(n_rows) < 0.002
+        values = np.where(invalid_mask, rng.choice(INVALID_VALUES), values)
+        dict_data[header] = values
+
+    if asset_type == "cylinder":
+        exh_mean = signals["EXH_L"]
+        for colname in exhaust_diff_by_cilinder.list_col_cil(16):
+            dict_data[colname] = np.round(exh_mean + rng.normal(0, 8, n_rows), 2)
+        for colname in exhaust_diff_by_cilinder.list_colname_ciltranformer[:16]:
+            dict_data[colname] = np.round(60 + rng.normal(0, 3, n_rows), 2)
+
+    if asset_type == "generator":
+        for colname in generator_data.ADD_COLS:
+            if "Frequency" in colname:
+                base = 60.0
+            elif "Current" in colname:
+                base = 800.0
+            elif "Line-Line" in colname:
+                base = 480.0
+            else:
+                base = 277.0
+            dict_data[colname] = np.round(base + rng.normal(0, 1, n_rows), 2)
+
+    for i in range(N_EXTRA_CHANNELS):
+        dict_data[f"Auxiliary Channel {i + 1} [unit]"] = np.round(
+            rng.normal(0, 1, n_rows), 2
+        )
+
+    df = pl.DataFrame(dict_data)
+    return df
+
+
+def __write_csv_utf_16le(df: pl.DataFrame, path: str) -> None:
+    """Cria um csv com utf-16le como o RFV exporta"""
+    csv_data = df.write_csv()
+    with open(path, "w", encoding="utf-16le") as file:
+        file.write(csv_data)
+
+
+def __write_englogs(
+    rng: np.random.Generator,
+    list_serials: list[tuple[str, str]],
+    path_zip: str,
+    days: int,
+    sample_minutes: float,
+) -> None:
+    """Cria o zip com os logs de motores"""
+    dir_tmp = os.path.dirname(path_zip) + "/englogs_tmp/"
+    os.makedirs(dir_tmp, exist_ok=True)
+
+    with zipfile.ZipFile(path_zip, "w", zipfile.ZIP_DEFLATED) as zipengs:
+        for i, (sn, asset_type) in enumerate(list_serials):
+            df_asset = __engine_csv(
+                rng, sn, asset_type, days, sample_minutes, use_custom_header=i == 0
+            )
+            path_csv = dir_tmp + f"Engine Log {sn}.csv"
+            __write_csv_utf_16le(df_asset, path_csv)
+            zipengs.write(path_csv, arcname=os.path.basename(path_csv))
+            os.remove(path_csv)
+
+    os.rmdir(dir_tmp)
+
+
+def __write_events(
+    rng: np.random.Generator,
+    list_serials: list[tuple[str, str]],
+    path_events: str,
+    days: int,
+) -> None:
+    """Cria a planilha de eventos com o resumo e uma aba por ativo"""
+    list_codes = list(EVENT_CODES.keys())
+    list_summary = []
+    dict_sheets = {}
+
+    for i, (sn, _) in enumerate(list_serials):
+        n_events = int(rng.integers(0, 5 * days))
+        codes = rng.choice(list_codes, n_events)
+        minutes = np.sort(rng.integers(0, days * 24 * 60, n_events))
+        df_events = pl.DataFrame(
+            {
+                "Sample Time": [
+                    START_DATE + timedelta(minutes=int(m)) for m in minutes
+                ],
+                "Type": ["Event"] * n_events,
+                "Source": ["Engine Control Module"] * n_events,
+                "Code": codes.tolist(),
+                "Severity": [EVENT_CODES[code][0] for code in codes],
+                "Description": [EVENT_CODES[code][1] for code in codes],
+            },
+            schema_overrides={"Sample Time": pl.Datetime},
+        )
+        unit_name = f"Vessel {i + 1} - {sn}"
+        dict_sheets[unit_name] = df_events
+        list_summary.append(
+            {
+                "Unit Name": unit_name,
+                "High Severity Count": df_events.filter(
+                    pl.col("Severity") == "High"
+                ).height,
+                "Medium Severity Count": df_events.filter(
+                    pl.col("Severity") == "Medium"
+                ).height,
+                "Low Severity Count": df_events.filter(
+                    pl.col("Severity") == "Low"
+                ).height,
+            }
+        )
+
+    df_summary = pl.DataFrame(list_summary)
+    df_summary = pl.concat(
+        [
+            df_summary,
+            df_summary.select(
+                pl.lit("Totals").alias("Unit Name"),
+                pl.exclude("Unit Name").sum(),
+            ),
+        ]
+    )
+
+    with xlsxwriter.Workbook(path_events) as workbook:
+        df_summary.write_excel(workbook, worksheet="Engine Event Summary")
+        for unit_name, df_events in dict_sheets.items():
+            df_events.write_excel(workbook, worksheet=unit_name)
+
+
+def __write_infos(
+    list_serials: list[tuple[str, str]], dir_infos: str, path_plan: str
+) -> None:
+    """Cria ConfigScript, ASSET_INFO, plano e histórico de manutenção"""
+    list_sn = [sn for sn, _ in list_serials]
+    list_models = [MODELS[i % len(MODELS)] for i in range(len(list_sn))]
+
+    with xlsxwriter.Workbook(dir_infos + "ConfigScript.xlsx") as workbook:
+        pl.DataFrame(
+            {"Nome": ["maintanance_plan"], "Caminho": [path_plan]}
+        ).write_excel(workbook, worksheet="CaminhosComuns")
+        pl.DataFrame(
+            {
+                "SN": [list_sn[0]],
+                "Nome da coluna": [CUSTOM_HEADER[1]],
+                "Renomear para": [CUSTOM_HEADER[0]],
+            }
+        ).write_excel(workbook, worksheet="ListaParm")
+        pl.DataFrame({"Valor": INVALID_VALUES}).write_excel(
+            workbook, worksheet="DadosInvalidos"
+        )
+        pl.DataFrame({"Valor": EVENTS_TO_DELETE}).write_excel(
+            workbook, worksheet="AlertasDelete"
+        )
+
+    pl.DataFrame({"Serial": list_sn, "Model": list_models}).write_excel(
+        dir_infos + "ASSET_INFO.xlsx", worksheet="ASSET_LIST"
+    )
+
+    df_plan = pl.DataFrame(
+        {
+            "Model": [model for model in MODELS for _ in range(3)],
+            "Maintenance Name": ["PM1", "PM2", "PM3"] * len(MODELS),
+            "Maintenance Type": ["Preventiva"] * 3 * len(MODELS),
+            "Target SMH": [500, 1000, 2000] * len(MODELS),
+            "Target Fuel (L)": [50000, 100000, 200000] * len(MODELS),
+        }
+    )
+    df_plan.write_excel(path_plan, worksheet="By Model")
+
+    pl.DataFrame(
+        {
+            "SN": [list_sn[0]],
+            "Maintenance Name": ["PM1"],
+            "Run Hours": [4800.0],
+            "Total Fuel (L)": [None],
+            "Date": [START_DATE.date()],
+        },
+        schema_overrides={"Total Fuel (L)": pl.Float64},
+    ).write_excel(dir_infos + "MAINTENANCE_SHIFT.xlsx", worksheet="By SN")
+
+
+def generate_fleet(
+    root: str,
+    n_assets: int,
+    sample_minutes: float = 1.0,
+    days: int = 30,
+    n_cylinder: int = 1,
+    n_generator: int = 1,
+    seed: int = 0,
+) -> dict[str, str]:
+    """Gera uma pasta de cliente sintética e retorna os caminhos de entrada"""
+
+    root = root.rstrip("/\\")
+    dir_infos = root + "/00 - INFOS/"
+    dbpath = root + "/01 - BD"
+    os.makedirs(dir_infos, exist_ok=True)
+    os.makedirs(dbpath, exist_ok=True)
+
+    rng = np.random.default_rng(seed)
+    list_serials = __build_serials(n_assets, n_cylinder, n_generator)
+
+    dict_paths = {
+        "dbpath": dbpath,
+        "englogpath": root + "/englogs.zip",
+        "eventslogpath": root + "/events.xlsx",
+    }
+
+    __write_infos(list_serials, dir_infos, dir_infos + "MAINTENANCE_PLAN.xlsx")
+    __write_englogs(rng, list_serials, dict_paths["englogpath"], days, sample_minutes)
+    __write_events(rng, list_serials, dict_paths["eventslogpath"], days)
+
+    return dict_paths
+
+
+if __name__ == "__main__":
+
+    print("Execute o script através da GUI!")
@@ -2,9 +2,17 @@
 
 from datetime import datetime, time, timedelta
 import polars as pl
-from classes_rfvbi import PathHolder
+from analytics.resample import resample
+from classes_rfvbi import AssetRegistry, PathHolder
+from config_cache import read_sheet
+from history_store import get_history
+from instrumentation import span
+from io_rfvbi import write_csv_atomic
+import counters
 import special_parse
 
+MAINTENANCE_COLS = ["SMH", "Total_Fuel"]
+
 
 def exh_diff(df: pl.DataFrame) -> pl.DataFrame:
     """Calcula a diferença entre as bancadas do motor"""
@@ -75,7 +83,7 @@ def maint_shift(
     nclycles_fuel: int,
 ) -> tuple[float | None, float | None]:
     """Retorna os valores de correção de acordo a última manutenção"""
-    df_maint_shift = pl.read_excel(path_shift, sheet_name="By SN")
+    df_maint_shift = read_sheet(path_shift, "By SN")
     df_maint_shift = df_maint_shift.filter(pl.col("SN") == asset)
 
     if df_maint_shift.is_empty():
@@ -121,7 +129,9 @@ def maint_shift(
     return smh_shift, fuel_shift
 
 
-def maintenance_est(df: pl.DataFrame, path_holder: PathHolder) -> pl.DataFrame:
+def maintenance_est(
+    df: pl.DataFrame, path_holder: PathHolder, registry: AssetRegistry
+) -> pl.DataFrame:
     """Estimativa de manutenção"""
 
     print("\nIniciando cálculo de manutenção...\n")
@@ -129,9 +139,21 @@ def maintenance_est(df: pl.DataFrame, path_holder: PathHolder) -> pl.DataFrame:
     df_day = median_diff_by_day(df, {"SMH", "Total_Fuel"})
     df_max = max_by_asset(df, {"SMH", "Total_Fuel", "Timestamp"})
     df_info_maint = df_day.join(df_max, on="Asset", how="left")
+    df_info_maint = registry.join(df_info_maint)
 
-    df_asset_info = pl.read_excel(path_holder.asset_info, sheet_name="ASSET_LIST")
-    df_maint_plan = pl.read_excel(path_holder.maintanance_plan, sheet_name="By Model")
+    # Plano de cada ativo em um único join pelo modelo
+    df_maint_plan = read_sheet(path_holder.maintanance_plan, "By Model")
+    df_maint_plan = df_maint_plan.with_row_index("Plan_Row").with_columns(
+        pl.col("Model").cast(pl.String)
+    )
+    dict_plan_by_asset = (
+        df_info_maint.select("Asset", pl.col("Model").cast(pl.String))
+        .join(df_maint_plan, on="Model", how="inner")
+        .sort(["Asset", "Plan_Row"])
+        .drop(["Model", "Plan_Row"])
+        .partition_by("Asset", as_dict=True)
+    )
+    dict_info_by_asset = df_info_maint.partition_by("Asset", as_dict=True)
 
     df_full_maint_output = pl.DataFrame(
         schema={
@@ -145,20 +167,18 @@ def maintenance_est(df: pl.DataFrame, path_holder: PathHolder) -> pl.DataFrame:
         }
     )
 
-    for asset in df_asset_info["Serial"].to_list():
-        df_info_maint_filtered = df_info_maint.filter(pl.col("Asset") == asset)
+    for asset in registry:
+        df_info_maint_filtered = dict_info_by_asset.get((asset,))
 
-        if df_info_maint_filtered.is_empty():
+        if df_info_maint_filtered is None:
             print(
                 f"{asset} Sem informações para cálculo de manutenção! Falta de dados!"
             )
             continue
 
-        df_asset_info_filtered = df_asset_info.filter(pl.col("Serial") == asset)
-        asset_model = df_asset_info_filtered.item(0, "Model")
-        df_maint_plan_filtered = df_maint_plan.filter(pl.col("Model") == asset_model)
+        df_maint_plan_filtered = dict_plan_by_asset.get((asset,))
 
-        if df_maint_plan_filtered.is_empty():
+        if df_maint_plan_filtered is None:
             print(
                 f"{asset} Sem informações para cálculo de manutenção! Insira o plano de manutanção"
             )
@@ -319,9 +339,7 @@ def maintenance_est(df: pl.DataFrame, path_holder: PathHolder) -> pl.DataFrame:
 
     print(df_full_maint_output, "\n")
     print("Cálculo de manutenção finalizado!\n")
-    df_full_maint_output.write_csv(
-        path_holder.maintenance_output, datetime_format="%Y-%m-%d %H:%M:%S"
-    )
+    write_csv_atomic(df_full_maint_output, path_holder.maintenance_output)
 
 
 def run_currentdata(df: pl.DataFrame) -> pl.DataFrame:
@@ -333,16 +351,44 @@ def run_currentdata(df: pl.DataFrame) -> pl.DataFrame:
     return df
 
 
-def run_alldata(df: pl.DataFrame, path_holder: PathHolder) -> pl.DataFrame:
+def run_alldata(df: pl.DataFrame) -> pl.DataFrame:
     """Executa as rotinas de cálculo para os dados de motor
     Otimizado para todo o banco de dados com os dados atualizados
     """
-    df = special_parse.run_all(df)
-    df = exh_diff(df)
-    maintenance_est(df, path_holder)
+    with span("special_parse.run_all"):
+        df = special_parse.run_all(df)
+    with span("exh_diff"):
+        df = exh_diff(df)
     return df
 
 
+def run_maintenance(
+    path_holder: PathHolder,
+    registry: AssetRegistry,
+    resample_every: str | None = None,
+) -> None:
+    """Estimativa de manutenção lendo só os contadores do histórico armazenado
+    Os contadores são corrigidos antes (picos, recuos e zeramentos)
+    resample_every: grade uniforme usada na estimativa
+    """
+    with span("read_history_store") as sp:
+        df = get_history(path_holder.history_store, columns=MAINTENANCE_COLS)
+        sp.rows_out = df.height
+    with span("counter_repair") as sp:
+        sp.rows_in = df.height
+        df, df_audit = counters.repair(df)
+        write_csv_atomic(df_audit, path_holder.counter_audit)
+        sp.rows_out = df_audit.height
+    if resample_every:
+        with span("resample") as sp:
+            sp.rows_in = df.height
+            df = resample(df, resample_every)
+            sp.rows_out = df.height
+    with span("maintenance_est") as sp:
+        sp.rows_in = df.height
+        maintenance_est(df, path_holder, registry)
+
+
 if __name__ == "__main__":
 
     print("Execute o script através da GUI!")
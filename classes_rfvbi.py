@@ -1,9 +1,138 @@
 """Classes para RFV TO BI"""
 
+import json
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import polars as pl
+from config_cache import CACHE_DIR, read_sheet
 
 SHAREPOINT_NAME = "PBI_BD - BD_Clientes"
+RESOLVER_WORKERS = 8
+PATH_CACHE_FILE = os.path.join(CACHE_DIR, "common_paths.json")
+LOAD_BIN_COL = "Load Bin"
+
+
+class PathResolver:
+    """Resolve os caminhos do CaminhosComuns para a pasta do usuário atual
+    Caminhos já validados ficam em memória e os mapeamentos por prefixo de
+    usuário em disco, evitando stats repetidos em pastas sincronizadas
+    """
+
+    def __init__(self, cache_file: str = PATH_CACHE_FILE) -> None:
+        self.cache_file = cache_file
+        self._validated = {}
+        self._stored = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(path: str, user_prefix: str | None) -> str:
+        """Chave do mapeamento (caminho da planilha + prefixo do usuário)"""
+        return f"{user_prefix or ''}|{path}"
+
+    def _load_stored(self) -> dict:
+        """Mapeamentos salvos em execuções anteriores"""
+        if self._stored is None:
+            try:
+                with open(self.cache_file, "r", encoding="utf-8") as file:
+                    self._stored = json.load(file)
+            except (OSError, ValueError):
+                self._stored = {}
+        return self._stored
+
+    def _save_stored(self) -> None:
+        """Grava os mapeamentos; falhas só desativam o cache"""
+        path_tmp = f"{self.cache_file}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(self.cache_file), exist_ok=True)
+            with open(path_tmp, "w", encoding="utf-8") as file:
+                json.dump(self._stored, file, indent=1)
+            os.replace(path_tmp, self.cache_file)
+        except OSError:
+            print("Aviso: não foi possível salvar o cache de caminhos")
+
+    def _candidates(self, path: str, user_prefix: str | None) -> list[str]:
+        """Caminhos possíveis em ordem de preferência"""
+        list_candidates = [path]
+
+        # Handle paths for different users assuming the same folder name
+        if user_prefix is not None and SHAREPOINT_NAME in path:
+            attib_path = path.split(SHAREPOINT_NAME, 1)[1]
+            list_candidates.append(user_prefix + SHAREPOINT_NAME + attib_path)
+
+        stored = self._load_stored().get(self._key(path, user_prefix))
+        if stored in list_candidates:
+            list_candidates.remove(stored)
+            list_candidates.insert(0, stored)
+
+        return list_candidates
+
+    def resolve(self, dict_paths: dict[str, str], user_prefix: str | None) -> dict:
+        """Resolve todos os caminhos, validando em paralelo por rodadas
+        Levanta um único ValueError com todos os caminhos não encontrados
+        """
+        dict_resolved = {}
+        dict_pending = {}
+
+        with self._lock:
+            for attname, path in dict_paths.items():
+                key = self._key(path, user_prefix)
+                if key in self._validated:
+                    dict_resolved[attname] = self._validated[key]
+                else:
+                    dict_pending[attname] = (key, self._candidates(path, user_prefix))
+
+        list_failed = []
+        n_round = 0
+        with ThreadPoolExecutor(max_workers=RESOLVER_WORKERS) as executor:
+            while dict_pending:
+                # Rodada n: testa o n-ésimo candidato de todos os pendentes
+                dict_round = {
+                    attname: candidates[n_round]
+                    for attname, (_, candidates) in dict_pending.items()
+                }
+                list_exists = executor.map(os.path.exists, dict_round.values())
+
+                for (attname, path), exists in zip(dict_round.items(), list_exists):
+                    key, candidates = dict_pending[attname]
+                    if exists:
+                        dict_resolved[attname] = path
+                        with self._lock:
+                            self._validated[key] = path
+                    elif n_round + 1 < len(candidates):
+                        continue
+                    else:
+                        list_failed.append(f"{attname}: {path}")
+                    del dict_pending[attname]
+
+                n_round += 1
+
+        if list_failed:
+            raise ValueError(
+                "Caminhos comuns não encontrados:\n" + "\n".join(sorted(list_failed))
+            )
+
+        self._update_stored(dict_paths, dict_resolved, user_prefix)
+        return dict_resolved
+
+    def _update_stored(
+        self, dict_paths: dict[str, str], dict_resolved: dict, user_prefix: str | None
+    ) -> None:
+        """Persiste os mapeamentos que mudaram"""
+        with self._lock:
+            stored = self._load_stored()
+            dict_new = {
+                self._key(dict_paths[attname], user_prefix): path
+                for attname, path in dict_resolved.items()
+                if path != dict_paths[attname]
+            }
+            if all(stored.get(key) == path for key, path in dict_new.items()):
+                return
+            stored.update(dict_new)
+            self._save_stored()
+
+
+_PATH_RESOLVER = PathResolver()
 
 
 class PathHolder:
@@ -15,7 +144,24 @@ class PathHolder:
         self.config = os.path.dirname(self.db) + "/00 - INFOS/ConfigScript.xlsx"
         self.englogs = self.db + "/englogs/"
         self.eng_output = self.db + "/history_output.csv"
+        self.history_store = self.db + "/history_store/"
         self.event_output = self.db + "/events_output.csv"
+        self.eng_hourly = self.db + "/history_hourly.csv"
+        self.eng_daily = self.db + "/history_daily.csv"
+        self.trend_export = self.db + "/trend_export.csv"
+        self.quality_output = self.db + "/quality_output.csv"
+        self.duty_cycle = self.db + "/duty_cycle.csv"
+        self.sessions = self.db + "/sessions.csv"
+        self.fuel_check_daily = self.db + "/fuel_check_daily.csv"
+        self.fuel_check_sessions = self.db + "/fuel_check_sessions.csv"
+        self.counter_audit = self.db + "/counter_audit.csv"
+        self.anomalies = self.db + "/anomalies.csv"
+        self.cylinders = self.db + "/cylinder_deviation.csv"
+        self.voyages = self.db + "/voyages.csv"
+        self.geo_grid = self.db + "/geo_grid.csv"
+        self.event_snapshots = self.db + "/event_snapshots.csv"
+        self.event_rates_daily = self.db + "/event_rates_daily.csv"
+        self.event_rates_monthly = self.db + "/event_rates_monthly.csv"
         self.maintenance_output = self.db + "/maintenance_output.csv"
         self.maintanance_shift = (
             os.path.dirname(self.db) + "/00 - INFOS/MAINTENANCE_SHIFT.xlsx"
@@ -27,29 +173,134 @@ class PathHolder:
         self.tb_monthly = self.trendbot + "engs_statistics_monthly.csv"
         self.tb_comments = self.trendbot + "comments.csv"
 
+        self.run_reports = os.path.dirname(self.db) + "/05 - RUN_REPORTS/"
+
         self._add_commonpaths()
 
     def _add_commonpaths(self):
         """Adiciona os caminhos do arquivo de configuração como atributos"""
-        df_path = pl.read_excel(self.config, sheet_name="CaminhosComuns")
-        set_commonpaths = set(zip(df_path["Nome"], df_path["Caminho"]))
+        df_path = read_sheet(self.config, "CaminhosComuns")
+        dict_paths = dict(zip(df_path["Nome"], df_path["Caminho"]))
 
-        for attname, path in set_commonpaths:
+        user_prefix = None
+        if SHAREPOINT_NAME in self.db:
+            user_prefix = self.db.split(SHAREPOINT_NAME)[0]
 
-            if os.path.exists(path):
-                final_path = path
-            else:
-                # Handle paths for different users assuming the same folder name
-                attib_path = path.split(SHAREPOINT_NAME)[1]
-                user_path = self.db.split(SHAREPOINT_NAME)[0]
-                final_path = user_path + SHAREPOINT_NAME + attib_path
+        for attname, final_path in _PATH_RESOLVER.resolve(
+            dict_paths, user_prefix
+        ).items():
+            setattr(self, attname, final_path)
 
-                if not os.path.exists(final_path):
-                    raise ValueError(
-                        f"{attname} falhou em ser definido em :\n{final_path}"
-                    )
 
-            setattr(self, attname, final_path)
+class AssetRegistry:
+    """Cadastro de ativos (ASSET_LIST) indexado por Serial
+    Carregado uma vez por execução e compartilhado entre as etapas
+    """
+
+    def __init__(self, df_assetinfo: pl.DataFrame) -> None:
+        self.df = (
+            df_assetinfo.filter(pl.col("Serial").is_not_null())
+            .with_columns(pl.col("Serial").cast(pl.String))
+            .unique("Serial", keep="first", maintain_order=True)
+        )
+        if LOAD_BIN_COL in self.df.columns:
+            self.__check_load_bin(self.df)
+        self._index = {row["Serial"]: row for row in self.df.iter_rows(named=True)}
+
+    @staticmethod
+    def __check_load_bin(df: pl.DataFrame) -> None:
+        """Largura de faixa de carga numérica e positiva (vazia usa o padrão)"""
+        width = df[LOAD_BIN_COL].cast(pl.Float64, strict=False)
+        invalid = df[LOAD_BIN_COL].is_not_null() & (width.is_null() | (width <= 0))
+        if invalid.any():
+            list_invalid = [
+                f"{serial}: {value!r}"
+                for serial, value in df.filter(invalid)
+                .select("Serial", LOAD_BIN_COL)
+                .iter_rows()
+            ]
+            raise ValueError(
+                f"ASSET_LIST: '{LOAD_BIN_COL}' deve ser um número maior que zero "
+                + f"({', '.join(list_invalid)})"
+            )
+
+    @classmethod
+    def from_excel(cls, path: str) -> "AssetRegistry":
+        """Carrega o cadastro da planilha ASSET_INFO"""
+        return cls(read_sheet(path, "ASSET_LIST"))
+
+    def __contains__(self, serial: str) -> bool:
+        return serial in self._index
+
+    def __iter__(self):
+        return iter(self._index)
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def get(self, serial: str) -> dict | None:
+        """Metadados do ativo ou None se não cadastrado"""
+        return self._index.get(serial)
+
+    def model(self, serial: str) -> str | None:
+        """Modelo do ativo"""
+        info = self._index.get(serial)
+        return None if info is None else info.get("Model")
+
+    def join(
+        self, df: pl.DataFrame, columns: tuple[str, ...] = ("Model",), on="Asset"
+    ) -> pl.DataFrame:
+        """Acrescenta metadados do cadastro a um dataframe por ativo"""
+        df_info = self.df.select(
+            pl.col("Serial").alias(on), *[col for col in columns if col != "Serial"]
+        )
+        return df.with_columns(pl.col(on).cast(pl.String)).join(
+            df_info, on=on, how="left"
+        )
+
+
+class RunCancelled(Exception):
+    """Execução interrompida pelo usuário"""
+
+
+class CancelToken:
+    """Sinaliza o pedido de cancelamento entre etapas e ativos
+    Depois de commit (início da escrita das saídas) o cancelamento é recusado
+    """
+
+    def __init__(self) -> None:
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._committed = False
+
+    def cancel(self) -> bool:
+        """Solicita o cancelamento; retorna False se a escrita já começou"""
+        with self._lock:
+            if self._committed:
+                return False
+            self._event.set()
+            return True
+
+    def commit(self) -> None:
+        """Encerra a janela de cancelamento (interrompe se já foi pedido)"""
+        with self._lock:
+            self.check()
+            self._committed = True
+
+    @property
+    def is_cancelled(self) -> bool:
+        """Indica se o cancelamento foi solicitado"""
+        return self._event.is_set()
+
+    @property
+    def is_committed(self) -> bool:
+        """Indica se a escrita das saídas já começou"""
+        return self._committed
+
+    def check(self) -> None:
+        """Interrompe a execução caso o cancelamento tenha sido solicitado"""
+        if self._event.is_set():
+            raise RunCancelled("Execução cancelada pelo usuário")
 
 
 if __name__ == "__main__":
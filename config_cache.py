@@ -0,0 +1,102 @@
+"""Snapshot compilado das planilhas de configuração do RFV TO BI
+As abas lidas são guardadas em um arquivo binário local e reaproveitadas
+enquanto o tamanho e o mtime da planilha de origem não mudarem
+"""
+
+import hashlib
+import os
+import pickle
+import polars as pl
+import fastexcel  # pylint: disable=unused-import
+
+SNAPSHOT_VERSION = 1
+CACHE_DIR = os.path.join(
+    os.environ.get("LOCALAPPDATA") or os.path.expanduser("~/.cache"),
+    "RFV_TO_BI",
+    "config",
+)
+
+_SNAPSHOTS = {}
+
+
+def __snapshot_path(path: str) -> str:
+    """Arquivo de snapshot de uma planilha"""
+    key = hashlib.sha1(os.path.abspath(path).encode("utf-8")).hexdigest()
+    return os.path.join(CACHE_DIR, key + ".pkl")
+
+
+def source_signature(path: str) -> tuple:
+    """Identifica a versão da planilha de origem"""
+    stat = os.stat(path)
+    return (SNAPSHOT_VERSION, stat.st_size, stat.st_mtime_ns)
+
+
+def __load_snapshot(path: str, signature: tuple) -> dict:
+    """Abas já compiladas da planilha, vazio se o snapshot estiver desatualizado"""
+    snapshot = _SNAPSHOTS.get(path)
+    if snapshot is not None and snapshot["signature"] == signature:
+        return snapshot
+
+    try:
+        with open(__snapshot_path(path), "rb") as file:
+            snapshot = pickle.load(file)
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError):
+        snapshot = None
+
+    if snapshot is None or snapshot.get("signature") != signature:
+        snapshot = {"signature": signature, "sheets": {}}
+
+    _SNAPSHOTS[path] = snapshot
+    return snapshot
+
+
+def __save_snapshot(path: str, snapshot: dict) -> None:
+    """Grava o snapshot de forma atômica; falhas só desativam o cache"""
+    path_snapshot = __snapshot_path(path)
+    path_tmp = f"{path_snapshot}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        with open(path_tmp, "wb") as file:
+            pickle.dump(snapshot, file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(path_tmp, path_snapshot)
+    except OSError:
+        print(f"Aviso: não foi possível salvar o cache de {path}")
+
+
+def read_sheet(
+    path: str, sheet_name: str, optional: bool = False
+) -> pl.DataFrame | None:
+    """Lê uma aba de configuração usando o snapshot quando possível
+    optional: retorna None se a aba não existir (a ausência também fica em cache)
+    """
+    snapshot = __load_snapshot(path, source_signature(path))
+
+    if sheet_name in snapshot["sheets"]:
+        df = snapshot["sheets"][sheet_name]
+    else:
+        try:
+            df = pl.read_excel(path, sheet_name=sheet_name)
+        except ValueError:
+            if not optional:
+                raise
+            df = None
+        snapshot["sheets"][sheet_name] = df
+        __save_snapshot(path, snapshot)
+
+    if df is None and not optional:
+        raise ValueError(f"Aba {sheet_name} não encontrada em {path}")
+
+    return df
+
+
+def clear() -> None:
+    """Remove os snapshots em memória e em disco"""
+    _SNAPSHOTS.clear()
+    if os.path.isdir(CACHE_DIR):
+        for filename in os.listdir(CACHE_DIR):
+            os.remove(os.path.join(CACHE_DIR, filename))
+
+
+if __name__ == "__main__":
+
+    print("Execute o script através da GUI!")
@@ -0,0 +1,183 @@
+"""Correção dos contadores acumulados (SMH e Total_Fuel) por ativo
+Picos isolados são descartados; recuos, zeramentos (troca de ECM) e saltos
+acima da taxa física não somam no contador. O contador corrigido é a soma
+dos incrementos válidos ancorada na primeira leitura, portanto monotônico e
+contínuo através da troca de ECM (o valor de antes do zeramento é mantido)
+"""
+
+import polars as pl
+from io_rfvbi import is_sorted
+
+# Contador: (taxa máxima por hora, tolerância absoluta >= resolução do ECM)
+COUNTER_RATES = {
+    "SMH": (1.05, 1.0),
+    "Total_Fuel": (5000.0, 10.0),
+}
+RESET_FRACTION = 0.5
+
+AUDIT_SCHEMA = {
+    "Asset": pl.String,
+    "Timestamp": pl.Datetime,
+    "Counter": pl.String,
+    "Issue": pl.String,
+    "Raw": pl.Float64,
+    "Previous": pl.Float64,
+}
+
+
+def __steps(df: pl.DataFrame, rate: float, tol: float) -> pl.DataFrame:
+    """Incremento em relação à leitura anterior do mesmo ativo e se ele é
+    fisicamente possível
+    """
+    same_asset = pl.col("Asset_Id") == pl.col("Asset_Id").shift()
+    hours = (
+        pl.col("Timestamp") - pl.col("Timestamp").shift()
+    ).dt.total_seconds() / 3600
+    step = pl.when(same_asset).then(pl.col("Value") - pl.col("Value").shift())
+
+    return df.with_columns(
+        step.alias("Step"),
+        pl.col("Value").shift().alias("Previous"),
+        ((step >= -tol) & (step <= rate * hours + tol)).alias("Plausible"),
+    )
+
+
+def __spikes(df: pl.DataFrame, rate: float, tol: float) -> pl.Expr:
+    """Leitura isolada fora da taxa que a seguinte desfaz (ou a última do ativo)
+    A primeira do ativo não tem anterior: é pico quando o salto até a seguinte
+    é impossível e as seguintes concordam entre si
+    """
+    next_in_asset = pl.col("Asset_Id") == pl.col("Asset_Id").shift(-1)
+    hours_bridge = (
+        pl.col("Timestamp").shift(-1) - pl.col("Timestamp").shift()
+    ).dt.total_seconds() / 3600
+    bridge = pl.col("Value").shift(-1) - pl.col("Previous")
+
+    middle = (
+        pl.col("Step").is_not_null()
+        & ~pl.col("Plausible")
+        & (
+            ~next_in_asset.fill_null(False)
+            | (
+                ~pl.col("Plausible").shift(-1)
+                & (bridge >= 0)
+                & (bridge <= rate * hours_bridge + tol)
+            )
+        )
+    )
+    first = (
+        pl.col("Step").is_null()
+        & next_in_asset
+        & ~pl.col("Plausible").shift(-1)
+        & pl.col("Plausible").shift(-2)
+    )
+    return (middle | first).fill_null(False)
+
+
+def repair_counter(
+    df: pl.DataFrame, col: str, rate: float, tol: float
+) -> tuple[pl.Series, pl.DataFrame]:
+    """Contador corrigido (alinhado a df) e auditoria das correções
+    df deve estar ordenado por ativo e tempo e ter o Asset_Id inteiro
+    """
+    df_values = (
+        df.select(
+            pl.int_range(pl.len()).alias("Row"),
+            "Asset_Id",
+            "Timestamp",
+            pl.col(col).cast(pl.Float64).alias("Value"),
+        )
+        .drop_nulls("Value")
+        .pipe(__steps, rate, tol)
+    )
+    df_values = df_values.with_columns(__spikes(df_values, rate, tol).alias("Spike"))
+    df_spikes = df_values.filter(pl.col("Spike"))
+    df_values = df_values.filter(~pl.col("Spike")).drop(
+        "Step", "Previous", "Plausible", "Spike"
+    )
+
+    df_values = __steps(df_values, rate, tol).with_columns(
+        pl.when(pl.col("Plausible")).then(pl.col("Step")).otherwise(0).alias("Valid")
+    )
+    # Ancora na primeira leitura: após um zeramento o ECM novo recomeça baixo,
+    # mas o corrigido segue do valor anterior somando só os incrementos
+    # O cum_max absorve recuos dentro da tolerância (ruído de arredondamento)
+    df_values = df_values.with_columns(
+        (pl.col("Value").first() + pl.col("Valid").fill_null(0).cum_sum())
+        .cum_max()
+        .over("Asset_Id")
+        .alias("Corrected")
+    )
+
+    issue = (
+        pl.when(pl.col("Step") < 0)
+        .then(
+            pl.when(pl.col("Value") < pl.col("Previous") * RESET_FRACTION)
+            .then(pl.lit("Reset"))
+            .otherwise(pl.lit("Backward"))
+        )
+        .otherwise(pl.lit("Jump"))
+    )
+    df_audit = pl.concat(
+        [
+            df_spikes.select(
+                "Row", "Timestamp", pl.lit("Spike").alias("Issue"), "Value", "Previous"
+            ),
+            df_values.filter(
+                pl.col("Step").is_not_null() & ~pl.col("Plausible")
+            ).select("Row", "Timestamp", issue.alias("Issue"), "Value", "Previous"),
+        ]
+    )
+    df_audit = df_audit.select(
+        df["Asset"].gather(df_audit["Row"]),
+        "Timestamp",
+        pl.lit(col).alias("Counter"),
+        "Issue",
+        pl.col("Value").alias("Raw"),
+        "Previous",
+    )
+
+    corrected = (
+        pl.repeat(None, df.height, dtype=pl.Float64, eager=True)
+        .alias(col)
+        .scatter(df_values["Row"], df_values["Corrected"])
+    )
+    return corrected, df_audit
+
+
+def repair(df: pl.DataFrame) -> tuple[pl.DataFrame, pl.DataFrame]:
+    """Substitui SMH e Total_Fuel pelos contadores corrigidos
+    Retorna também a auditoria de todas as correções
+    """
+    df = df.with_columns(pl.col("Asset").cast(pl.String))
+    if not is_sorted(df):
+        df = df.sort(["Asset", "Timestamp"])
+
+    # Id inteiro do ativo: comparações e janelas sem custo de texto
+    df = df.with_columns(
+        (pl.col("Asset") != pl.col("Asset").shift())
+        .fill_null(True)
+        .cum_sum()
+        .alias("Asset_Id")
+    )
+
+    list_audit = [pl.DataFrame(schema=AUDIT_SCHEMA)]
+    for col, (rate, tol) in COUNTER_RATES.items():
+        if col not in df.columns:
+            continue
+        corrected, df_audit = repair_counter(df, col, rate, tol)
+        df = df.with_columns(corrected)
+        list_audit.append(df_audit)
+
+    df = df.drop("Asset_Id")
+    df_audit = pl.concat(list_audit, how="vertical_relaxed").sort(
+        ["Asset", "Timestamp", "Counter"]
+    )
+    if df_audit.height:
+        print(f"Contadores: {df_audit.height} leituras corrigidas")
+    return df, df_audit
+
+
+if __name__ == "__main__":
+
+    print("Execute o script através da GUI!")
@@ -1,15 +1,20 @@
 """GUI para do APP PowerProfile"""
 
+import queue
+import threading
+import time
+import traceback
 import webbrowser
 from tkinter import filedialog
 from tkinter.messagebox import showerror, showinfo, showwarning
 import customtkinter as ctk
-import rfvbi
+from version_rfvbi import SCRIPT_VERSION
 
-
-MAIN_WINDOW_TITLE = f"RFV TO BI {rfvbi.SCRIPT_VERSION}"
+MAIN_WINDOW_TITLE = f"RFV TO BI {SCRIPT_VERSION}"
 MIN_SIZE_WINDOW_WIDTH = 370
-MIN_SIZE_WINDOW_HEIGHT = 230
+MIN_SIZE_WINDOW_HEIGHT = 300
+POLL_INTERVAL_MS = 200
+PRELOAD_DELAY_MS = 500
 
 
 class GadgetsFuntions:
@@ -22,6 +27,18 @@ class GadgetsFuntions:
         self.concat = ctk.IntVar()
         self.is_trendbot = ctk.IntVar()
 
+        self.app = None
+        self.bt_run = None
+        self.bt_cancel = None
+        self.lb_status = None
+        self.events = queue.Queue()
+        self.cancel_token = None
+        self.worker = None
+        self.time_start = 0.0
+        self.stage = ""
+        self.asset = ""
+        self.last_stage = ""
+
     def getbd(self):
         """Pega o caminho do banco de dados"""
         dirname = filedialog.askdirectory(title="Selecione a pasta do BD do Cliente")
@@ -80,20 +97,131 @@ class GadgetsFuntions:
             showerror("Erro", tx_error)
             return
 
-        rfvbi.main(
-            self.path_db,
-            self.path_englog,
-            self.path_eventslog,
-            self.concat.get(),
-            self.is_trendbot.get(),
+        if self.worker is not None and self.worker.is_alive():
+            return
+
+        # Pipeline (polars, fastexcel...) só é carregado ao executar
+        from classes_rfvbi import (  # pylint: disable=import-outside-toplevel
+            CancelToken,
+        )
+
+        self.cancel_token = CancelToken()
+        self.events = queue.Queue()
+        self.time_start = time.perf_counter()
+        self.stage, self.asset, self.last_stage = "Iniciando", "", ""
+
+        self.worker = threading.Thread(
+            target=self._worker_main,
+            args=(
+                self.path_db,
+                self.path_englog,
+                self.path_eventslog,
+                self.concat.get(),
+                self.is_trendbot.get(),
+            ),
+            daemon=True,
+        )
+        self.bt_run.configure(state="disabled")
+        self.bt_cancel.configure(state="normal")
+        self.worker.start()
+        self.app.after(POLL_INTERVAL_MS, self.poll_events)
+
+    def cancel_run(self) -> None:
+        """Solicita o cancelamento, efetivado entre ativos e recusado depois
+        que a escrita das saídas começou
+        """
+        if self.cancel_token is not None:
+            if self.cancel_token.cancel():
+                self.stage = "Cancelando..."
+            else:
+                self.stage = "Gravando saídas, não é mais possível cancelar"
+            self.bt_cancel.configure(state="disabled")
+
+    def _worker_main(self, *args) -> None:
+        """Executa o RFV TO BI fora da thread da interface"""
+        # pylint: disable=import-outside-toplevel
+        import rfvbi
+        from classes_rfvbi import RunCancelled
+
+        try:
+            rfvbi.main(
+                *args,
+                progress_callback=lambda event: self.events.put(("span", event)),
+                cancel_token=self.cancel_token,
+            )
+        except RunCancelled:
+            self.events.put(("cancelled", None))
+        except Exception as error:  # pylint: disable=broad-exception-caught
+            traceback.print_exc()
+            self.events.put(("error", error))
+        else:
+            self.events.put(("done", None))
+
+    def poll_events(self) -> None:
+        """Lê os eventos da execução e atualiza a interface"""
+        while True:
+            try:
+                kind, payload = self.events.get_nowait()
+            except queue.Empty:
+                break
+
+            if kind == "span":
+                self._update_stage(payload)
+                if self.cancel_token.is_committed:
+                    self.bt_cancel.configure(state="disabled")
+            else:
+                self._finish_run(kind, payload)
+                return
+
+        self._show_status()
+        self.app.after(POLL_INTERVAL_MS, self.poll_events)
+
+    def _update_stage(self, event: dict) -> None:
+        """Atualiza etapa e ativo correntes a partir de um evento de span"""
+        if self.cancel_token.is_cancelled:
+            return
+        if event["event"] == "start":
+            if "asset" in event:
+                self.asset = event["asset"]
+            if event["name"] not in ("asset", "asset_events"):
+                self.stage = event["name"]
+        else:
+            self.last_stage = f"{event['name']} ({event['wall_s']:.1f} s)"
+
+    def _show_status(self) -> None:
+        """Mostra etapa, ativo e tempo decorrido"""
+        elapsed = int(time.perf_counter() - self.time_start)
+        text_status = (
+            f"{self.stage} | {self.asset} | {elapsed // 60:02d}:{elapsed % 60:02d}"
+        )
+        if self.last_stage:
+            text_status += f"\nÚltima etapa: {self.last_stage}"
+        self.lb_status.configure(text=text_status)
+
+    def _finish_run(self, kind: str, payload) -> None:
+        """Restaura a interface ao fim da execução"""
+        self.bt_run.configure(state="normal")
+        self.bt_cancel.configure(state="disabled")
+        elapsed = int(time.perf_counter() - self.time_start)
+        self.lb_status.configure(
+            text=f"Finalizado em {elapsed // 60:02d}:{elapsed % 60:02d}"
         )
-        showinfo("Sucesso!", "Resultados obitidos com sucesso!")
+
+        if kind == "done":
+            showinfo("Sucesso!", "Resultados obitidos com sucesso!")
+        elif kind == "cancelled":
+            showwarning(
+                "Cancelado", "Execução cancelada! As saídas não foram alteradas."
+            )
+        else:
+            showerror("Erro", f"Erro durante a execução:\n{payload}")
 
 
 def put_gadgets_main(app: ctk.CTk) -> None:
     """Coloca gadgets da janela principal"""
 
     runbt = GadgetsFuntions()
+    runbt.app = app
 
     tx_title = "RFV TO BI"
     lb_title = ctk.CTkLabel(app, text=tx_title)
@@ -109,6 +237,13 @@ def put_gadgets_main(app: ctk.CTk) -> None:
     bt_run = ctk.CTkButton(
         master=app, text="Executar", fg_color="Red", command=runbt.run_rfvtobi
     )
+    bt_cancel = ctk.CTkButton(
+        master=app, text="Cancelar", state="disabled", command=runbt.cancel_run
+    )
+    lb_status = ctk.CTkLabel(app, text="")
+    runbt.bt_run = bt_run
+    runbt.bt_cancel = bt_cancel
+    runbt.lb_status = lb_status
 
     cb_concat = ctk.CTkCheckBox(
         master=app,
@@ -124,17 +259,20 @@ def put_gadgets_main(app: ctk.CTk) -> None:
         variable=runbt.is_trendbot,
     )
 
-    bt_englog.place(relx=0.30, rely=0.25, anchor=ctk.CENTER)
-    bt_eventslog.place(relx=0.70, rely=0.25, anchor=ctk.CENTER)
-    bt_db.place(relx=0.30, rely=0.45, anchor=ctk.CENTER)
-    bt_run.place(relx=0.50, rely=0.80, anchor=ctk.CENTER)
+    bt_englog.place(relx=0.30, rely=0.20, anchor=ctk.CENTER)
+    bt_eventslog.place(relx=0.70, rely=0.20, anchor=ctk.CENTER)
+    bt_db.place(relx=0.30, rely=0.35, anchor=ctk.CENTER)
+    bt_run.place(relx=0.30, rely=0.80, anchor=ctk.CENTER)
+    bt_cancel.place(relx=0.70, rely=0.80, anchor=ctk.CENTER)
 
     cb_concat.select()
-    cb_concat.place(relx=0.70, rely=0.45, anchor=ctk.CENTER)
+    cb_concat.place(relx=0.70, rely=0.35, anchor=ctk.CENTER)
 
-    cb_trendbot.place(relx=0.50, rely=0.62, anchor=ctk.CENTER)
+    cb_trendbot.place(relx=0.50, rely=0.49, anchor=ctk.CENTER)
 
-    text_about = rfvbi.SCRIPT_VERSION + " - By Pedro Venancio - Sobre / Ajuda"
+    lb_status.place(relx=0.50, rely=0.64, anchor=ctk.CENTER)
+
+    text_about = SCRIPT_VERSION + " - By Pedro Venancio - Sobre / Ajuda"
     lb_about = ctk.CTkLabel(app, text=text_about, text_color="blue")
     lb_about.pack(side="bottom")
     lb_about.bind(
@@ -143,6 +281,12 @@ def put_gadgets_main(app: ctk.CTk) -> None:
     )
 
 
+def preload_pipeline() -> None:
+    """Importa o pipeline em segundo plano depois que a janela já apareceu"""
+    # pylint: disable=import-outside-toplevel,unused-import
+    import rfvbi  # noqa: F401
+
+
 def main() -> None:
     """Cria a janela principal"""
 
@@ -156,6 +300,10 @@ def main() -> None:
     app.resizable(False, False)
 
     put_gadgets_main(app)
+    app.after(
+        PRELOAD_DELAY_MS,
+        lambda: threading.Thread(target=preload_pipeline, daemon=True).start(),
+    )
 
     app.mainloop()
 
@@ -165,7 +313,7 @@ if __name__ == "__main__":
     print(
         "Bem-vindo ao PowerProfile! \n",
         "Versão: ",
-        rfvbi.SCRIPT_VERSION,
+        SCRIPT_VERSION,
         "\n",
     )
 
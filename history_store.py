@@ -0,0 +1,196 @@
+"""Armazenamento indexado do histórico de motores
+Um parquet por ativo ordenado por Timestamp, com estatísticas por row group,
+e um índice com o intervalo de datas e as colunas de cada ativo. Consultas
+por ativo e período leem somente os arquivos, row groups e colunas necessários
+
+Uso:
+    from history_store import get_history
+    df = get_history(path_holder.history_store, ["SN1"], "2024-01-01", "2024-02-01",
+                     ["Load", "RPM"])
+"""
+
+import json
+import os
+from datetime import date, datetime
+import polars as pl
+
+INDEX_FILE = "_index.json"
+ROW_GROUP_SIZE = 50_000
+ID_COLS = ["Timestamp", "Asset"]
+
+
+def __asset_file(path_store: str, asset: str) -> str:
+    """Arquivo parquet de um ativo"""
+    return os.path.join(path_store, f"{asset}.parquet")
+
+
+def __to_datetime(value) -> datetime | None:
+    """Aceita datetime, date ou texto ISO"""
+    if value is None or isinstance(value, datetime):
+        return value
+    if isinstance(value, date):
+        return datetime.combine(value, datetime.min.time())
+    return datetime.fromisoformat(str(value))
+
+
+def read_index(path_store: str) -> dict[str, dict]:
+    """Índice do armazenamento: ativo -> arquivo, início, fim, linhas, colunas"""
+    try:
+        with open(os.path.join(path_store, INDEX_FILE), "r", encoding="utf-8") as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return {}
+
+
+def __write_index(path_store: str, dict_index: dict) -> None:
+    """Grava o índice de forma atômica"""
+    path_index = os.path.join(path_store, INDEX_FILE)
+    path_tmp = f"{path_index}.{os.getpid()}.tmp"
+    with open(path_tmp, "w", encoding="utf-8") as file:
+        json.dump(dict_index, file, indent=1)
+    os.replace(path_tmp, path_index)
+
+
+def __fingerprint(df_asset: pl.DataFrame) -> str:
+    """Assinatura do conteúdo de um ativo (colunas, linhas e valores)"""
+    return f"{df_asset.height}:{df_asset.hash_rows(seed=0).sum()}:{df_asset.columns}"
+
+
+def __write_asset(path_store: str, asset: str, df_asset: pl.DataFrame) -> dict:
+    """Grava o parquet de um ativo e retorna sua entrada no índice"""
+    df_asset = df_asset.sort("Timestamp")
+    path_asset = __asset_file(path_store, asset)
+    path_tmp = f"{path_asset}.{os.getpid()}.tmp"
+    df_asset.write_parquet(path_tmp, row_group_size=ROW_GROUP_SIZE, statistics=True)
+    os.replace(path_tmp, path_asset)
+
+    return {
+        "file": os.path.basename(path_asset),
+        "start": df_asset["Timestamp"].min().isoformat(),
+        "end": df_asset["Timestamp"].max().isoformat(),
+        "rows": df_asset.height,
+        "columns": df_asset.columns,
+        "fingerprint": __fingerprint(df_asset),
+    }
+
+
+def __prune_asset(
+    path_store: str, asset: str, entry: dict, start: datetime
+) -> dict | None:
+    """Descarta as linhas de um ativo anteriores a start
+    Retorna a nova entrada do índice ou None se nada restou
+    """
+    if datetime.fromisoformat(entry["start"]) >= start:
+        return entry
+
+    path_asset = os.path.join(path_store, entry["file"])
+    df_asset = pl.read_parquet(path_asset).filter(pl.col("Timestamp") >= start)
+    if df_asset.is_empty():
+        os.remove(path_asset)
+        return None
+    return __write_asset(path_store, asset, df_asset)
+
+
+def update_store(
+    path_store: str, df_full: pl.DataFrame, start: datetime | None = None
+) -> list[str]:
+    """Sincroniza o armazenamento com o histórico atualizado
+    Regrava os ativos cujo conteúdo mudou (dados novos, colunas recalculadas
+    pelo run_alldata ou linhas que saíram da janela). Ativos ausentes de
+    df_full são mantidos, apenas podados para a mesma janela (start)
+    """
+    os.makedirs(path_store, exist_ok=True)
+    dict_index = read_index(path_store)
+
+    df_full = df_full.with_columns(pl.col("Asset").cast(pl.String))
+    dict_assets = df_full.partition_by("Asset", as_dict=True)
+    set_assets = {key[0] for key in dict_assets}
+
+    if start is not None:
+        for asset in sorted(set(dict_index) - set_assets):
+            entry = __prune_asset(path_store, asset, dict_index[asset], start)
+            if entry is None:
+                del dict_index[asset]
+            else:
+                dict_index[asset] = entry
+
+    list_written = []
+    for asset in sorted(set_assets):
+        # Colunas só com nulos neste ativo não precisam ser guardadas
+        df_asset = dict_assets[(asset,)]
+        df_asset = df_asset.select(
+            [
+                col
+                for col in df_asset.columns
+                if col in ID_COLS or df_asset[col].null_count() < df_asset.height
+            ]
+        ).sort("Timestamp")
+        entry = dict_index.get(asset, {})
+        if entry.get("fingerprint") == __fingerprint(df_asset) and os.path.isfile(
+            __asset_file(path_store, asset)
+        ):
+            continue
+        dict_index[asset] = __write_asset(path_store, asset, df_asset)
+        list_written.append(asset)
+
+    __write_index(path_store, dict_index)
+    return list_written
+
+
+def get_history(
+    path_store: str,
+    assets: list[str] | None = None,
+    start=None,
+    end=None,
+    columns: list[str] | None = None,
+) -> pl.DataFrame:
+    """Histórico dos ativos entre start (inclusive) e end (exclusive)
+    assets/columns = None retornam todos; colunas ausentes em um ativo vêm nulas
+    """
+    dict_index = read_index(path_store)
+    start, end = __to_datetime(start), __to_datetime(end)
+
+    list_frames = []
+    for asset in sorted(dict_index) if assets is None else assets:
+        entry = dict_index.get(asset)
+        if entry is None:
+            continue
+        # Poda pelo índice antes de abrir o arquivo
+        if start is not None and datetime.fromisoformat(entry["end"]) < start:
+            continue
+        if end is not None and datetime.fromisoformat(entry["start"]) >= end:
+            continue
+
+        lf = pl.scan_parquet(os.path.join(path_store, entry["file"]))
+        # Poda de row groups pelas estatísticas de Timestamp
+        if start is not None:
+            lf = lf.filter(pl.col("Timestamp") >= start)
+        if end is not None:
+            lf = lf.filter(pl.col("Timestamp") < end)
+        if columns is not None:
+            lf = lf.select(
+                ID_COLS + [col for col in columns if col in entry["columns"]]
+            )
+        list_frames.append(lf)
+
+    if not list_frames:
+        return pl.DataFrame(
+            schema={"Timestamp": pl.Datetime("us"), "Asset": pl.String}
+            | {col: pl.Float64 for col in columns or []}
+        )
+
+    df = pl.concat(list_frames, how="diagonal_relaxed").collect()
+    if columns is not None:
+        df = df.with_columns(
+            [
+                pl.lit(None, pl.Float64).alias(col)
+                for col in columns
+                if col not in df.columns
+            ]
+        ).select(ID_COLS + [col for col in columns if col not in ID_COLS])
+    return df
+
+
+if __name__ == "__main__":
+
+    print("Execute o script através da GUI!")
@@ -0,0 +1,268 @@
+"""Instrumentação de tempo e memória das etapas do RFV TO BI"""
+
+import cProfile
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+
+SAMPLE_INTERVAL_S = 0.05
+
+_current_run = ContextVar("current_run", default=None)
+_current_span = ContextVar("current_span", default=None)
+
+
+def current_rss() -> int:
+    """Retorna a memória residente atual do processo em bytes"""
+    if sys.platform == "win32":
+        # pylint: disable=import-outside-toplevel
+        import ctypes
+        from ctypes import wintypes
+
+        class ProcessMemoryCounters(ctypes.Structure):
+            """Estrutura PROCESS_MEMORY_COUNTERS da API do Windows"""
+
+            _fields_ = [
+                ("cb", wintypes.DWORD),
+                ("PageFaultCount", wintypes.DWORD),
+                ("PeakWorkingSetSize", ctypes.c_size_t),
+                ("WorkingSetSize", ctypes.c_size_t),
+                ("QuotaPeakPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                ("PagefileUsage", ctypes.c_size_t),
+                ("PeakPagefileUsage", ctypes.c_size_t),
+            ]
+
+        counters = ProcessMemoryCounters()
+        counters.cb = ctypes.sizeof(ProcessMemoryCounters)
+        ctypes.windll.psapi.GetProcessMemoryInfo(
+            ctypes.windll.kernel32.GetCurrentProcess(),
+            ctypes.byref(counters),
+            counters.cb,
+        )
+        return counters.WorkingSetSize
+
+    try:
+        with open("/proc/self/statm", "r", encoding="ascii") as file:
+            return int(file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        # pylint: disable=import-outside-toplevel
+        import resource
+
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def file_size(path: str) -> int:
+    """Tamanho do arquivo em bytes, zero se não existir"""
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+class MemorySampler:
+    """Amostra a memória residente em paralelo e atualiza o pico dos spans abertos"""
+
+    def __init__(self) -> None:
+        self.peak = 0
+        self.open_spans = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+
+    def _sample(self) -> None:
+        while not self._stop.is_set():
+            self.update()
+            self._stop.wait(SAMPLE_INTERVAL_S)
+
+    def update(self) -> int:
+        """Lê a memória atual e propaga o pico"""
+        rss = current_rss()
+        self.peak = max(self.peak, rss)
+        with self._lock:
+            for span_open in self.open_spans:
+                span_open.peak_rss = max(span_open.peak_rss, rss)
+        return rss
+
+    def add(self, span_open) -> None:
+        """Registra um span aberto"""
+        with self._lock:
+            self.open_spans.add(span_open)
+
+    def remove(self, span_open) -> None:
+        """Remove um span fechado"""
+        with self._lock:
+            self.open_spans.discard(span_open)
+
+    def __enter__(self):
+        self.peak = current_rss()
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._stop.set()
+        self._thread.join()
+        self.update()
+
+
+class Span:
+    """Medição de uma etapa, com filhos aninhados"""
+
+    def __init__(self, name: str, attrs: dict) -> None:
+        self.name = name
+        self.attrs = attrs
+        self.children = []
+        self.wall_s = 0.0
+        self.cpu_s = 0.0
+        self.peak_rss = 0
+        self.rows_in = None
+        self.rows_out = None
+        self.bytes_read = 0
+        self.bytes_written = 0
+        self.status = "ok"
+
+    def to_dict(self) -> dict:
+        """Converte o span para dicionário serializável"""
+        return {
+            "name": self.name,
+            **self.attrs,
+            "status": self.status,
+            "wall_s": round(self.wall_s, 4),
+            "cpu_s": round(self.cpu_s, 4),
+            "peak_rss_mb": round(self.peak_rss / 2**20, 1),
+            "rows_in": self.rows_in,
+            "rows_out": self.rows_out,
+            "bytes_read": self.bytes_read,
+            "bytes_written": self.bytes_written,
+            "children": [child.to_dict() for child in self.children],
+        }
+
+
+class RunReport:
+    """Relatório de uma execução com a árvore de spans"""
+
+    def __init__(
+        self, name: str, profile_stages: tuple[str, ...] = (), listeners: tuple = ()
+    ) -> None:
+        self.root = Span(name, {})
+        self.listeners = [listener for listener in listeners if listener]
+        self.started = datetime.now()
+        self.profile_stages = set(profile_stages)
+        self.save_dir = None
+        self.sampler = MemorySampler()
+        self.profiles = {}
+        self.active_profiler = None
+
+    def to_dict(self) -> dict:
+        """Converte o relatório para dicionário serializável"""
+        return {
+            "started": self.started.strftime("%Y-%m-%d %H:%M:%S"),
+            "pid": os.getpid(),
+            **self.root.to_dict(),
+        }
+
+    def save(self) -> str | None:
+        """Salva o relatório em JSON e os perfis do cProfile"""
+        if not self.save_dir:
+            return None
+
+        os.makedirs(self.save_dir, exist_ok=True)
+        stamp = self.started.strftime("%Y%m%d_%H%M%S")
+        path_report = os.path.join(self.save_dir, f"run_{stamp}_{os.getpid()}.json")
+        with open(path_report, "w", encoding="utf-8") as file:
+            json.dump(self.to_dict(), file, indent=2, ensure_ascii=False)
+
+        for stage, profiler in self.profiles.items():
+            profiler.dump_stats(
+                os.path.join(self.save_dir, f"run_{stamp}_{os.getpid()}_{stage}.prof")
+            )
+
+        print(f"Relatório de execução salvo em {path_report}\n")
+        return path_report
+
+    def notify(self, event: str, span_event: Span) -> None:
+        """Envia o início ou fim de um span aos ouvintes (ex.: GUI)"""
+        for listener in self.listeners:
+            listener(
+                {
+                    "event": event,
+                    "name": span_event.name,
+                    "wall_s": span_event.wall_s,
+                    "status": span_event.status,
+                    **span_event.attrs,
+                }
+            )
+
+
+@contextmanager
+def run_report(name: str, profile_stages: tuple[str, ...] = (), listeners: tuple = ()):
+    """Abre uma execução instrumentada, salva o relatório ao final
+    listeners: funções chamadas com um dicionário a cada início e fim de span
+    """
+    report = RunReport(name, profile_stages, listeners)
+    token_run = _current_run.set(report)
+    try:
+        with report.sampler:
+            with span(name) as root:
+                report.root = root
+                yield report
+    finally:
+        _current_run.reset(token_run)
+        # Falha ao salvar o relatório não pode esconder o erro da execução
+        try:
+            report.save()
+        except Exception as error:  # pylint: disable=broad-exception-caught
+            print(f"Aviso: não foi possível salvar o relatório de execução: {error}")
+
+
+@contextmanager
+def span(name: str, **attrs):
+    """Mede uma etapa: tempo, CPU, pico de memória, linhas e bytes"""
+    report = _current_run.get()
+    parent = _current_span.get()
+    span_new = Span(name, attrs)
+
+    if parent is not None:
+        parent.children.append(span_new)
+
+    profiler = None
+    if report is not None:
+        span_new.peak_rss = report.sampler.update()
+        report.sampler.add(span_new)
+        if name in report.profile_stages and report.active_profiler is None:
+            profiler = report.profiles.setdefault(name, cProfile.Profile())
+            report.active_profiler = profiler
+        report.notify("start", span_new)
+
+    token_span = _current_span.set(span_new)
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+    if profiler:
+        profiler.enable()
+    try:
+        yield span_new
+    except BaseException:
+        span_new.status = "error"
+        raise
+    finally:
+        if profiler:
+            profiler.disable()
+            report.active_profiler = None
+        span_new.wall_s = time.perf_counter() - wall_start
+        span_new.cpu_s = time.process_time() - cpu_start
+        _current_span.reset(token_span)
+        if report is not None:
+            report.sampler.update()
+            report.sampler.remove(span_new)
+            report.notify("end", span_new)
+
+
+if __name__ == "__main__":
+
+    print("Execute o script através da GUI!")
@@ -0,0 +1,207 @@
+"""Funções de escrita das saídas do RFV TO BI e utilitários das atualizações
+incrementais sobre o histórico
+"""
+
+import os
+import time
+import polars as pl
+
+DATETIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+REPLACE_RETRIES = 10
+REPLACE_WAIT_S = 0.5
+
+
+def is_sorted(df: pl.DataFrame) -> bool:
+    """Verifica se já está ordenado por ativo e tempo (caso do histórico)"""
+    same_asset = pl.col("Asset") == pl.col("Asset").shift()
+    return not df.select(
+        (pl.col("Asset") < pl.col("Asset").shift()).any()
+        | (same_asset & (pl.col("Timestamp") < pl.col("Timestamp").shift())).any()
+    ).item()
+
+
+def optional_col(df: pl.DataFrame, col: str) -> pl.Expr:
+    """Canal opcional do histórico, nulo (Float64) se o ativo não o registra"""
+    return (pl.col(col) if col in df.columns else pl.lit(None, pl.Float64)).alias(col)
+
+
+def write_csv_atomic(df: pl.DataFrame, path: str) -> None:
+    """Escreve o csv em um arquivo temporário e substitui o destino de uma vez
+    Evita que o Power BI leia um arquivo escrito pela metade
+    """
+    path_tmp = f"{path}.{os.getpid()}.tmp"
+    df.write_csv(path_tmp, datetime_format=DATETIME_FORMAT)
+
+    for attempt in range(REPLACE_RETRIES):
+        try:
+            os.replace(path_tmp, path)
+            return
+        except PermissionError:
+            # Arquivo aberto por outro processo (ex.: atualização do Power BI)
+            if attempt == REPLACE_RETRIES - 1:
+                os.remove(path_tmp)
+                raise
+            time.sleep(REPLACE_WAIT_S)
+
+
+def read_output(path: str, schema: dict | None = None) -> pl.DataFrame | None:
+    """Lê uma saída csv já existente aplicando os tipos informados
+    Colunas não informadas são convertidas para Float64 quando possível
+    """
+    if not os.path.isfile(path):
+        return None
+
+    schema = schema or {}
+    df = pl.read_csv(path, infer_schema_length=0)
+    return df.with_columns(
+        [
+            (
+                pl.col(col).str.strptime(pl.Datetime, DATETIME_FORMAT, strict=False)
+                if dtype == pl.Datetime
+                else (
+                    pl.col(col).str.strptime(pl.Date, "%Y-%m-%d", strict=False)
+                    if dtype == pl.Date
+                    else pl.col(col).cast(dtype, strict=False)
+                )
+            )
+            for col, dtype in schema.items()
+            if col in df.columns
+        ]
+        + [
+            pl.col(col).cast(pl.Float64, strict=False)
+            for col in df.columns
+            if col not in schema
+        ]
+    )
+
+
+def merge_incremental(
+    path: str,
+    df_new: pl.DataFrame,
+    keys: list[str],
+    schema: dict | None = None,
+    sort_by: list[str] | None = None,
+) -> pl.DataFrame:
+    """Atualiza uma saída somente nas chaves recalculadas
+    Linhas existentes com as mesmas chaves de df_new são substituídas
+    """
+    df_old = read_output(path, schema)
+
+    if df_old is not None and not df_old.is_empty():
+        df_touched = df_new.select(keys).unique()
+        df_old = df_old.join(df_touched, on=keys, how="anti", join_nulls=True)
+        df_new = pl.concat([df_old, df_new], how="diagonal_relaxed")
+
+    df_new = df_new.sort(sort_by or keys)
+    write_csv_atomic(df_new, path)
+    return df_new
+
+
+def recalc_starts(
+    df_current: pl.DataFrame, df_old: pl.DataFrame, max_gap_s: float, lookback: int = 0
+) -> pl.DataFrame:
+    """Início do recálculo (Recalc_Start) por ativo de uma saída em trechos
+    (Start/End): o início do primeiro trecho gravado que termina a menos de
+    max_gap_s do primeiro dado novo, recuando mais lookback trechos, ou o
+    próprio dado novo. Nulo quando o ativo não tem trechos gravados
+    """
+    df_first = (
+        df_current.group_by(pl.col("Asset").cast(pl.String))
+        .agg(pl.col("Timestamp").min().cast(pl.Datetime("us")).alias("First_New"))
+        .drop_nulls()
+    )
+    df_old = df_old.select(
+        pl.col("Asset").cast(pl.String),
+        pl.col("Start")
+        .shift(lookback)
+        .over("Asset", order_by="Start")
+        .fill_null(pl.col("Start").min().over("Asset"))
+        .alias("From"),
+        "End",
+    )
+    limit = pl.col("First_New") - pl.duration(seconds=max_gap_s)
+    return (
+        df_first.join(df_old, on="Asset", how="left")
+        .group_by("Asset", "First_New")
+        .agg(
+            pl.col("From").filter(pl.col("End") >= limit).min(),
+            pl.col("End").count().alias("Stored"),
+        )
+        .select(
+            "Asset",
+            pl.when(pl.col("Stored") > 0)
+            .then(pl.min_horizontal("First_New", "From").cast(pl.Datetime("us")))
+            .alias("Recalc_Start"),
+        )
+    )
+
+
+def in_recalc(df_recalc: pl.DataFrame) -> pl.Expr:
+    """Amostras (Asset, Timestamp) a partir do Recalc_Start do seu ativo
+    Filtro sem join, preservando a ordem do histórico
+    """
+    recalc_start = pl.col("Asset").replace_strict(
+        df_recalc["Asset"], df_recalc["Recalc_Start"], default=None
+    )
+    return pl.col("Asset").is_in(df_recalc["Asset"]) & (
+        recalc_start.is_null() | (pl.col("Timestamp") >= recalc_start)
+    )
+
+
+def merge_from(
+    path: str,
+    df_old: pl.DataFrame,
+    df_new: pl.DataFrame,
+    df_recalc: pl.DataFrame,
+    sort_by: list[str],
+) -> pl.DataFrame:
+    """Atualiza uma saída em trechos a partir de Recalc_Start de cada ativo
+    Trechos gravados anteriores ao recálculo são mantidos; os demais são
+    substituídos por df_new
+    """
+    if not df_old.is_empty():
+        replaced = pl.col("Asset").is_in(df_recalc["Asset"]) & (
+            pl.col("Recalc_Start").is_null()
+            | (pl.col("Start") >= pl.col("Recalc_Start"))
+        )
+        df_old = (
+            df_old.with_columns(pl.col("Asset").cast(pl.String))
+            .join(df_recalc, on="Asset", how="left")
+            .filter(~replaced)
+            .drop("Recalc_Start")
+        )
+        df_new = pl.concat([df_old, df_new], how="diagonal_relaxed")
+
+    df_new = df_new.sort(sort_by)
+    write_csv_atomic(df_new, path)
+    return df_new
+
+
+def touched_periods(df_new: pl.DataFrame, keys: list[str], every: str) -> pl.DataFrame:
+    """Períodos (Period) por chave que receberam dados novos"""
+    return (
+        df_new.select(
+            *[pl.col(col).cast(pl.String) for col in keys],
+            pl.col("Timestamp").dt.truncate(every).alias("Period"),
+        )
+        .drop_nulls("Period")
+        .unique()
+    )
+
+
+def filter_periods(
+    df: pl.DataFrame, df_touched: pl.DataFrame, keys: list[str], every: str
+) -> pl.DataFrame:
+    """Linhas de df nos períodos tocados, que são recalculados por inteiro"""
+    return df.with_columns(pl.col(keys).cast(pl.String)).join(
+        df_touched,
+        left_on=[*keys, pl.col("Timestamp").dt.truncate(every)],
+        right_on=[*keys, "Period"],
+        how="semi",
+        join_nulls=True,
+    )
+
+
+if __name__ == "__main__":
+
+    print("Execute o script através da GUI!")
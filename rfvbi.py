@@ -3,6 +3,7 @@ RFV to BI
 Developed by Pedro Venancio
 """
 
+import csv
 import os
 from shutil import rmtree
 from functools import reduce
@@ -11,14 +12,21 @@ import zipfile
 import re
 import polars as pl
 import fastexcel  # pylint: disable=unused-import
-from classes_rfvbi import PathHolder
+from classes_rfvbi import AssetRegistry, CancelToken, PathHolder, RunCancelled
+from config_cache import read_sheet, source_signature
 import calc_engdata
+import instrumentation
+from io_rfvbi import write_csv_atomic
+import history_store
+from instrumentation import file_size, span
 from special_parse import additional_cols, eng_separator
-from trendbot import run_trendbot
+import analytics
+from analytics.resample import resample
+from trendbot import TRENDBOT_COLUMNS, run_trendbot
+import validation
+from version_rfvbi import SCRIPT_VERSION  # pylint: disable=unused-import
 
 
-SCRIPT_VERSION = "V6.4.1"
-
 ESSENTIALS_COL = (
     "Timestamp",
     "Load",
@@ -82,6 +90,14 @@ DICT_COLNAME = {
     "Heading": ["Heading [Degrees]"],
 }
 
+# Leitura em lotes para logs muito grandes
+BATCH_FILE_THRESHOLD = 512 * 2**20
+DEFAULT_BATCH_ROWS = 200_000
+TRANSCODE_CHUNK_CHARS = 2**22
+
+# Projeção de colunas por assinatura de cabeçalho e versão do ConfigScript
+_PROJECTION_CACHE = {}
+
 TUPLE_COLEVENT = (
     "Timestamp",
     "Type",
@@ -95,13 +111,16 @@ TUPLE_COLEVENT = (
 # Auxiliar Funtions
 
 
-def delete_data(dbpath: str) -> None:
-    """Deleta todos os arquivos e pasta de uma pasta"""
+def delete_data(dbpath: str, keep: tuple[str, ...] = ()) -> None:
+    """Deleta todos os arquivos e pasta de uma pasta, exceto os de keep"""
     tx_warning = """Opção sem concatenação selecionada!
 Deletando dados anteriores..."""
     print(tx_warning)
+    set_keep = {os.path.normpath(path) for path in keep}
     for filename in os.listdir(dbpath):
         file_path = os.path.join(dbpath, filename)
+        if os.path.normpath(file_path) in set_keep:
+            continue
         if os.path.isfile(file_path) or os.path.islink(file_path):
             os.remove(file_path)
         elif os.path.isdir(file_path):
@@ -126,11 +145,9 @@ def get_sn(nome_arquivo: str) -> str | None:
         return None
 
 
-def get_assets(path):
-    """Retorna um set com todos os ativos cadastrados"""
-    df_assetinfo = pl.read_excel(path, sheet_name="ASSET_LIST")
-    set_assets = set(df_assetinfo["Serial"].to_list())
-    return set_assets
+def get_assets(path: str) -> AssetRegistry:
+    """Retorna o cadastro de todos os ativos, indexado por Serial"""
+    return AssetRegistry.from_excel(path)
 
 
 def numeric_convert(col):
@@ -184,9 +201,11 @@ def datalimiter(df: pl.DataFrame, daylimit: int) -> pl.DataFrame:
 # Main Funtions
 
 
-def rename_col(df: pl.DataFrame, sn: str, path_config: str) -> pl.DataFrame:
-    """Renomeia as colunas para padronizar"""
-    df_rename = pl.read_excel(path_config, sheet_name="ListaParm")
+def get_rename_map(
+    columns: list[str], sn: str, path_config: str
+) -> tuple[dict[str, str], list[str]]:
+    """Retorna o mapa de renomeação e as colunas essenciais faltantes"""
+    df_rename = read_sheet(path_config, "ListaParm")
     df_rename = df_rename.filter(pl.col("SN") == sn)
     dict_rename = dict()
     list_missingcol = []
@@ -200,7 +219,7 @@ def rename_col(df: pl.DataFrame, sn: str, path_config: str) -> pl.DataFrame:
 
         for keycolname, valuecolname in dict_rename.items():
             if col_newname == valuecolname:
-                if keycolname in df.columns:
+                if keycolname in columns:
                     col_found = True
                     break
 
@@ -208,7 +227,7 @@ def rename_col(df: pl.DataFrame, sn: str, path_config: str) -> pl.DataFrame:
             continue
 
         for col_oldname in DICT_COLNAME[col_newname]:
-            if col_oldname in df.columns:
+            if col_oldname in columns:
                 dict_rename[col_oldname] = col_newname
                 col_found = True
                 break
@@ -216,20 +235,69 @@ def rename_col(df: pl.DataFrame, sn: str, path_config: str) -> pl.DataFrame:
         if not col_found and col_newname in ESSENTIALS_COL:
             list_missingcol.append(col_newname)
 
+    return dict_rename, list_missingcol
+
+
+def apply_rename(
+    df: pl.DataFrame, dict_rename: dict[str, str], list_missingcol: list[str]
+) -> pl.DataFrame:
+    """Aplica o mapa de renomeação e cria as colunas essenciais faltantes"""
+    df = df.rename(dict_rename)
+
+    df = df.with_columns([pl.lit(None).alias(colmiss) for colmiss in list_missingcol])
+
+    return df
+
+
+def rename_col(df: pl.DataFrame, sn: str, path_config: str) -> pl.DataFrame:
+    """Renomeia as colunas para padronizar"""
+    dict_rename, list_missingcol = get_rename_map(df.columns, sn, path_config)
+
     if list_missingcol:
         print(
             f"{list_missingcol} Não encontrado(s) para o ativo {sn}! Verifique o ConfigScript!"
         )
 
-    df = df.rename(dict_rename)
-
-    df = df.with_columns([pl.lit(None).alias(colmiss) for colmiss in list_missingcol])
+    df = apply_rename(df, dict_rename, list_missingcol)
 
     print("Colunas padronizadas!")
 
     return df
 
 
+def read_header(path: str, encoding: str = "utf-16le") -> list[str]:
+    """Lê somente a linha de cabeçalho do csv (sem o BOM, como o polars)"""
+    with open(path, "r", encoding=encoding, newline="") as file:
+        line = file.readline().lstrip("\ufeff")
+    return next(csv.reader([line.rstrip("\r\n")]))
+
+
+def resolve_projection(
+    header: list[str], sn: str, path_config: str, list_colstd: list[str]
+) -> tuple[list[str], dict[str, str], list[str]]:
+    """Resolve as colunas do arquivo que serão usadas e o mapa de renomeação
+    O resultado fica em cache pela assinatura do cabeçalho e do ConfigScript
+    (tamanho e mtime), de modo que o modo watch enxerga edições da ListaParm
+    """
+    key = (
+        tuple(header),
+        sn,
+        path_config,
+        source_signature(path_config),
+        tuple(list_colstd),
+    )
+    if key not in _PROJECTION_CACHE:
+        dict_rename, list_missingcol = get_rename_map(header, sn, path_config)
+        set_colstd = set(list_colstd)
+        columns = [
+            col
+            for col in header
+            if col in set_colstd or dict_rename.get(col) in set_colstd
+        ]
+        _PROJECTION_CACHE[key] = (columns, dict_rename, list_missingcol)
+    return _PROJECTION_CACHE[key]
+
+
 def define_types(df: pl.DataFrame, list_colstd: list[str]) -> pl.DataFrame:
     """Define tipos de dados das colunas"""
     col_selected = [col for col in list_colstd if col in df.columns]
@@ -261,10 +329,12 @@ def define_types(df: pl.DataFrame, list_colstd: list[str]) -> pl.DataFrame:
     return df
 
 
-def cleandata(df: pl.DataFrame, pathconfig: str, sheetname: str) -> pl.DataFrame:
-    """Limpa os dados inválidos e dados não utilizados"""
+def get_invalid_values(
+    pathconfig: str, sheetname: str
+) -> tuple[list[str], list[int], list[float]]:
+    """Lê os valores inválidos da configuração separados por tipo"""
 
-    df_invalid_data = pl.read_excel(pathconfig, sheet_name=sheetname)
+    df_invalid_data = read_sheet(pathconfig, sheetname)
     colname = df_invalid_data.columns[0]
     list_invalid = df_invalid_data[colname].to_list()
 
@@ -282,6 +352,16 @@ def cleandata(df: pl.DataFrame, pathconfig: str, sheetname: str) -> pl.DataFrame
             invalid_float.append(item)
             invalid_int.append(int(item))
 
+    return invalid_str, invalid_int, invalid_float
+
+
+def clean_invalid(
+    df: pl.DataFrame, invalid_values: tuple[list[str], list[int], list[float]]
+) -> pl.DataFrame:
+    """Remove os valores inválidos e as linhas sem nenhum dado"""
+
+    invalid_str, invalid_int, invalid_float = invalid_values
+
     df = df.with_columns(
         [
             pl.when(pl.col(col).is_in(invalid_str))
@@ -325,25 +405,156 @@ def cleandata(df: pl.DataFrame, pathconfig: str, sheetname: str) -> pl.DataFrame
     return df
 
 
+def cleandata(df: pl.DataFrame, pathconfig: str, sheetname: str) -> pl.DataFrame:
+    """Limpa os dados inválidos e dados não utilizados"""
+    return clean_invalid(df, get_invalid_values(pathconfig, sheetname))
+
+
+def transcode_utf16(path_in: str, path_out: str) -> None:
+    """Converte o csv utf-16le para utf-8 em blocos, sem carregar o arquivo"""
+    with open(path_in, "r", encoding="utf-16le", newline="") as file_in, open(
+        path_out, "w", encoding="utf-8", newline=""
+    ) as file_out:
+        chunk = file_in.read(TRANSCODE_CHUNK_CHARS)
+        file_out.write(chunk.lstrip("\ufeff"))
+        while chunk := file_in.read(TRANSCODE_CHUNK_CHARS):
+            file_out.write(chunk)
+
+
+def read_englog_batched(
+    path_engfile: str,
+    sn: str,
+    path_holder: PathHolder,
+    list_colstd: list[str],
+    batch_rows: int | None = None,
+) -> tuple[pl.DataFrame, int, int]:
+    """Lê um log de motor em lotes de batch_rows linhas
+    Cada lote é renomeado, tipado e limpo assim que lido, de modo que o texto
+    do arquivo nunca fica inteiro em memória; os dados tipados do ativo ficam
+    (como na leitura direta), em chunks sem cópia para um quadro contíguo
+    Retorna os dados, o número de linhas lidas e o de lotes
+    """
+    dir_spool = path_holder.englogs + "_spool/"
+    os.makedirs(dir_spool, exist_ok=True)
+    path_utf8 = dir_spool + sn + ".csv"
+
+    with span("transcode") as sp:
+        transcode_utf16(path_engfile, path_utf8)
+        sp.bytes_read = file_size(path_engfile)
+        sp.bytes_written = file_size(path_utf8)
+
+    batch_rows = batch_rows or DEFAULT_BATCH_ROWS
+
+    header = read_header(path_utf8, encoding="utf-8")
+    columns, dict_rename, list_missingcol = resolve_projection(
+        header, sn, path_holder.config, list_colstd
+    )
+    if list_missingcol:
+        print(
+            f"{list_missingcol} Não encontrado(s) para o ativo {sn}! Verifique o ConfigScript!"
+        )
+    invalid_values = get_invalid_values(path_holder.config, "DadosInvalidos")
+
+    def prepare(df_batch: pl.DataFrame) -> pl.DataFrame:
+        df_batch = apply_rename(df_batch, dict_rename, list_missingcol)
+        df_batch = define_types(df_batch, list_colstd)
+        return clean_invalid(df_batch, invalid_values)
+
+    reader = pl.read_csv_batched(
+        path_utf8, infer_schema_length=0, batch_size=batch_rows, columns=columns
+    )
+    list_batches = []
+    rows_in = 0
+    while batches := reader.next_batches(1):
+        with span("batch", batch=len(list_batches)) as sp:
+            rows_in += batches[0].height
+            sp.rows_in = batches[0].height
+            list_batches.append(prepare(batches[0]))
+            sp.rows_out = list_batches[-1].height
+            del batches
+
+    os.remove(path_utf8)
+    n_batches = len(list_batches)
+    print(f"{rows_in} linhas lidas em {n_batches} lote(s) de {batch_rows}")
+
+    if not list_batches:
+        # Arquivo só com cabeçalho: quadro vazio com as colunas já tratadas
+        list_batches.append(
+            prepare(pl.DataFrame(schema=dict.fromkeys(columns, pl.String)))
+        )
+
+    df = pl.concat(list_batches, how="diagonal_relaxed", rechunk=False)
+    return df, rows_in, n_batches
+
+
+def check_cancel(cancel_token: CancelToken | None) -> None:
+    """Interrompe a execução entre etapas caso o usuário tenha cancelado"""
+    if cancel_token is not None:
+        cancel_token.check()
+
+
+def begin_writes(
+    path_holder: PathHolder, cancel_token: CancelToken | None, concatenar: int
+) -> None:
+    """Ponto sem volta antes da primeira escrita: o cancelamento deixa de ser
+    aceito e, sem concatenação, os dados anteriores são apagados só aqui
+    """
+    if cancel_token is not None:
+        cancel_token.commit()
+    if not concatenar:
+        delete_data(path_holder.db, keep=(path_holder.englogs,))
+
+
 def create_engdata_output(
-    set_assets: set[str], path_holder: PathHolder, englogpath: str, is_trendbot: int
+    registry: AssetRegistry,
+    path_holder: PathHolder,
+    englogpath: str,
+    is_trendbot: int,
+    cancel_token: CancelToken | None = None,
+    batch_rows: int | None = None,
+    resample_every: str | None = None,
+    concatenar: int = 1,
 ) -> None:
-    """Rotina para manipulação dos dados dos motores"""
+    """Rotina para manipulação dos dados dos motores
+    O cancelamento só é aceito entre ativos, antes da escrita das saídas
+    concatenar: 0 ignora o histórico e apaga o BD no início da escrita
+    batch_rows: força a leitura em lotes com esse número de linhas, senão só
+    arquivos acima de BATCH_FILE_THRESHOLD são lidos em lotes de
+    DEFAULT_BATCH_ROWS linhas
+    resample_every: grade uniforme (ex.: "5m") para manutenção e TrendBot;
+    o histórico continua com as amostras originais
+    """
 
     print("\nIniciando tratamento de dados de motores...\n")
 
-    list_englogs = prep_englog(englogpath, path_holder.englogs)
+    with span("prep_englog") as sp:
+        list_englogs = prep_englog(englogpath, path_holder.englogs)
+        sp.bytes_read = file_size(englogpath)
+        sp.rows_out = len(list_englogs)
 
     list_colstd = list(DICT_COLNAME.keys())
     list_colstd.extend(["Asset"])
-    df_full_engs = get_database_data(path_holder.eng_output, list_colstd)
-    df_full_engs = datalimiter(df_full_engs, daylimit=6 * 30)
+    path_history = path_holder.eng_output if concatenar else ""
+    if os.path.isfile(path_history):
+        list_colstd = additional_cols(
+            list_colstd, None, read_header(path_holder.eng_output, encoding="utf-8")
+        )
+    with span("read_history") as sp:
+        df_full_engs = get_database_data(path_history, list_colstd)
+        sp.bytes_read = file_size(path_history)
+        sp.rows_in = df_full_engs.height
+        df_full_engs = datalimiter(df_full_engs, daylimit=6 * 30)
+        sp.rows_out = df_full_engs.height
     df_all_current = pl.DataFrame({colname: [] for colname in list_colstd})
+    list_quality = []
 
     list_sn_add = []
-    for pathenglog in list_englogs:
-        sn_add = eng_separator.run(get_sn(pathenglog), path_holder.englogs + pathenglog)
-        list_sn_add.extend(sn_add)
+    with span("eng_separator"):
+        for pathenglog in list_englogs:
+            sn_add = eng_separator.run(
+                get_sn(pathenglog), path_holder.englogs + pathenglog
+            )
+            list_sn_add.extend(sn_add)
     list_sn_add = list(filter(lambda item: item is not None, list_sn_add))
 
     if sn_add:
@@ -352,82 +563,193 @@ def create_engdata_output(
 
     for engfile in list_englogs:
 
+        check_cancel(cancel_token)
+
         sn_file = get_sn(engfile)
         path_engfile = path_holder.englogs + engfile
 
-        if not sn_file in set_assets:
+        if not sn_file in registry:
             print("\n", sn_file, " Não tem informações em ASSET_INFO.")
             continue
 
         print(f"\nAtivo: {sn_file}\n")
-        df_asset = pl.read_csv(path_engfile, encoding="utf-16le", infer_schema_length=0)
-        df_asset = rename_col(df_asset, sn_file, path_holder.config)
-        list_colstd = additional_cols(list_colstd, sn_file)
-        df_asset = define_types(df_asset, list_colstd)
-        df_asset = cleandata(df_asset, path_holder.config, "DadosInvalidos")
-        print("Dados limpos!")
-        df_asset = df_asset.with_columns(pl.lit(sn_file).alias("Asset"))
-
-        df_all_current = concatenate_dfs(df_all_current, df_asset)
+        with span("asset", asset=sn_file) as sp_asset:
+            header = read_header(path_engfile)
+            list_colstd = additional_cols(list_colstd, sn_file, header)
+            if batch_rows or file_size(path_engfile) > BATCH_FILE_THRESHOLD:
+                with span("read_englog_batched") as sp:
+                    df_asset, sp.rows_in, sp.attrs["batches"] = read_englog_batched(
+                        path_engfile, sn_file, path_holder, list_colstd, batch_rows
+                    )
+                    sp.bytes_read = file_size(path_engfile)
+                    sp.rows_out = df_asset.height
+                sp_asset.rows_in = sp.rows_in
+            else:
+                with span("read_header") as sp:
+                    columns, dict_rename, list_missingcol = resolve_projection(
+                        header, sn_file, path_holder.config, list_colstd
+                    )
+                    sp.rows_in = len(header)
+                    sp.rows_out = len(columns)
+                with span("read_csv") as sp:
+                    df_asset = pl.read_csv(
+                        path_engfile,
+                        encoding="utf-16le",
+                        infer_schema_length=0,
+                        columns=columns,
+                    )
+                    sp.bytes_read = file_size(path_engfile)
+                    sp.rows_out = df_asset.height
+                sp_asset.rows_in = df_asset.height
+                with span("rename_col"):
+                    if list_missingcol:
+                        print(
+                            f"{list_missingcol} Não encontrado(s) para o ativo {sn_file}! "
+                            + "Verifique o ConfigScript!"
+                        )
+                    df_asset = apply_rename(df_asset, dict_rename, list_missingcol)
+                    print("Colunas padronizadas!")
+                with span("define_types"):
+                    df_asset = define_types(df_asset, list_colstd)
+                with span("cleandata") as sp:
+                    sp.rows_in = df_asset.height
+                    df_asset = cleandata(df_asset, path_holder.config, "DadosInvalidos")
+                    sp.rows_out = df_asset.height
+            print("Dados limpos!")
+            with span("validation") as sp:
+                sp.rows_in = df_asset.height
+                # Amostras já gravadas ou lidas nesta carga não contam de novo
+                known_timestamps = pl.concat(
+                    [
+                        df.filter(pl.col("Asset").cast(pl.String) == sn_file)[
+                            "Timestamp"
+                        ].cast(pl.Datetime)
+                        for df in (df_full_engs, df_all_current)
+                        if not df.is_empty()
+                    ]
+                    or [pl.Series("Timestamp", [], pl.Datetime)]
+                )
+                df_asset, df_quality = validation.validate(
+                    df_asset,
+                    sn_file,
+                    validation.get_bounds(path_holder.config, registry.model(sn_file)),
+                    known_timestamps,
+                )
+                list_quality.append(df_quality)
+            df_asset = df_asset.with_columns(pl.lit(sn_file).alias("Asset"))
+            sp_asset.rows_out = df_asset.height
+
+            df_all_current = concatenate_dfs(df_all_current, df_asset)
+
+    begin_writes(path_holder, cancel_token, concatenar)
 
     if df_all_current.is_empty():
         print("\nSem dados de motores!\n")
-        df_full_engs.write_csv(
-            path_holder.eng_output, datetime_format="%Y-%m-%d %H:%M:%S"
-        )
+        write_csv_atomic(df_full_engs, path_holder.eng_output)
         rmtree(path_holder.englogs)
         return
 
-    df_all_current = calc_engdata.run_currentdata(df_all_current)
+    with span("run_currentdata") as sp:
+        sp.rows_in = df_all_current.height
+        df_all_current = calc_engdata.run_currentdata(df_all_current)
     df_full_engs = concatenate_dfs(df_full_engs, df_all_current)
-    df_full_engs = calc_engdata.run_alldata(df_full_engs, path_holder)
+    with span("run_alldata") as sp:
+        sp.rows_in = df_full_engs.height
+        df_full_engs = calc_engdata.run_alldata(df_full_engs)
 
     print("Cálculos realizados!\n")
 
-    df_full_engs = df_full_engs.with_columns(
-        pl.col("Timestamp").dt.strftime("%Y-%m-%d %H:%M:%S").alias("Timestamp_str")
-    )
-    df_full_engs = df_full_engs.unique(subset=["Asset", "Timestamp_str"], keep="last")
-    df_full_engs = df_full_engs.drop("Timestamp_str")
-
-    df_full_engs = df_full_engs.select(
-        ["Timestamp", "Asset"]
-        + sorted(
-            [col for col in df_full_engs.columns if col not in ["Timestamp", "Asset"]]
+    with span("dedup") as sp:
+        sp.rows_in = df_full_engs.height
+        df_full_engs = df_full_engs.with_columns(
+            pl.col("Timestamp").dt.strftime("%Y-%m-%d %H:%M:%S").alias("Timestamp_str")
         )
-    )
+        df_full_engs = df_full_engs.unique(
+            subset=["Asset", "Timestamp_str"], keep="last"
+        )
+        df_full_engs = df_full_engs.drop("Timestamp_str")
+
+        df_full_engs = df_full_engs.select(
+            ["Timestamp", "Asset"]
+            + sorted(
+                [
+                    col
+                    for col in df_full_engs.columns
+                    if col not in ["Timestamp", "Asset"]
+                ]
+            )
+        )
+
+        df_full_engs = df_full_engs.sort(["Asset", "Timestamp"])
+        sp.rows_out = df_full_engs.height
 
-    df_full_engs = df_full_engs.sort(["Asset", "Timestamp"])
-    df_full_engs.write_csv(path_holder.eng_output, datetime_format="%Y-%m-%d %H:%M:%S")
+    with span("write_history") as sp:
+        write_csv_atomic(df_full_engs, path_holder.eng_output)
+        sp.bytes_written = file_size(path_holder.eng_output)
     rmtree(path_holder.englogs)
 
+    with span("history_store") as sp:
+        list_written = history_store.update_store(
+            path_holder.history_store,
+            df_full_engs,
+            df_full_engs["Timestamp"].min(),
+        )
+        sp.rows_out = len(list_written)
+
+    calc_engdata.run_maintenance(path_holder, registry, resample_every)
+
+    with span("write_quality"):
+        validation.merge_quality(path_holder.quality_output, pl.concat(list_quality))
+
     print("Dados de motores tratados com sucesso!\n")
 
+    with span("analytics"):
+        analytics.run_engdata(df_full_engs, df_all_current, path_holder)
+
     if is_trendbot:
-        run_trendbot(
-            df_full_engs,
-            path_holder.tb_baseline,
-            path_holder.tb_monthly,
-            path_holder.tb_comments,
-        )
+        with span("read_history_store") as sp:
+            df_stats = history_store.get_history(
+                path_holder.history_store, columns=TRENDBOT_COLUMNS
+            )
+            sp.rows_out = df_stats.height
+        if resample_every:
+            with span("resample") as sp:
+                sp.rows_in = df_stats.height
+                df_stats = resample(df_stats, resample_every)
+                sp.rows_out = df_stats.height
+        with span("trendbot") as sp:
+            sp.rows_in = df_stats.height
+            run_trendbot(
+                df_stats,
+                path_holder.tb_baseline,
+                path_holder.tb_monthly,
+                path_holder.tb_comments,
+                registry,
+            )
 
 
 def create_events_output(
-    set_assets: set[str], path_holder: PathHolder, eventslogpath: str
+    registry: AssetRegistry,
+    path_holder: PathHolder,
+    eventslogpath: str,
 ) -> None:
     """Rotina de tratamento de dados de eventos"""
 
     print("Iniciando tratamento de dados de eventos...\n")
 
-    df_eventsumraw = pl.read_excel(eventslogpath, sheet_name="Engine Event Summary")
+    with span("read_events_summary") as sp:
+        df_eventsumraw = pl.read_excel(eventslogpath, sheet_name="Engine Event Summary")
+        sp.bytes_read = file_size(eventslogpath)
+        sp.rows_out = df_eventsumraw.height
 
-    df_full_events = get_database_data(path_holder.event_output, TUPLE_COLEVENT)
+    with span("read_events_history") as sp:
+        df_full_events = get_database_data(path_holder.event_output, TUPLE_COLEVENT)
+        sp.bytes_read = file_size(path_holder.event_output)
+        sp.rows_out = df_full_events.height
 
     if df_eventsumraw.is_empty():
         print("\nNão há dados de eventos!\n")
-        df_full_events.write_csv(
-            path_holder.event_output, datetime_format="%Y-%m-%d %H:%M:%S"
-        )
+        write_csv_atomic(df_full_events, path_holder.event_output)
         return
 
     df_eventsumraw = df_eventsumraw.select(
@@ -442,79 +764,136 @@ def create_events_output(
     print(df_eventsumraw, "\n")
 
     list_events_sheetnames = df_eventsumraw["Unit Name"].to_list()
+    list_new_events = []
 
     for evsheetname in list_events_sheetnames:
         sn = evsheetname[-8:]
 
-        if not sn in set_assets:
+        if not sn in registry:
             print(f"Eventos de {sn} não analisados. Não há informações em ASSET_INFO.")
             continue
 
-        df_asset_events = pl.read_excel(eventslogpath, sheet_name=evsheetname)
-        df_asset_events = df_asset_events.rename({"Sample Time": "Timestamp"})
-        df_asset_events = cleandata(
-            df_asset_events, path_holder.config, "AlertasDelete"
-        )
-        df_asset_events = df_asset_events.drop_nulls(subset="Code")
-        df_asset_events = df_asset_events.with_columns(pl.lit(sn).alias("Asset"))
-        df_asset_events = df_asset_events.select(TUPLE_COLEVENT)
+        with span("asset_events", asset=sn) as sp:
+            df_asset_events = pl.read_excel(eventslogpath, sheet_name=evsheetname)
+            sp.rows_in = df_asset_events.height
+            df_asset_events = df_asset_events.rename({"Sample Time": "Timestamp"})
+            df_asset_events = cleandata(
+                df_asset_events, path_holder.config, "AlertasDelete"
+            )
+            df_asset_events = df_asset_events.drop_nulls(subset="Code")
+            df_asset_events = df_asset_events.with_columns(pl.lit(sn).alias("Asset"))
+            df_asset_events = df_asset_events.select(TUPLE_COLEVENT)
+            sp.rows_out = df_asset_events.height
 
         df_full_events = concatenate_dfs(df_full_events, df_asset_events)
+        list_new_events.append(df_asset_events)
 
     if df_full_events.is_empty():
         print("\nSem dados de eventos!\n")
-        df_full_events.write_csv(
-            path_holder.event_output, datetime_format="%Y-%m-%d %H:%M:%S"
-        )
+        write_csv_atomic(df_full_events, path_holder.event_output)
         return
 
-    df_full_events = df_full_events.with_columns(
-        pl.col("Timestamp").dt.strftime("%Y-%m-%d %H:%M:%S").alias("Timestamp_str")
-    )
-    df_full_events = df_full_events.unique(
-        subset=[
-            "Type",
-            "Code",
-            "Description",
-            "Asset",
-            "Source",
-            "Severity",
-            "Timestamp_str",
-        ],
-        keep="last",
-    )
-    df_full_events = df_full_events.drop("Timestamp_str")
+    with span("dedup_events") as sp:
+        sp.rows_in = df_full_events.height
+        df_full_events = df_full_events.with_columns(
+            pl.col("Timestamp").dt.strftime("%Y-%m-%d %H:%M:%S").alias("Timestamp_str")
+        )
+        df_full_events = df_full_events.unique(
+            subset=[
+                "Type",
+                "Code",
+                "Description",
+                "Asset",
+                "Source",
+                "Severity",
+                "Timestamp_str",
+            ],
+            keep="last",
+        )
+        df_full_events = df_full_events.drop("Timestamp_str")
 
-    df_full_events = df_full_events.select(
-        ["Timestamp"]
-        + sorted([col for col in df_full_events.columns if col != "Timestamp"])
-    )
+        df_full_events = df_full_events.select(
+            ["Timestamp"]
+            + sorted([col for col in df_full_events.columns if col != "Timestamp"])
+        )
 
-    df_full_events = df_full_events.sort(["Asset", "Timestamp"])
-    df_full_events.write_csv(
-        path_holder.event_output, datetime_format="%Y-%m-%d %H:%M:%S"
-    )
+        df_full_events = df_full_events.sort(["Asset", "Timestamp"])
+        sp.rows_out = df_full_events.height
+
+    with span("write_events") as sp:
+        write_csv_atomic(df_full_events, path_holder.event_output)
+        sp.bytes_written = file_size(path_holder.event_output)
 
     print("Eventos tratados com sucesso!\n")
 
+    with span("analytics"):
+        df_new_events = (
+            pl.concat(list_new_events, how="diagonal_relaxed")
+            if list_new_events
+            else df_full_events.clear()
+        )
+        analytics.run_events(path_holder, df_new_events)
+
 
 def main(
-    dbpath: str, englogpath: str, eventslogpath: str, concatenar: int, is_trendbot: int
+    dbpath: str,
+    englogpath: str,
+    eventslogpath: str,
+    concatenar: int,
+    is_trendbot: int,
+    profile_stages: tuple[str, ...] = (),
+    progress_callback=None,
+    cancel_token: CancelToken | None = None,
+    batch_rows: int | None = None,
+    resample_every: str | None = None,
 ) -> None:
-    """Função principal RFV TO BI"""
-
-    if not concatenar:
-        delete_data(dbpath)
-
-    path_holder = PathHolder(dbpath)
-    set_assets = get_assets(path_holder.asset_info)
-
-    if not os.path.isdir(path_holder.trendbot):
-        os.makedirs(path_holder.trendbot)
-
-    create_engdata_output(set_assets, path_holder, englogpath, is_trendbot)
+    """Função principal RFV TO BI
+    profile_stages: nomes das etapas que terão um dump do cProfile no relatório
+    progress_callback: recebe os eventos de início e fim de cada etapa
+    cancel_token: permite interromper a execução entre ativos, até o início
+    da escrita das saídas (sem concatenação o BD só é apagado nesse ponto)
+    batch_rows: leitura em lotes dos logs de motores
+    resample_every: grade uniforme (ex.: "5m") para manutenção e TrendBot
+    """
+
+    with instrumentation.run_report(
+        "rfvbi.main", profile_stages, listeners=(progress_callback,)
+    ) as report:
+        report.root.attrs.update(
+            {
+                "dbpath": dbpath,
+                "concatenar": concatenar,
+                "is_trendbot": is_trendbot,
+                "resample_every": resample_every,
+            }
+        )
 
-    create_events_output(set_assets, path_holder, eventslogpath)
+        with span("setup"):
+            path_holder = PathHolder(dbpath)
+            report.save_dir = path_holder.run_reports
+            registry = get_assets(path_holder.asset_info)
+
+        if not os.path.isdir(path_holder.trendbot):
+            os.makedirs(path_holder.trendbot)
+
+        with span("create_engdata_output"):
+            try:
+                create_engdata_output(
+                    registry,
+                    path_holder,
+                    englogpath,
+                    is_trendbot,
+                    cancel_token,
+                    batch_rows,
+                    resample_every,
+                    concatenar,
+                )
+            except RunCancelled:
+                rmtree(path_holder.englogs, ignore_errors=True)
+                raise
+
+        with span("create_events_output"):
+            create_events_output(registry, path_holder, eventslogpath)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,296 @@
+"""
+RFV to BI - Linha de comando
+Executa um ou vários clientes sem a GUI
+
+Uso:
+    python rfvbi_cli.py --db "BD" --englog eng.zip --events eventos.xlsx --trendbot
+    python rfvbi_cli.py --manifest jobs.json --workers 4 --threads 2
+
+Manifesto (JSON): lista de jobs com as chaves
+    dbpath, englogpath, eventslogpath, concatenar (1), is_trendbot (0), name (opcional)
+    batch_rows (opcional, leitura em lotes dos logs de motores)
+    resample_every (opcional, ex.: "5m", grade uniforme para manutenção e TrendBot)
+"""
+
+import argparse
+import contextlib
+import json
+import multiprocessing
+import os
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+EXIT_OK = 0
+EXIT_JOB_FAILED = 1
+EXIT_BAD_MANIFEST = 2
+
+REQUIRED_KEYS = ("dbpath", "englogpath", "eventslogpath")
+
+
+def load_manifest(path: str) -> list[dict]:
+    """Lê e valida o manifesto de jobs"""
+    with open(path, "r", encoding="utf-8") as file:
+        list_jobs = json.load(file)
+
+    if isinstance(list_jobs, dict):
+        list_jobs = list_jobs.get("jobs", [])
+    if not isinstance(list_jobs, list):
+        raise ValueError('o manifesto deve ser uma lista de jobs ou {"jobs": [...]}')
+
+    list_errors = []
+    for i, job in enumerate(list_jobs):
+        if not isinstance(job, dict):
+            list_errors.append(f"Job {i}: esperado um objeto JSON, recebido {job!r}")
+            continue
+        missing = [key for key in REQUIRED_KEYS if not job.get(key)]
+        if missing:
+            list_errors.append(f"Job {i}: faltando {missing}")
+        job.setdefault("concatenar", 1)
+        job.setdefault("is_trendbot", 0)
+        job.setdefault("name", os.path.basename(os.path.dirname(job.get("dbpath", ""))))
+
+    if list_errors:
+        raise ValueError("\n".join(list_errors))
+
+    return list_jobs
+
+
+def unique_names(list_jobs: list[dict]) -> list[dict]:
+    """Nomes distintos por job (usados nos logs e no resumo)
+    Clientes com a mesma pasta de BD recebem sufixo _2, _3...
+    """
+    dict_count = {}
+    list_unique = []
+    for job in list_jobs:
+        name = job["name"] or "job"
+        dict_count[name] = dict_count.get(name, 0) + 1
+        if dict_count[name] > 1:
+            name = f"{name}_{dict_count[name]}"
+        list_unique.append({**job, "name": name})
+    return list_unique
+
+
+def init_worker(n_threads: int) -> None:
+    """Define o número de threads do polars antes de importá-lo no processo"""
+    if n_threads:
+        os.environ["POLARS_MAX_THREADS"] = str(n_threads)
+
+
+def run_job(
+    job: dict,
+    log_dir: str | None,
+    profile_stages: tuple[str, ...],
+    started=None,
+    index: int | None = None,
+) -> dict:
+    """Executa um job isolado e retorna seu status
+    started: dicionário compartilhado onde o job marca que começou a rodar
+    """
+    if started is not None:
+        started[index] = True
+
+    # pylint: disable=import-outside-toplevel
+    import rfvbi
+
+    result = {"name": job["name"], "dbpath": job["dbpath"], "status": "ok"}
+    time_start = time.perf_counter()
+
+    if log_dir:
+        os.makedirs(log_dir, exist_ok=True)
+        path_log = os.path.join(log_dir, f"{job['name']}.log")
+        result["log"] = path_log
+        log_file = open(
+            path_log, "w", encoding="utf-8"
+        )  # pylint: disable=consider-using-with
+    else:
+        log_file = None
+
+    try:
+        with contextlib.ExitStack() as stack:
+            if log_file:
+                stack.enter_context(log_file)
+                stack.enter_context(contextlib.redirect_stdout(log_file))
+                stack.enter_context(contextlib.redirect_stderr(log_file))
+            try:
+                rfvbi.main(
+                    job["dbpath"],
+                    job["englogpath"],
+                    job["eventslogpath"],
+                    int(job["concatenar"]),
+                    int(job["is_trendbot"]),
+                    profile_stages=profile_stages,
+                    batch_rows=job.get("batch_rows"),
+                    resample_every=job.get("resample_every"),
+                )
+            except Exception as error:  # pylint: disable=broad-exception-caught
+                traceback.print_exc()
+                result["status"] = "error"
+                result["error"] = f"{type(error).__name__}: {error}"
+    finally:
+        result["wall_s"] = round(time.perf_counter() - time_start, 2)
+
+    return result
+
+
+def __crash_result(job: dict) -> dict:
+    """Resultado de um job cujo processo morreu (ex.: falta de memória)"""
+    return {
+        "name": job["name"],
+        "dbpath": job["dbpath"],
+        "status": "error",
+        "error": "Processo encerrado abruptamente durante o job",
+    }
+
+
+def __run_pool(
+    dict_jobs: dict[int, dict],
+    workers: int,
+    threads: int,
+    log_dir: str | None,
+    profile_stages: tuple[str, ...],
+    started,
+) -> tuple[list[dict], dict[int, dict]]:
+    """Executa os jobs em um pool; retorna os resultados e os jobs perdidos
+    quando um processo morre e quebra o pool
+    """
+    list_results = []
+    dict_lost = {}
+    context = multiprocessing.get_context("spawn")
+
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=context,
+        max_tasks_per_child=1,
+        initializer=init_worker,
+        initargs=(threads,),
+    ) as executor:
+        dict_futures = {
+            executor.submit(run_job, job, log_dir, profile_stages, started, i): i
+            for i, job in dict_jobs.items()
+        }
+        for future in as_completed(dict_futures):
+            i = dict_futures[future]
+            try:
+                result = future.result()
+            except BrokenProcessPool:
+                dict_lost[i] = dict_jobs[i]
+                continue
+            __print_result(result)
+            list_results.append(result)
+
+    return list_results, dict_lost
+
+
+def __print_result(result: dict) -> None:
+    """Mostra o status de um job concluído"""
+    print(f"[{result['status'].upper()}] {result['name']} {result.get('wall_s', '')}")
+    if result["status"] != "ok":
+        print(f"    {result['error']}")
+
+
+def run_batch(
+    list_jobs: list[dict],
+    workers: int,
+    threads: int,
+    log_dir: str | None,
+    profile_stages: tuple[str, ...] = (),
+) -> list[dict]:
+    """Executa os jobs em paralelo, isolando falhas por job
+    Se um processo morre o pool quebra: os jobs que não chegaram a rodar
+    voltam para um pool novo e os que estavam rodando são repetidos um a um,
+    de modo que só o job que derrubou o processo é dado como falha
+    """
+    list_results = []
+    dict_pending = dict(enumerate(unique_names(list_jobs)))
+
+    with multiprocessing.get_context("spawn").Manager() as manager:
+        started = manager.dict()
+        while dict_pending:
+            results, dict_lost = __run_pool(
+                dict_pending, workers, threads, log_dir, profile_stages, started
+            )
+            list_results += results
+
+            dict_running = {i: job for i, job in dict_lost.items() if i in started}
+            dict_pending = {i: job for i, job in dict_lost.items() if i not in started}
+            if dict_lost and not dict_running:
+                # Pool quebrado sem nenhum job iniciado: falha do próprio pool
+                dict_running, dict_pending = dict_pending, {}
+
+            for i, job in dict_running.items():
+                results, dict_crashed = __run_pool(
+                    {i: job}, 1, threads, log_dir, profile_stages, started
+                )
+                if dict_crashed:
+                    results = [__crash_result(job)]
+                    __print_result(results[0])
+                list_results += results
+
+    return list_results
+
+
+def main(argv: list[str] | None = None) -> int:
+    """Ponto de entrada da linha de comando"""
+    parser = argparse.ArgumentParser(description="RFV TO BI sem interface gráfica")
+    parser.add_argument("--manifest", help="JSON com a lista de jobs")
+    parser.add_argument("--db", help="Pasta do BD do cliente")
+    parser.add_argument("--englog", help="Zip com os logs de motores")
+    parser.add_argument("--events", help="Planilha de eventos")
+    parser.add_argument("--no-concat", action="store_true", help="Apaga o BD antes")
+    parser.add_argument("--trendbot", action="store_true", help="Executa o TrendBot")
+    parser.add_argument("--resample", default=None, help="Grade uniforme, ex.: 5m")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--threads", type=int, default=None, help="Threads por job")
+    parser.add_argument("--log-dir", default=None, help="Pasta dos logs por job")
+    parser.add_argument("--profile-stage", action="append", default=[])
+    parser.add_argument("--summary", default=None, help="JSON com o resumo dos jobs")
+    args = parser.parse_args(argv)
+
+    try:
+        if args.manifest:
+            list_jobs = load_manifest(args.manifest)
+        elif args.db and args.englog and args.events:
+            list_jobs = [
+                {
+                    "name": os.path.basename(os.path.dirname(args.db)),
+                    "dbpath": args.db,
+                    "englogpath": args.englog,
+                    "eventslogpath": args.events,
+                    "concatenar": 0 if args.no_concat else 1,
+                    "is_trendbot": 1 if args.trendbot else 0,
+                    "resample_every": args.resample,
+                }
+            ]
+        else:
+            parser.error("Informe --manifest ou --db, --englog e --events")
+    except (OSError, ValueError) as error:
+        print(f"Manifesto inválido: {error}")
+        return EXIT_BAD_MANIFEST
+
+    cpu_count = os.cpu_count() or 1
+    workers = args.workers or max(
+        1, min(len(list_jobs), cpu_count // (args.threads or 1))
+    )
+    threads = args.threads or max(1, cpu_count // workers)
+    print(f"{len(list_jobs)} job(s) | {workers} processo(s) x {threads} thread(s)\n")
+
+    list_results = run_batch(
+        list_jobs, workers, threads, args.log_dir, tuple(args.profile_stage)
+    )
+
+    if args.summary:
+        with open(args.summary, "w", encoding="utf-8") as file:
+            json.dump(list_results, file, indent=2, ensure_ascii=False)
+
+    n_failed = sum(result["status"] != "ok" for result in list_results)
+    print(f"\n{len(list_results) - n_failed} OK, {n_failed} com falha")
+
+    return EXIT_JOB_FAILED if n_failed else EXIT_OK
+
+
+if __name__ == "__main__":
+
+    sys.exit(main())
@@ -0,0 +1,255 @@
+"""
+RFV to BI - Modo serviço
+Monitora pastas de entrada por cliente e processa novas exportações do RFV
+
+Uso:
+    python rfvbi_watch.py --config watch.json
+    python rfvbi_watch.py --config watch.json --once
+
+Configuração (JSON):
+    {"customers": [{"name": "Cliente", "dbpath": ".../01 - BD",
+                    "drop_dir": ".../RFV_ENTRADA", "is_trendbot": 1}]}
+"""
+
+import argparse
+import json
+import os
+import queue
+import sys
+import threading
+import time
+import traceback
+from shutil import move
+import rfvbi
+import instrumentation
+from classes_rfvbi import PathHolder
+
+POLL_INTERVAL_S = 10
+DEBOUNCE_S = 30
+PROCESSED_DIR = "processados"
+FAILED_DIR = "falhas"
+
+ENGLOG_EXT = (".zip",)
+EVENTS_EXT = (".xls", ".xlsx", ".xlsm")
+
+
+class CustomerContext:
+    """Mantém PathHolder e ativos em cache enquanto as planilhas não mudarem"""
+
+    def __init__(self, name: str, dbpath: str, drop_dir: str, is_trendbot: int):
+        self.name = name
+        self.dbpath = dbpath
+        self.drop_dir = drop_dir
+        self.is_trendbot = is_trendbot
+        self.path_holder = None
+        self.registry = None
+        self._mtimes = None
+
+    def _source_mtimes(self) -> tuple:
+        """mtime das planilhas de configuração e ativos"""
+        infos_dir = os.path.dirname(self.dbpath) + "/00 - INFOS/"
+        return tuple(
+            os.path.getmtime(infos_dir + filename)
+            for filename in ("ConfigScript.xlsx", "ASSET_INFO.xlsx")
+        )
+
+    def refresh(self) -> None:
+        """Recarrega as configurações somente se as planilhas mudaram"""
+        mtimes = self._source_mtimes()
+        if self.path_holder is not None and mtimes == self._mtimes:
+            return
+
+        print(f"[{self.name}] Carregando configurações...")
+        self.path_holder = PathHolder(self.dbpath)
+        self.registry = rfvbi.get_assets(self.path_holder.asset_info)
+        os.makedirs(self.path_holder.trendbot, exist_ok=True)
+        self._mtimes = mtimes
+
+
+class DropFolderWatcher:
+    """Detecta arquivos novos e só os libera após ficarem estáveis"""
+
+    def __init__(self, customer: CustomerContext, debounce_s: float) -> None:
+        self.customer = customer
+        self.debounce_s = debounce_s
+        self._seen = {}
+        self._queued = set()
+
+    def scan(self) -> list[str]:
+        """Retorna os arquivos completos ainda não enfileirados"""
+        list_ready = []
+        now = time.time()
+        drop_dir = self.customer.drop_dir
+
+        for filename in sorted(os.listdir(drop_dir)):
+            path = os.path.join(drop_dir, filename)
+            if not os.path.isfile(path) or filename.startswith("~$"):
+                continue
+            if not filename.lower().endswith(ENGLOG_EXT + EVENTS_EXT):
+                continue
+            if path in self._queued:
+                continue
+
+            stat = os.stat(path)
+            signature = (stat.st_size, stat.st_mtime)
+            first_seen, last_signature = self._seen.get(path, (now, None))
+
+            if signature != last_signature:
+                self._seen[path] = (now, signature)
+                continue
+
+            if now - max(first_seen, stat.st_mtime) < self.debounce_s:
+                continue
+
+            if not self._is_unlocked(path):
+                continue
+
+            self._queued.add(path)
+            del self._seen[path]
+            list_ready.append(path)
+
+        return list_ready
+
+    @property
+    def has_pending(self) -> bool:
+        """Indica se há arquivos aguardando estabilizar"""
+        return bool(self._seen)
+
+    def done(self, path: str) -> None:
+        """Libera o caminho para um novo arquivo com o mesmo nome"""
+        self._queued.discard(path)
+
+    @staticmethod
+    def _is_unlocked(path: str) -> bool:
+        """Verifica se o arquivo não está mais sendo escrito (Windows bloqueia)"""
+        try:
+            with open(path, "rb+"):
+                return True
+        except OSError:
+            return False
+
+
+def process_file(customer: CustomerContext, path: str) -> None:
+    """Processa uma exportação de motores ou eventos de forma incremental"""
+    customer.refresh()
+    path_holder = customer.path_holder
+
+    with instrumentation.run_report("rfvbi.watch") as report:
+        report.save_dir = path_holder.run_reports
+        report.root.attrs.update({"customer": customer.name, "file": path})
+
+        if path.lower().endswith(ENGLOG_EXT):
+            with instrumentation.span("create_engdata_output"):
+                rfvbi.create_engdata_output(
+                    customer.registry, path_holder, path, customer.is_trendbot
+                )
+        else:
+            with instrumentation.span("create_events_output"):
+                rfvbi.create_events_output(customer.registry, path_holder, path)
+
+
+def __archive(path: str, subdir: str) -> None:
+    """Move o arquivo processado para uma subpasta da pasta de entrada"""
+    dest_dir = os.path.join(os.path.dirname(path), subdir)
+    os.makedirs(dest_dir, exist_ok=True)
+    stamp = time.strftime("%Y%m%d_%H%M%S")
+    move(path, os.path.join(dest_dir, f"{stamp}_{os.path.basename(path)}"))
+
+
+def worker_loop(jobs: queue.Queue, stop: threading.Event) -> None:
+    """Consome a fila de jobs, um por vez para usar todos os núcleos no polars"""
+    while not stop.is_set() or not jobs.empty():
+        try:
+            customer, watcher, path = jobs.get(timeout=1)
+        except queue.Empty:
+            continue
+
+        print(f"\n[{customer.name}] Processando {os.path.basename(path)}...\n")
+        subdir = PROCESSED_DIR
+        try:
+            process_file(customer, path)
+        except Exception:  # pylint: disable=broad-exception-caught
+            traceback.print_exc()
+            print(f"[{customer.name}] Falha em {path}")
+            subdir = FAILED_DIR
+
+        # Falha ao arquivar (ex.: arquivo bloqueado pelo OneDrive) não pode
+        # derrubar a thread; o arquivo segue marcado para não ser reprocessado
+        try:
+            __archive(path, subdir)
+        except Exception:  # pylint: disable=broad-exception-caught
+            traceback.print_exc()
+            print(f"[{customer.name}] Não foi possível mover {path} para {subdir}")
+        else:
+            watcher.done(path)
+        finally:
+            jobs.task_done()
+
+
+def load_config(path: str) -> list[CustomerContext]:
+    """Lê a configuração dos clientes monitorados"""
+    with open(path, "r", encoding="utf-8") as file:
+        config = json.load(file)
+
+    return [
+        CustomerContext(
+            item.get("name", item["dbpath"]),
+            item["dbpath"],
+            item["drop_dir"],
+            int(item.get("is_trendbot", 0)),
+        )
+        for item in config["customers"]
+    ]
+
+
+def run(
+    list_customers: list[CustomerContext],
+    poll_s: float = POLL_INTERVAL_S,
+    debounce_s: float = DEBOUNCE_S,
+    once: bool = False,
+) -> None:
+    """Loop principal do serviço"""
+    list_watchers = [
+        DropFolderWatcher(customer, debounce_s) for customer in list_customers
+    ]
+    jobs = queue.Queue()
+    stop = threading.Event()
+    worker = threading.Thread(target=worker_loop, args=(jobs, stop), daemon=True)
+    worker.start()
+
+    print(f"Monitorando {len(list_watchers)} cliente(s)... (Ctrl+C para sair)")
+    try:
+        while True:
+            for watcher in list_watchers:
+                for path in watcher.scan():
+                    jobs.put((watcher.customer, watcher, path))
+
+            if once:
+                # Passada única: aguarda os arquivos estabilizarem e processa
+                if not any(watcher.has_pending for watcher in list_watchers):
+                    break
+
+            time.sleep(poll_s)
+    except KeyboardInterrupt:
+        print("\nEncerrando após os jobs em andamento...")
+    finally:
+        stop.set()
+        worker.join()
+
+
+def main(argv: list[str] | None = None) -> int:
+    """Ponto de entrada do modo serviço"""
+    parser = argparse.ArgumentParser(description="RFV TO BI - pastas monitoradas")
+    parser.add_argument("--config", required=True)
+    parser.add_argument("--poll", type=float, default=POLL_INTERVAL_S)
+    parser.add_argument("--debounce", type=float, default=DEBOUNCE_S)
+    parser.add_argument("--once", action="store_true", help="Processa e encerra")
+    args = parser.parse_args(argv)
+
+    run(load_config(args.config), args.poll, args.debounce, args.once)
+    return 0
+
+
+if __name__ == "__main__":
+
+    sys.exit(main())
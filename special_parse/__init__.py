@@ -16,10 +16,21 @@ def __check_for_addcol(module: types.ModuleType, sn, collist: list[str]) -> list
     return collist
 
 
-def additional_cols(collist: list[str], sn: str) -> list[str]:
-    """Executa rotinas de adição de colunas"""
+def additional_cols(
+    collist: list[str], sn: str | None, header: list[str] | None = None
+) -> list[str]:
+    """Executa rotinas de adição de colunas
+    Colunas de cilindro presentes no cabeçalho são incluídas para qualquer ativo
+    """
     collist = __check_for_addcol(exhaust_diff_by_cilinder, sn, collist)
     collist = __check_for_addcol(generator_data, sn, collist)
+    if header:
+        set_cols = set(collist)
+        collist.extend(
+            col
+            for col in exhaust_diff_by_cilinder.cylinder_cols(header)
+            if col not in set_cols
+        )
     return collist
 
 
@@ -60,6 +71,7 @@ def run_currentdata(df):
 
 def run_all(df: pl.DataFrame):
     """Verifica SN em um DataFrame e executa os scripts especiais em todo o banco de dados"""
+    df = exhaust_diff_by_cilinder.run_all(df)
 
     return df
 
@@ -42,7 +42,7 @@ def run(sn: str, pathenglog) -> list[str]:
         df_main = df_main.select(
             [col for col in df_main.columns if not KEYWORDS[sn][i] in col]
         )
-        path_aux = pathlogs + "\\" + sn_aux + ".csv"
+        path_aux = os.path.join(pathlogs, sn_aux + ".csv")
         sn_separated.append(sn_aux + ".csv")
         __write_csv_utf_16le(df_aux, path_aux)
 
@@ -1,9 +1,50 @@
-"""Módulo calcula diferencial de temperatura entre cilindros"""
+"""Módulo calcula diferencial de temperatura entre cilindros
+As colunas por cilindro são detectadas pelo cabeçalho para qualquer ativo
+"""
 
+import re
 import polars as pl
 
 SN_TO_PARSE = ("WPW00989", "WPW00990", "WPW00998", "WPW01003")
 
+# Grupo: padrão do cabeçalho com o número do cilindro
+CYLINDER_PATTERNS = {
+    "Exhaust_Temp": re.compile(r"^Engine Exhaust Gas Port (\d+) Temperature \["),
+    "Transformer_Voltage": re.compile(
+        r"^Cylinder #\s?(\d+) Transformer Secondary Output Voltage Percentage \["
+    ),
+}
+EXHAUST_GROUP = "Exhaust_Temp"
+
+
+def cylinder_blocks(columns: list[str]) -> dict[str, dict[int, list[str]]]:
+    """Colunas por grupo e número do cilindro (variantes do mesmo cilindro
+    ficam juntas), ordenadas pelo número
+    """
+    dict_blocks = {}
+    for col in columns:
+        for group, pattern in CYLINDER_PATTERNS.items():
+            match = pattern.match(col)
+            if match:
+                dict_group = dict_blocks.setdefault(group, {})
+                dict_group.setdefault(int(match.group(1)), []).append(col)
+                break
+
+    return {
+        group: dict(sorted(dict_group.items()))
+        for group, dict_group in dict_blocks.items()
+    }
+
+
+def cylinder_cols(columns: list[str]) -> list[str]:
+    """Todas as colunas de cilindro de um cabeçalho"""
+    return [
+        col
+        for dict_group in cylinder_blocks(columns).values()
+        for list_cols in dict_group.values()
+        for col in list_cols
+    ]
+
 
 def list_col_cil(ncil: int) -> list[str]:
     """Função para criar lista com dos nomes das colunas de temp de cilindro"""
@@ -34,6 +75,22 @@ def run(df: pl.DataFrame) -> tuple[pl.DataFrame, str]:
     return df_parsed, col_result
 
 
+def run_all(df: pl.DataFrame) -> pl.DataFrame:
+    """Diferencial entre cilindros em todo o histórico, para qualquer ativo
+    com as temperaturas de pórtico no cabeçalho
+    """
+    dict_exhaust = cylinder_blocks(df.columns).get(EXHAUST_GROUP)
+    if not dict_exhaust:
+        return df
+
+    list_temps = [pl.coalesce(list_cols) for list_cols in dict_exhaust.values()]
+    diff = pl.max_horizontal(list_temps) - pl.min_horizontal(list_temps)
+    if "Diff_Temp_Cilindro" in df.columns:
+        diff = diff.fill_null(pl.col("Diff_Temp_Cilindro"))
+
+    return df.with_columns(diff.alias("Diff_Temp_Cilindro"))
+
+
 list_colname_ciltranformer = [
     "Cylinder # " + str(x + 1) + " Transformer Secondary Output Voltage Percentage [%]"
     for x in range(16)
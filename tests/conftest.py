@@ -0,0 +1,17 @@
+"""Configuração comum dos testes: raiz do projeto no caminho de importação e
+clientes sintéticos
+"""
+
+import os
+import sys
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmark import generate_fleet  # pylint: disable=wrong-import-position
+
+
+@pytest.fixture
+def fleet(tmp_path) -> dict[str, str]:
+    """Pasta de cliente sintética pequena (2 ativos, 5 dias a cada 10 min)"""
+    return generate_fleet(str(tmp_path), 2, sample_minutes=10, days=5)
@@ -0,0 +1,28 @@
+"""Testes da detecção de anomalias por z-score móvel"""
+
+from datetime import datetime, timedelta
+import numpy as np
+import polars as pl
+from analytics import anomaly
+
+
+def __history() -> pl.DataFrame:
+    """7 dias normais, 3 leituras altas, 2 dias sem log e mais 3 leituras altas"""
+    rng = np.random.default_rng(0)
+    start = datetime(2024, 1, 1)
+    list_ts = [start + timedelta(minutes=10 * i) for i in range(7 * 144)]
+    list_oil = list(90 + rng.normal(0, 1, len(list_ts)))
+    for offset in (0, 2 * 24 * 60):
+        base = list_ts[-1] + timedelta(minutes=10 + offset)
+        list_ts += [base + timedelta(minutes=10 * i) for i in range(3)]
+        list_oil += [150.0] * 3
+    return pl.DataFrame(
+        {"Asset": "A", "Timestamp": list_ts, "Load": 50.0, "Oil_Temp": list_oil}
+    )
+
+
+def test_log_gap_splits_interval():
+    df = anomaly.score(__history()).filter(pl.col("Channel") == "Oil_Temp")
+    assert df.height == 2
+    assert df["Samples"].to_list() == [3, 3]
+    assert (df["End"] - df["Start"]).max() == timedelta(minutes=20)
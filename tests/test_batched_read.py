@@ -0,0 +1,55 @@
+"""Testes da leitura em lotes dos logs de motores"""
+
+import math
+import os
+import zipfile
+import polars as pl
+import rfvbi
+from classes_rfvbi import PathHolder
+
+
+def __first_log(fleet: dict[str, str], path_holder: PathHolder) -> str:
+    """Extrai o primeiro log do zip sintético e retorna o nome do arquivo"""
+    with zipfile.ZipFile(fleet["englogpath"]) as zip_engs:
+        name = zip_engs.namelist()[0]
+        zip_engs.extract(name, path_holder.englogs)
+    return name
+
+
+def test_batches_cover_every_row(fleet):
+    path_holder = PathHolder(fleet["dbpath"])
+    name = __first_log(fleet, path_holder)
+    path_engfile = path_holder.englogs + name
+    sn = rfvbi.get_sn(name)
+    list_colstd = list(rfvbi.DICT_COLNAME.keys()) + ["Asset"]
+
+    df_direct = pl.read_csv(path_engfile, encoding="utf-16le", infer_schema_length=0)
+    df, rows_in, n_batches = rfvbi.read_englog_batched(
+        path_engfile, sn, path_holder, list_colstd, batch_rows=100
+    )
+
+    assert rows_in == df_direct.height
+    assert df.height == df_direct.height
+    assert n_batches == math.ceil(df_direct.height / 100)
+    assert df["Timestamp"].is_sorted()
+    assert not os.path.exists(path_holder.englogs + "_spool/" + sn + ".csv")
+
+
+def test_header_only_log(fleet):
+    path_holder = PathHolder(fleet["dbpath"])
+    name = __first_log(fleet, path_holder)
+    path_engfile = path_holder.englogs + name
+    with open(path_engfile, "r", encoding="utf-16le") as file:
+        header = file.readline()
+    with open(path_engfile, "w", encoding="utf-16le") as file:
+        file.write(header)
+
+    df, rows_in, n_batches = rfvbi.read_englog_batched(
+        path_engfile,
+        rfvbi.get_sn(name),
+        path_holder,
+        list(rfvbi.DICT_COLNAME.keys()) + ["Asset"],
+        batch_rows=100,
+    )
+    assert (df.height, rows_in, n_batches) == (0, 0, 0)
+    assert "Timestamp" in df.columns
@@ -0,0 +1,92 @@
+"""Testes do cancelamento: aceito até o início da escrita, recusado depois"""
+
+import hashlib
+import os
+import pytest
+import rfvbi
+from classes_rfvbi import CancelToken, PathHolder, RunCancelled
+
+
+def __db_snapshot(dbpath: str) -> dict[str, str]:
+    """Hash de cada arquivo do BD"""
+    dict_hashes = {}
+    for folder, _, list_files in os.walk(dbpath):
+        for filename in list_files:
+            path = os.path.normpath(os.path.join(folder, filename))
+            with open(path, "rb") as file:
+                dict_hashes[path] = hashlib.md5(file.read()).hexdigest()
+    return dict_hashes
+
+
+def __run(fleet: dict[str, str], concatenar: int, **kwargs) -> None:
+    """Executa o RFV TO BI sem TrendBot na pasta sintética"""
+    rfvbi.main(
+        fleet["dbpath"],
+        fleet["englogpath"],
+        fleet["eventslogpath"],
+        concatenar,
+        0,
+        **kwargs,
+    )
+
+
+def test_token_window():
+    token = CancelToken()
+    rfvbi.check_cancel(None)
+    token.check()
+    token.commit()
+    assert token.is_committed
+    assert not token.cancel()
+    assert not token.is_cancelled
+    token.check()
+
+    token = CancelToken()
+    assert token.cancel()
+    with pytest.raises(RunCancelled):
+        token.commit()
+    assert not token.is_committed
+
+
+def test_cancel_before_begin_writes_keeps_db(fleet):
+    path_holder = PathHolder(fleet["dbpath"])
+    open(path_holder.eng_output, "w", encoding="utf-8").close()
+    os.makedirs(path_holder.englogs)
+    token = CancelToken()
+    token.cancel()
+
+    with pytest.raises(RunCancelled):
+        rfvbi.begin_writes(path_holder, token, concatenar=0)
+    assert os.path.isfile(path_holder.eng_output)
+
+    rfvbi.begin_writes(path_holder, None, concatenar=0)
+    assert not os.path.exists(path_holder.eng_output)
+    assert os.path.isdir(path_holder.englogs)
+
+
+def test_cancelled_run_leaves_db_untouched(fleet):
+    __run(fleet, 1)
+    before = __db_snapshot(fleet["dbpath"])
+    assert os.path.normpath(PathHolder(fleet["dbpath"]).eng_output) in before
+    token = CancelToken()
+
+    def cancel_on_start(event: dict) -> None:
+        if event["event"] == "start" and event["name"] == "create_engdata_output":
+            token.cancel()
+
+    with pytest.raises(RunCancelled):
+        __run(fleet, 0, progress_callback=cancel_on_start, cancel_token=token)
+    assert __db_snapshot(fleet["dbpath"]) == before
+
+
+def test_cancel_after_begin_writes_is_refused(fleet):
+    token = CancelToken()
+    list_refused = []
+
+    def cancel_on_start(event: dict) -> None:
+        if event["event"] == "start" and event["name"] == "create_events_output":
+            list_refused.append(not token.cancel())
+
+    __run(fleet, 1, progress_callback=cancel_on_start, cancel_token=token)
+    assert list_refused == [True]
+    assert token.is_committed and not token.is_cancelled
+    assert os.path.isfile(PathHolder(fleet["dbpath"]).eng_output)
@@ -0,0 +1,71 @@
+"""Testes da correção dos contadores acumulados"""
+
+from datetime import datetime, timedelta
+import polars as pl
+import counters
+
+
+def __history(smh: list[float]) -> pl.DataFrame:
+    """Histórico horário de um ativo com o SMH informado"""
+    start = datetime(2024, 1, 1)
+    return pl.DataFrame(
+        {
+            "Asset": "A",
+            "Timestamp": [start + timedelta(hours=i) for i in range(len(smh))],
+            "SMH": smh,
+        },
+        schema_overrides={"SMH": pl.Float64},
+    )
+
+
+def test_clean_counter_unchanged():
+    df, df_audit = counters.repair(__history([100, 101, 102, 103]))
+    assert df["SMH"].to_list() == [100, 101, 102, 103]
+    assert df_audit.is_empty()
+
+
+def test_spike_in_first_reading():
+    df, df_audit = counters.repair(__history([999999, 100, 101, 102, 103, 104]))
+    assert df["SMH"].to_list() == [None, 100, 101, 102, 103, 104]
+    assert df_audit["Issue"].to_list() == ["Spike"]
+
+
+def test_spike_in_middle_reading():
+    df, df_audit = counters.repair(__history([100, 101, 999999, 103, 104]))
+    assert df["SMH"].to_list() == [100, 101, None, 103, 104]
+    assert df_audit["Issue"].to_list() == ["Spike"]
+
+
+def test_spike_in_last_reading():
+    df, df_audit = counters.repair(__history([100, 101, 102, 103, 999999]))
+    assert df["SMH"].to_list() == [100, 101, 102, 103, None]
+    assert df_audit["Issue"].to_list() == ["Spike"]
+
+
+def test_ecm_reset_carries_previous_value():
+    df, df_audit = counters.repair(
+        __history([20000, 20001, 20002, 20003, 0, 0, 1, 2, 3])
+    )
+    assert df["SMH"].to_list() == [
+        20000,
+        20001,
+        20002,
+        20003,
+        20003,
+        20003,
+        20004,
+        20005,
+        20006,
+    ]
+    assert df_audit["Issue"].to_list() == ["Reset"]
+
+
+def test_assets_repaired_independently():
+    df = pl.concat(
+        [
+            __history([500, 501, 502]),
+            __history([10, 11, 12]).with_columns(pl.lit("B").alias("Asset")),
+        ]
+    )
+    df_repaired, _ = counters.repair(df)
+    assert df_repaired["SMH"].to_list() == [500, 501, 502, 10, 11, 12]
@@ -0,0 +1,66 @@
+"""Testes do armazenamento indexado do histórico"""
+
+from datetime import datetime, timedelta
+import polars as pl
+import history_store
+
+
+def __history(asset: str, start: datetime, hours: int) -> pl.DataFrame:
+    """Histórico horário de um ativo"""
+    return pl.DataFrame(
+        {
+            "Timestamp": [start + timedelta(hours=i) for i in range(hours)],
+            "Asset": asset,
+            "RPM": [float(i) for i in range(hours)],
+        }
+    )
+
+
+def test_store_matches_history(tmp_path):
+    path_store = str(tmp_path)
+    df = pl.concat(
+        [
+            __history("A", datetime(2024, 1, 1), 48),
+            __history("B", datetime(2024, 1, 1), 24),
+        ]
+    )
+    assert history_store.update_store(path_store, df) == ["A", "B"]
+    assert history_store.get_history(path_store).equals(df)
+
+
+def test_only_changed_assets_rewritten(tmp_path):
+    path_store = str(tmp_path)
+    df = pl.concat(
+        [
+            __history("A", datetime(2024, 1, 1), 48),
+            __history("B", datetime(2024, 1, 1), 24),
+        ]
+    )
+    history_store.update_store(path_store, df)
+    assert not history_store.update_store(path_store, df)
+
+    # Coluna recalculada em todo o histórico (ex.: run_alldata) sem dados novos
+    df = df.with_columns(
+        pl.when(pl.col("Asset") == "B").then(pl.col("RPM") * 2).otherwise("RPM")
+    )
+    assert history_store.update_store(path_store, df) == ["B"]
+    assert history_store.get_history(path_store).equals(df)
+
+
+def test_missing_asset_pruned_not_deleted(tmp_path):
+    path_store = str(tmp_path)
+    df_a = __history("A", datetime(2024, 1, 1), 48)
+    df_b = __history("B", datetime(2024, 1, 1), 48)
+    df_c = __history("C", datetime(2023, 1, 1), 24)
+    history_store.update_store(path_store, pl.concat([df_a, df_b, df_c]))
+
+    start = datetime(2024, 1, 2)
+    history_store.update_store(
+        path_store, df_a.filter(pl.col("Timestamp") >= start), start
+    )
+    dict_index = history_store.read_index(path_store)
+    assert sorted(dict_index) == ["A", "B"]
+    assert history_store.get_history(path_store, ["B"]).equals(
+        df_b.filter(pl.col("Timestamp") >= start)
+    )
+    assert not (tmp_path / "C.parquet").exists()
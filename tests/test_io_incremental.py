@@ -0,0 +1,201 @@
+"""Testes das saídas incrementais: processar o histórico em partes (incluindo
+um trecho que chega atrasado) deve gravar o mesmo que processá-lo inteiro
+"""
+
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+import numpy as np
+import polars as pl
+from polars.testing import assert_frame_equal
+import pytest
+from analytics import event_rates, fuel_check, rollups, sessions, voyages
+from io_rfvbi import write_csv_atomic
+
+SAMPLE_MINUTES = 10
+START = datetime(2024, 1, 26)
+DAYS = 10
+
+# Cortes entre as cargas (o segundo atravessa a virada do mês) e trecho que
+# só chega na última carga, emendando sessões e viagens já gravadas
+CUTS = [datetime(2024, 1, 29, 13, 7), datetime(2024, 2, 2, 2, 3)]
+HOLE = (datetime(2024, 1, 27, 3, 0), datetime(2024, 1, 27, 9, 0))
+
+
+def __asset_history(rng: np.random.Generator, asset: str) -> pl.DataFrame:
+    """Histórico plausível de um ativo, com paradas em blocos"""
+    n_rows = DAYS * 24 * 60 // SAMPLE_MINUTES
+    load = np.clip(np.cumsum(rng.normal(0, 3, n_rows)) % 200 - 50, 0, 100)
+    is_off = (np.arange(n_rows) // 30) % 5 == 0
+    load[is_off] = 0
+    fuel_rate = np.where(is_off, 0, 5 + 3.2 * load + rng.normal(0, 2, n_rows))
+
+    return pl.DataFrame(
+        {
+            "Asset": asset,
+            "Timestamp": [
+                START + timedelta(minutes=SAMPLE_MINUTES * i) for i in range(n_rows)
+            ],
+            "Load": load,
+            "RPM": np.where(is_off, 0, 700 + 11 * load),
+            "Fuel_Rate": fuel_rate,
+            "Total_Fuel": 10000 + np.cumsum(fuel_rate * SAMPLE_MINUTES / 60),
+            "SMH": 5000 + np.cumsum(np.where(is_off, 0, SAMPLE_MINUTES / 60)),
+            "Latitude": -22.9 + np.cumsum(rng.normal(0, 0.01, n_rows)),
+            "Longitude": -43.1 + np.cumsum(rng.normal(0, 0.01, n_rows)),
+            "Vessel_Speed": np.clip(0.25 * load, 0, None),
+        }
+    )
+
+
+@pytest.fixture(scope="module")
+def history() -> pl.DataFrame:
+    """Histórico sintético de dois ativos atravessando a virada do mês"""
+    rng = np.random.default_rng(7)
+    return pl.concat([__asset_history(rng, asset) for asset in ("A", "B")]).sort(
+        "Asset", "Timestamp"
+    )
+
+
+def __chunks(df: pl.DataFrame) -> list[pl.DataFrame]:
+    """Cargas sucessivas do histórico; o trecho retido vem por último"""
+    in_hole = pl.col("Timestamp").is_between(HOLE[0], HOLE[1], closed="left")
+    bounds = [START] + CUTS + [df["Timestamp"].max() + timedelta(days=1)]
+    list_chunks = [
+        df.filter(
+            pl.col("Timestamp").is_between(lower, upper, closed="left") & ~in_hole
+        )
+        for lower, upper in zip(bounds, bounds[1:])
+    ]
+    return list_chunks + [df.filter(in_hole)]
+
+
+def __run_chunked(df: pl.DataFrame, list_steps, path_holder) -> None:
+    """Executa as etapas carga a carga com o histórico acumulado até então"""
+    df_seen = df.clear()
+    for df_current in __chunks(df):
+        df_seen = pl.concat([df_seen, df_current]).sort("Asset", "Timestamp")
+        for step in list_steps:
+            step(df_seen, df_current, path_holder)
+
+
+def __assert_same_csv(path_left: str, path_right: str, sort_by: list[str]) -> None:
+    """Compara duas saídas gravadas, tolerando arredondamento dos deltas"""
+    df_left = pl.read_csv(path_left, try_parse_dates=True, infer_schema_length=None)
+    df_right = pl.read_csv(path_right, try_parse_dates=True, infer_schema_length=None)
+    assert df_left.height > 0
+    assert_frame_equal(
+        df_left.sort(sort_by),
+        df_right.sort(sort_by),
+        check_exact=False,
+        atol=1e-6,
+        check_dtypes=False,
+    )
+
+
+def __path_holder(tmp_path, name: str, **attrs: str) -> SimpleNamespace:
+    """Caminhos das saídas de uma execução dentro de tmp_path"""
+    folder = tmp_path / name
+    folder.mkdir()
+    return SimpleNamespace(
+        **{attname: str(folder / filename) for attname, filename in attrs.items()}
+    )
+
+
+def test_sessions_and_fuel_check(history, tmp_path):
+    files = {
+        "sessions": "sessions.csv",
+        "fuel_check_daily": "fuel_daily.csv",
+        "fuel_check_sessions": "fuel_sessions.csv",
+    }
+    inc = __path_holder(tmp_path, "inc", **files)
+    full = __path_holder(tmp_path, "full", **files)
+    steps = (sessions.run, fuel_check.run)
+    __run_chunked(history, steps, inc)
+    for step in steps:
+        step(history, history, full)
+
+    __assert_same_csv(inc.sessions, full.sessions, ["Asset", "Start"])
+    __assert_same_csv(inc.fuel_check_daily, full.fuel_check_daily, ["Asset", "Date"])
+    __assert_same_csv(
+        inc.fuel_check_sessions, full.fuel_check_sessions, ["Asset", "Session_Start"]
+    )
+
+    df_orphans = pl.read_csv(inc.fuel_check_sessions, try_parse_dates=True).join(
+        pl.read_csv(inc.sessions, try_parse_dates=True).select(
+            "Asset", pl.col("Start").alias("Session_Start")
+        ),
+        on=["Asset", "Session_Start"],
+        how="anti",
+    )
+    assert df_orphans.is_empty()
+
+
+def test_voyages(history, tmp_path):
+    files = {"voyages": "voyages.csv", "geo_grid": "grid.csv"}
+    inc = __path_holder(tmp_path, "inc", **files)
+    full = __path_holder(tmp_path, "full", **files)
+    __run_chunked(history, (voyages.run,), inc)
+    voyages.run(history, history, full)
+
+    __assert_same_csv(inc.voyages, full.voyages, ["Asset", "Start"])
+    __assert_same_csv(
+        inc.geo_grid, full.geo_grid, list(pl.read_csv(full.geo_grid).columns)
+    )
+
+
+def test_rollups(history, tmp_path):
+    files = {"eng_hourly": "hourly.csv", "eng_daily": "daily.csv"}
+    inc = __path_holder(tmp_path, "inc", **files)
+    full = __path_holder(tmp_path, "full", **files)
+    __run_chunked(history, (rollups.run,), inc)
+    rollups.run(history, history, full)
+
+    for attname in files:
+        __assert_same_csv(
+            getattr(inc, attname), getattr(full, attname), ["Asset", "Timestamp"]
+        )
+
+
+def test_event_rates_backfill(tmp_path):
+    files = {
+        "event_output": "events.csv",
+        "event_rates_daily": "rates_daily.csv",
+        "event_rates_monthly": "rates_monthly.csv",
+    }
+    inc = __path_holder(tmp_path, "inc", **files)
+    full = __path_holder(tmp_path, "full", **files)
+
+    def events(list_ts: list[datetime]) -> pl.DataFrame:
+        return pl.DataFrame(
+            {"Timestamp": list_ts, "Asset": "A", "Code": "C1", "Severity": None},
+            schema_overrides={"Severity": pl.String},
+        ).sort("Timestamp")
+
+    base = [
+        datetime(2024, 1, 31, 23, 52),
+        datetime(2024, 1, 31, 23, 58),
+        datetime(2024, 2, 1, 0, 9),
+        datetime(2024, 2, 1, 0, 15),
+        datetime(2024, 3, 5, 10, 0),
+    ]
+    # O primeiro atrasado liga a cadeia pela meia-noite e pela virada do mês;
+    # o segundo tem o evento seguinte em outro mês
+    list_late = [[datetime(2024, 2, 1, 0, 4)], [datetime(2024, 2, 20)]]
+
+    seen = list(base)
+    write_csv_atomic(events(seen), inc.event_output)
+    event_rates.run(inc)
+    for late in list_late:
+        seen += late
+        write_csv_atomic(events(seen), inc.event_output)
+        event_rates.run(inc, events(late))
+
+    write_csv_atomic(events(seen), full.event_output)
+    event_rates.run(full)
+
+    __assert_same_csv(
+        inc.event_rates_daily, full.event_rates_daily, ["Asset", "Code", "Period"]
+    )
+    __assert_same_csv(
+        inc.event_rates_monthly, full.event_rates_monthly, ["Asset", "Code", "Period"]
+    )
@@ -0,0 +1,25 @@
+"""Testes da segmentação em sessões"""
+
+from datetime import datetime, timedelta
+import polars as pl
+from analytics import sessions
+
+
+def test_counter_glitch_does_not_inflate_deltas():
+    start = datetime(2024, 1, 1)
+    smh = [1000 + i / 6 for i in range(12)]
+    smh[5] = 999999.0
+    df = pl.DataFrame(
+        {
+            "Asset": "A",
+            "Timestamp": [start + timedelta(minutes=10 * i) for i in range(12)],
+            "RPM": 1500.0,
+            "Load": 60.0,
+            "SMH": smh,
+            "Total_Fuel": [5000.0 + 20 * i for i in range(12)],
+        }
+    )
+    df_sessions = sessions.compute_sessions(df)
+    assert df_sessions.height == 1
+    assert abs(df_sessions["SMH_Delta"].item() - 11 / 6) < 1e-9
+    assert df_sessions["Total_Fuel_Delta"].item() == 220
@@ -0,0 +1,68 @@
+"""Testes dos comentários do TrendBot (reponderação por faixa de carga)"""
+
+import polars as pl
+from trendbot.trendbot_func import comments_generator
+
+
+def __stats(
+    rows: list[tuple[str, float, int]], date: str | None = None
+) -> pl.DataFrame:
+    """Estatísticas por faixa de carga (faixa, média, contagem) de um parâmetro"""
+    df = pl.DataFrame(
+        {
+            "Asset": "A",
+            "Load Interval": [interval for interval, _, _ in rows],
+            "Mean": [mean for _, mean, _ in rows],
+            "Median": [mean for _, mean, _ in rows],
+            "STD Deviation": 5.0,
+            "Count": [count for _, _, count in rows],
+            "Parameter": "Oil_Temp",
+        }
+    )
+    if date is not None:
+        df = df.with_columns(pl.lit(date).alias("Date"))
+    return df
+
+
+BASELINE = __stats([("20-30", 80.0, 900), ("80-90", 100.0, 100)])
+
+
+def test_load_mix_shift_stays_within_baseline():
+    # Mesmas médias por faixa, mas o mês passou quase todo em carga alta: a
+    # média simples subiria ~16%, a reponderada não muda
+    df_monthly = __stats([("20-30", 80.0, 100), ("80-90", 100.0, 900)], "2024-01")
+    row = comments_generator(BASELINE, df_monthly).row(0, named=True)
+
+    assert row["Status"] == "Valor mensal dentro do baseline"
+    assert abs(row["Weighted_Mean_Monthly"] - row["Weighted_Mean_Baseline"]) < 1e-9
+    assert abs(row["Weighted_Mean_Baseline"] - 82.0) < 1e-9
+    assert row["Load_Coverage"] == 1.0
+    assert abs(row["Deviation_Score"]) < 1e-9
+
+
+def test_shift_within_bins_is_flagged():
+    df_monthly = __stats([("20-30", 95.0, 900), ("80-90", 115.0, 100)], "2024-01")
+    row = comments_generator(BASELINE, df_monthly).row(0, named=True)
+
+    assert row["Status"] == "Valor mensal acima do baseline"
+    assert abs(row["Deviation_Score"] - 3.0) < 1e-9
+
+
+def test_partial_coverage_uses_common_bins():
+    df_monthly = __stats([("80-90", 100.0, 50), ("90-100", 200.0, 50)], "2024-01")
+    row = comments_generator(BASELINE, df_monthly).row(0, named=True)
+
+    assert abs(row["Load_Coverage"] - 0.1) < 1e-9
+    assert abs(row["Weighted_Mean_Monthly"] - 100.0) < 1e-9
+    assert row["Status"] == "Valor mensal dentro do baseline"
+
+
+def test_no_common_bin():
+    df_monthly = __stats([("50-60", 90.0, 30), ("60-70", 120.0, 10)], "2024-01")
+    row = comments_generator(BASELINE, df_monthly).row(0, named=True)
+
+    assert row["Load_Coverage"] == 0
+    assert row["Status"] == "Sem faixa de carga em comum com o baseline"
+    assert row["Weighted_Mean_Baseline"] is None
+    assert row["Deviation_Score"] is None
+    assert abs(row["Weighted_Mean_Monthly"] - 97.5) < 1e-9
@@ -0,0 +1,33 @@
+"""Testes da segmentação de viagens"""
+
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+import polars as pl
+from analytics import voyages
+
+
+def test_counter_glitch_does_not_inflate_deltas(tmp_path):
+    start = datetime(2024, 1, 1)
+    n = 12
+    smh = [1000 + i / 6 for i in range(n)]
+    smh[5] = 999999.0
+    df = pl.DataFrame(
+        {
+            "Asset": "A",
+            "Timestamp": [start + timedelta(minutes=10 * i) for i in range(n)],
+            "Latitude": [-23.0 + 0.01 * i for i in range(n)],
+            "Longitude": -46.0,
+            "Vessel_Speed": 15.0,
+            "SMH": smh,
+            "Total_Fuel": [5000.0 + 20 * i for i in range(n)],
+        }
+    )
+    path_holder = SimpleNamespace(
+        voyages=str(tmp_path / "voyages.csv"), geo_grid=str(tmp_path / "grid.csv")
+    )
+    voyages.run(df, df, path_holder)
+
+    df_voyages = pl.read_csv(path_holder.voyages)
+    assert df_voyages["Type"].to_list() == ["Voyage"]
+    assert abs(df_voyages["SMH_Delta"].item() - 11 / 6) < 1e-9
+    assert df_voyages["Total_Fuel_Delta"].item() == 220
@@ -3,13 +3,19 @@
 import polars as pl
 from . import trendbot_func
 
+TRENDBOT_COLUMNS = ["Load"] + trendbot_func.list_parameters
+
 
 def run_trendbot(
-    df: pl.DataFrame, pathbaseline: str, pathmonthly: str, pathcomments: str
+    df: pl.DataFrame,
+    pathbaseline: str,
+    pathmonthly: str,
+    pathcomments: str,
+    registry=None,
 ):
     """Principal rotina do Trendbot"""
 
-    trendbot_func.main_trendbot(df, pathbaseline, pathmonthly, pathcomments)
+    trendbot_func.main_trendbot(df, pathbaseline, pathmonthly, pathcomments, registry)
 
 
 if __name__ == "__main__":
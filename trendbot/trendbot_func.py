@@ -1,8 +1,12 @@
 """Principais funções do TrendBot"""
 
 import polars as pl
+from classes_rfvbi import LOAD_BIN_COL
+from instrumentation import span
+from io_rfvbi import write_csv_atomic
 
 TOLERANCE = 0.10
+LOAD_BIN_WIDTH = 10
 
 list_parameters = [
     "Batt",
@@ -21,11 +25,20 @@ list_parameters = [
 
 
 # Aux funcions
-def __categorize_load(load):
-    """Categorização de 10 em 10 do fator de carga do motor"""
-    lower = (load // 10) * 10
-    upper = lower + 10
-    return f"{lower}-{upper}"
+def __categorize_load(df, registry):
+    """Categorização do fator de carga do motor em faixas (10 em 10 por padrão)
+    A largura pode ser definida por ativo na coluna "Load Bin" do ASSET_LIST
+    """
+    width = pl.lit(LOAD_BIN_WIDTH)
+    if registry is not None and LOAD_BIN_COL in registry.df.columns:
+        df = registry.join(df, columns=(LOAD_BIN_COL,))
+        width = pl.col(LOAD_BIN_COL).fill_null(LOAD_BIN_WIDTH)
+
+    lower = (pl.col("Load") // width) * width
+    df = df.with_columns(
+        pl.format("{}-{}", lower, lower + width).alias("Load Interval")
+    )
+    return df.drop(LOAD_BIN_COL, strict=False)
 
 
 def __mean_comparison(baseline_col, month_col):
@@ -73,35 +86,86 @@ def __calculate_monthly(df, column):
 
 
 def comments_generator(df_baseline, df_monthly):
-    """Gera comentários automaticamente"""
-    df_cmts_month = df_monthly.group_by(["Date", "Asset", "Parameter"]).agg(
-        [
-            (pl.col("Mean") * pl.col("Count")).sum().alias("Weighted_Mean_Sum"),
-            pl.col("Count").sum().alias("Count_Sum"),
-        ]
+    """Gera comentários automaticamente
+    Compara cada faixa de carga com a mesma faixa do baseline, reponderando
+    pela distribuição de carga do baseline. Meses sem faixa em comum com o
+    baseline ficam com Load_Coverage 0 e Deviation_Score nulo
+    """
+    df_bins_baseline = df_baseline.select(
+        pl.col("Asset"),
+        pl.col("Parameter"),
+        pl.col("Load Interval"),
+        pl.col("Mean").alias("Mean_Baseline"),
+        pl.col("STD Deviation").alias("STD_Baseline"),
+        (pl.col("Count") / pl.col("Count").sum().over(["Asset", "Parameter"])).alias(
+            "Weight_Baseline"
+        ),
     )
 
-    df_cmts_month = df_cmts_month.with_columns(
-        (pl.col("Weighted_Mean_Sum") / pl.col("Count_Sum")).alias(
-            "Weighted_Mean_Monthly"
+    df_cmts_month = (
+        df_monthly.filter(pl.col("Count") > 0)
+        .select(
+            pl.col("Date"),
+            pl.col("Asset"),
+            pl.col("Parameter"),
+            pl.col("Load Interval"),
+            pl.col("Mean").alias("Mean_Monthly"),
+            pl.col("Count").alias("Count_Monthly"),
+        )
+        .join(
+            df_bins_baseline,
+            on=["Asset", "Parameter", "Load Interval"],
+            how="left",
+        )
+        .filter(pl.col("Mean_Monthly").is_not_null())
+        .with_columns(
+            pl.when(pl.col("STD_Baseline") > 0)
+            .then(
+                (pl.col("Mean_Monthly") - pl.col("Mean_Baseline"))
+                / pl.col("STD_Baseline")
+            )
+            .otherwise(None)
+            .alias("Z_Score"),
         )
     )
 
-    df_cmts_baseline = df_baseline.group_by(["Asset", "Parameter"]).agg(
+    df_cmts_month = df_cmts_month.group_by(["Date", "Asset", "Parameter"]).agg(
         [
-            (pl.col("Mean") * pl.col("Count")).sum().alias("Weighted_Mean_Sum"),
-            pl.col("Count").sum().alias("Count_Sum"),
+            (pl.col("Mean_Monthly") * pl.col("Weight_Baseline"))
+            .sum()
+            .alias("Weighted_Mean_Sum_Monthly"),
+            (pl.col("Mean_Baseline") * pl.col("Weight_Baseline"))
+            .sum()
+            .alias("Weighted_Mean_Sum_Baseline"),
+            pl.col("Weight_Baseline").sum().alias("Load_Coverage"),
+            (pl.col("Mean_Monthly") * pl.col("Count_Monthly"))
+            .sum()
+            .alias("Count_Mean_Sum_Monthly"),
+            pl.col("Count_Monthly").sum().alias("Count_Sum_Monthly"),
+            (pl.col("Z_Score") * pl.col("Weight_Baseline"))
+            .sum()
+            .alias("Weighted_Z_Sum"),
+            pl.col("Weight_Baseline")
+            .filter(pl.col("Z_Score").is_not_null())
+            .sum()
+            .alias("Weight_Z_Sum"),
         ]
     )
 
-    df_cmts_baseline = df_cmts_baseline.with_columns(
-        (pl.col("Weighted_Mean_Sum") / pl.col("Count_Sum")).alias(
-            "Weighted_Mean_Baseline"
-        )
-    )
-
-    df_cmts_month = df_cmts_month.join(
-        df_cmts_baseline, on=["Asset", "Parameter"], how="left"
+    # Sem cobertura o mês mantém a média simples e fica sem comparação
+    covered = pl.col("Load_Coverage") > 0
+    df_cmts_month = df_cmts_month.with_columns(
+        pl.when(covered)
+        .then(pl.col("Weighted_Mean_Sum_Monthly") / pl.col("Load_Coverage"))
+        .otherwise(pl.col("Count_Mean_Sum_Monthly") / pl.col("Count_Sum_Monthly"))
+        .alias("Weighted_Mean_Monthly"),
+        pl.when(covered)
+        .then(pl.col("Weighted_Mean_Sum_Baseline") / pl.col("Load_Coverage"))
+        .alias("Weighted_Mean_Baseline"),
+        pl.when(pl.col("Weight_Z_Sum") > 0)
+        .then(pl.col("Weighted_Z_Sum") / pl.col("Weight_Z_Sum"))
+        .otherwise(None)
+        .alias("Deviation_Score"),
     )
 
     df_cmts_month = df_cmts_month.select(
@@ -110,47 +174,61 @@ def comments_generator(df_baseline, df_monthly):
         pl.col("Parameter"),
         pl.col("Weighted_Mean_Baseline"),
         pl.col("Weighted_Mean_Monthly"),
-        __mean_comparison(
-            pl.col("Weighted_Mean_Baseline"), pl.col("Weighted_Mean_Monthly")
-        ).alias("Status"),
+        pl.col("Deviation_Score"),
+        pl.col("Load_Coverage"),
+        pl.when(pl.col("Load_Coverage") > 0)
+        .then(
+            __mean_comparison(
+                pl.col("Weighted_Mean_Baseline"), pl.col("Weighted_Mean_Monthly")
+            )
+        )
+        .otherwise(pl.lit("Sem faixa de carga em comum com o baseline"))
+        .alias("Status"),
     )
 
     return df_cmts_month
 
 
 def main_trendbot(
-    df: pl.DataFrame, pathbaseline: str, pathmonthly: str, pathcomments: str
+    df: pl.DataFrame,
+    pathbaseline: str,
+    pathmonthly: str,
+    pathcomments: str,
+    registry=None,
 ):
-    """Principal rotina de calculo do Trendbot"""
+    """Principal rotina de calculo do Trendbot
+    registry: cadastro de ativos (AssetRegistry) para faixas de carga e modelo
+    """
 
     print("\nIniciando TrendBot...\n")
 
     df = df.with_columns(pl.col("Timestamp").dt.truncate("1mo").alias("Date"))
 
-    df = df.with_columns(
-        pl.col("Load")
-        .map_elements(__categorize_load, return_dtype=pl.String)
-        .alias("Load Interval")
-    )
+    df = __categorize_load(df, registry)
 
     df_baseline = pl.DataFrame()
     df_monthly = pl.DataFrame()
 
-    for parameter in list_parameters:
-        baseline = __calculate_baseline(df, parameter)
-        monthly = __calculate_monthly(df, parameter)
-        df_baseline = pl.concat([df_baseline, baseline])
-        df_monthly = pl.concat([df_monthly, monthly])
+    with span("trendbot_statistics"):
+        for parameter in list_parameters:
+            baseline = __calculate_baseline(df, parameter)
+            monthly = __calculate_monthly(df, parameter)
+            df_baseline = pl.concat([df_baseline, baseline])
+            df_monthly = pl.concat([df_monthly, monthly])
 
-    df_comments = comments_generator(df_baseline, df_monthly)
+    with span("trendbot_comments") as sp:
+        df_comments = comments_generator(df_baseline, df_monthly)
+        if registry is not None:
+            df_comments = registry.join(df_comments)
+        sp.rows_out = df_comments.height
 
     df_baseline = df_baseline.sort(["Asset", "Parameter", "Load Interval"])
     df_monthly = df_monthly.sort(["Asset", "Parameter", "Date", "Load Interval"])
     df_comments = df_comments.sort(["Asset", "Parameter", "Date"])
 
-    df_baseline.write_csv(pathbaseline, datetime_format="%Y-%m-%d %H:%M:%S")
-    df_monthly.write_csv(pathmonthly, datetime_format="%Y-%m-%d %H:%M:%S")
-    df_comments.write_csv(pathcomments, datetime_format="%Y-%m-%d %H:%M:%S")
+    write_csv_atomic(df_baseline, pathbaseline)
+    write_csv_atomic(df_monthly, pathmonthly)
+    write_csv_atomic(df_comments, pathcomments)
 
     print("\nCálculos do TrendBot finalizados!\n")
 
@@ -0,0 +1,202 @@
+"""Validação de faixa e taxa de variação dos sensores de motor
+Complementa o cleandata: valores fisicamente impossíveis viram nulos e as
+rejeições são resumidas por ativo, dia e parâmetro
+"""
+
+import polars as pl
+from config_cache import read_sheet
+from io_rfvbi import read_output, write_csv_atomic
+
+BOUNDS_SHEET = "LimitesSensores"
+RULES = ("Below_Min", "Above_Max", "Spike")
+MIN_DT_MINUTES = 1 / 60
+
+# Parâmetro: (mínimo, máximo, taxa máxima por minuto)
+DEFAULT_BOUNDS = {
+    "Load": (0, 150, None),
+    "RPM": (0, 3500, None),
+    "Coolant_Temp": (-40, 150, 20),
+    "Oil_Press": (0, 1500, None),
+    "Oil_Temp": (-40, 180, 20),
+    "Batt": (0, 60, None),
+    "Boost": (-50, 800, None),
+    "Fuel_Rate": (0, 5000, None),
+    "EXH_L": (-40, 1000, None),
+    "EXH_R": (-40, 1000, None),
+    "Total_Fuel": (0, None, None),
+    "SMH": (0, None, None),
+    "Fuel_Press": (0, 2000, None),
+    "Aftercooler_Temp": (-40, 150, None),
+    "Inlet_Air_Temp": (-40, 150, None),
+    "Latitude": (-90, 90, None),
+    "Longitude": (-180, 180, None),
+    "Vessel_Speed": (0, 60, None),
+    "Heading": (0, 360, None),
+}
+
+QUALITY_SCHEMA = {
+    "Date": pl.Date,
+    "Asset": pl.String,
+    "Parameter": pl.String,
+    "Samples": pl.Int64,
+    "Below_Min": pl.Int64,
+    "Above_Max": pl.Int64,
+    "Spike": pl.Int64,
+}
+
+
+def get_bounds(path_config: str, model: str | None) -> dict[str, tuple]:
+    """Limites por parâmetro: padrão < aba LimitesSensores < linha do modelo
+    Aba opcional com as colunas Parametro, Modelo, Min, Max e Taxa Max
+    (Modelo vazio vale para todos; células vazias mantêm o limite anterior)
+    """
+    dict_bounds = dict(DEFAULT_BOUNDS)
+    df_bounds = read_sheet(path_config, BOUNDS_SHEET, optional=True)
+    if df_bounds is None or df_bounds.is_empty():
+        return dict_bounds
+
+    df_bounds = df_bounds.with_columns(pl.col("Modelo").cast(pl.String))
+    df_general = df_bounds.filter(pl.col("Modelo").is_null())
+    df_model = df_bounds.filter(pl.col("Modelo") == str(model))
+
+    for row in pl.concat([df_general, df_model]).iter_rows(named=True):
+        lower, upper, rate = dict_bounds.get(row["Parametro"], (None, None, None))
+        dict_bounds[row["Parametro"]] = (
+            lower if row["Min"] is None else row["Min"],
+            upper if row["Max"] is None else row["Max"],
+            rate if row["Taxa Max"] is None else row["Taxa Max"],
+        )
+
+    return dict_bounds
+
+
+def __rule_exprs(col: str, bounds: tuple) -> dict[str, pl.Expr]:
+    """Máscaras de rejeição de um parâmetro"""
+    lower, upper, rate = bounds
+    value = pl.col(col).cast(pl.Float64, strict=False)
+    false = pl.lit(False)
+
+    below = value < lower if lower is not None else false
+    above = value > upper if upper is not None else false
+
+    spike = false
+    if rate is not None:
+        # Pico isolado: sobe e desce (ou desce e sobe) acima da taxa máxima
+        in_range = pl.when(~(below | above)).then(value)
+        timestamp = pl.col("Timestamp")
+        dt_in = timestamp.diff().dt.total_seconds() / 60
+        dt_out = -timestamp.diff(-1).dt.total_seconds() / 60
+        d_in = in_range.diff()
+        d_out = in_range.diff(-1)
+        spike = (
+            (d_in.abs() / dt_in.clip(MIN_DT_MINUTES) > rate)
+            & (d_out.abs() / dt_out.clip(MIN_DT_MINUTES) > rate)
+            & (d_in.sign() == d_out.sign())
+        ).fill_null(False)
+
+    return {"Below_Min": below, "Above_Max": above, "Spike": spike}
+
+
+def __summary(
+    df: pl.DataFrame, asset: str, list_channels: list[str], list_masks: list[str]
+) -> pl.DataFrame:
+    """Amostras e rejeições por dia e parâmetro"""
+    if df.is_empty():
+        return pl.DataFrame(schema=QUALITY_SCHEMA)
+
+    return (
+        df.group_by(pl.col("Timestamp").dt.date().alias("Date"))
+        .agg(
+            [
+                pl.col(col).is_not_null().sum().alias(f"{col}|Samples")
+                for col in list_channels
+            ]
+            + [pl.col(name).sum() for name in list_masks]
+        )
+        .unpivot(index="Date")
+        .with_columns(
+            pl.col("variable")
+            .str.split_exact("|", 1)
+            .struct.rename_fields(["Parameter", "Metric"])
+        )
+        .unnest("variable")
+        .pivot("Metric", index=["Date", "Parameter"], values="value")
+        .select(
+            "Date",
+            pl.lit(asset).alias("Asset"),
+            "Parameter",
+            *[pl.col(col).cast(pl.Int64) for col in ("Samples",) + RULES],
+        )
+    )
+
+
+def validate(
+    df: pl.DataFrame,
+    asset: str,
+    dict_bounds: dict[str, tuple],
+    known_timestamps: pl.Series | None = None,
+) -> tuple[pl.DataFrame, pl.DataFrame]:
+    """Anula leituras fora dos limites e retorna o resumo de qualidade
+    Amostras em known_timestamps (já contadas em outra carga) ficam fora do resumo
+    """
+    list_channels = [col for col in dict_bounds if col in df.columns]
+    if not list_channels or df.is_empty():
+        return df, pl.DataFrame(schema=QUALITY_SCHEMA)
+
+    if not df["Timestamp"].is_sorted():
+        df = df.sort("Timestamp")
+
+    dict_masks = {
+        f"{col}|{rule}": expr
+        for col in list_channels
+        for rule, expr in __rule_exprs(col, dict_bounds[col]).items()
+    }
+    df = df.with_columns(**dict_masks)
+
+    df_counted = df
+    if known_timestamps is not None and not known_timestamps.is_empty():
+        df_counted = df.filter(
+            ~pl.col("Timestamp").is_in(known_timestamps.cast(df["Timestamp"].dtype))
+        )
+
+    df_quality = __summary(df_counted, asset, list_channels, list(dict_masks))
+
+    df = df.with_columns(
+        [
+            pl.when(pl.any_horizontal([f"{col}|{rule}" for rule in RULES]))
+            .then(None)
+            .otherwise(pl.col(col))
+            .alias(col)
+            for col in list_channels
+        ]
+    ).drop(list(dict_masks))
+
+    n_rejected = df_quality.select(pl.sum_horizontal(RULES).sum()).item()
+    if n_rejected:
+        print(f"{n_rejected} leituras fora dos limites removidas!")
+
+    return df, df_quality
+
+
+def merge_quality(path: str, df_new: pl.DataFrame) -> pl.DataFrame:
+    """Soma as contagens novas às já gravadas para o mesmo ativo, dia e parâmetro
+    Uma segunda carga parcial do mesmo dia complementa a anterior
+    """
+    df_old = read_output(path, QUALITY_SCHEMA)
+    if df_old is not None and not df_old.is_empty():
+        df_new = pl.concat(
+            [df_old, df_new.cast(QUALITY_SCHEMA)], how="diagonal_relaxed"
+        )
+
+    df_new = (
+        df_new.group_by("Date", "Asset", "Parameter")
+        .agg([pl.col(col).sum() for col in ("Samples",) + RULES])
+        .sort(["Asset", "Date", "Parameter"])
+    )
+    write_csv_atomic(df_new, path)
+    return df_new
+
+
+if __name__ == "__main__":
+
+    print("Execute o script através da GUI!")
@@ -0,0 +1,8 @@
+"""Versão do RFV TO BI, separada para a GUI abrir sem carregar o pipeline"""
+
+SCRIPT_VERSION = "V6.4.1"
+
+
+if __name__ == "__main__":
+
+    print("Execute o script através da GUI!")